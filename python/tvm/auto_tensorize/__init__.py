@@ -1,4 +1,5 @@
 from .auto_tensorize import *
+from .kernel_cache import *
 from .hw_abstraction import *
 from .hw_abs_dag import *
 from .tensorization_phases import *
@@ -4,7 +4,13 @@ import math
 from .search.measure import MAX_FLOAT
 import tvm
 import tvm._ffi
-from .search import pebble_local_builder_build, pebble_local_runner_run
+from .search import (
+    pebble_local_builder_build,
+    pebble_local_runner_run,
+    tenet_inmemory_builder_build,
+    tenet_inmemory_runner_run,
+    is_analytical_target,
+)
 from .tensorization_phases import get_match_results, MappingGenerator, MappingApplier
 from .tensorization_phases import (
     CUDAScheduleGenerator,
@@ -26,12 +32,16 @@ from .search import (
     EmptyChecker,
     CUDAProgramChecker,
     MaliProgramChecker,
+    LLVMProgramChecker,
     find_optimized_parameters,
     find_optimized_parameters_v2,
     find_optimized_parameters_v3,
+    get_workload_hash,
+    make_tuning_key,
+    make_tuning_key_prefix,
 )
-from .target import get_cuda_compute_version
-from .policy import first_fit, best_fit, all_fit, choose_one
+from .target import get_cuda_compute_version, llvm_targets, X86
+from .policy import first_fit, best_fit, all_fit, choose_one, cost_model_fit, rank_mappings
 
 
 class AutoTensorizeResult(object):
@@ -51,6 +61,21 @@ class AutoTensorizeResult(object):
         )
 
 
+def get_measure_funcs(target, builder=None, runner=None):
+    """The builder and runner to use, the defaults depend on the target
+
+    Analytical TENET targets keep the built funcs in memory,
+    the others build modules through the artifact store.
+    """
+    if is_analytical_target(target):
+        default_builder, default_runner = tenet_inmemory_builder_build, tenet_inmemory_runner_run
+    else:
+        default_builder, default_runner = pebble_local_builder_build, pebble_local_runner_run
+    builder = default_builder if builder is None else builder
+    runner = default_runner if runner is None else runner
+    return builder, runner
+
+
 def auto_tensorize_compute(
     target_dag,
     target,
@@ -86,6 +111,8 @@ def auto_tensorize_compute(
         match_result, record = first_fit(match_results)
     elif transform_policy == "best_fit":
         match_result, record = best_fit(match_results)
+    elif transform_policy == "cost_model_fit":
+        match_result, record = cost_model_fit(match_results)
     elif transform_policy[:7] == "choose:":
         suffix = transform_policy[7:]
         mat_id, map_id = suffix.split(",")
@@ -122,17 +149,20 @@ def auto_tensorize_schedule(
     match_result,
     new_state,
     trials=200,
-    builder=pebble_local_builder_build,
-    runner=pebble_local_runner_run,
+    builder=None,
+    runner=None,
     verbose=False,
     search_group_size=16,
     enable_split_K=False,
     use_lagacy=False,
     build_parallel=1,
     run_parallel=1,
+    cost_model=None,
+    pipeline=False,
 ):
     if match_result is None or new_state is None:
         return AutoTensorizeResult(None, None, None, None)
+    builder, runner = get_measure_funcs(target, builder, runner)
     if str(target) == "cuda":
         if enable_split_K:
             schedule_gen = CUDAScheduleGeneratorSplitK(
@@ -179,14 +209,13 @@ def auto_tensorize_schedule(
         schedule_app = MaliScheduleApplier(match_result, sc_info)
         # TODO: write a checker for MALI GPU
         checker = MaliProgramChecker(arch="g76")
-    elif str(target) == "llvm -mcpu=skylake-avx512":
+    elif str(target) in llvm_targets:
         schedule_gen = LLVMScheduleGenerator(match_result, new_state, log_file=log_file)
         if os.path.exists(log_file) and os.path.isfile(log_file):
             schedule_gen.load_from_file(log_file)
         sc_info = schedule_gen.get_schedule_compute_info()
         schedule_app = LLVMScheduleApplier(match_result, sc_info)
-        # TODO: write a checker for CPU
-        checker = EmptyChecker()
+        checker = LLVMProgramChecker(arch=X86.from_target(str(target)).arch)
     elif str(target).startswith("tenet"):
         target = str(target)
         parts = target.split(" ")
@@ -229,6 +258,8 @@ def auto_tensorize_schedule(
             search_group_size=search_group_size,
             build_parallel=build_parallel,
             run_parallel=run_parallel,
+            cost_model=cost_model,
+            pipeline=pipeline,
         )
 
     entry = schedule_gen.get_best_entry()
@@ -245,8 +276,8 @@ def auto_tensorize(
     log_file,
     measure_opt,
     trials=200,
-    builder=pebble_local_builder_build,
-    runner=pebble_local_runner_run,
+    builder=None,
+    runner=None,
     verbose=False,
     transform_dump=False,
     transform_strict=True,
@@ -256,6 +287,8 @@ def auto_tensorize(
     enable_split_K=False,
     build_parallel=1,
     run_parallel=1,
+    cost_model=None,
+    pipeline=False,
 ):
     print(
         "[AMOS] Mapping starts...\nUsing deterministic mapping logic with dynamic schedule tuning",
@@ -288,6 +321,8 @@ def auto_tensorize(
         enable_split_K,
         build_parallel=build_parallel,
         run_parallel=run_parallel,
+        cost_model=cost_model,
+        pipeline=pipeline,
     )
 
 
@@ -389,8 +424,8 @@ def auto_tensorize_v3(
     measure_opt,
     trials=200,
     schedule_trials=40,
-    builder=pebble_local_builder_build,
-    runner=pebble_local_runner_run,
+    builder=None,
+    runner=None,
     verbose=False,
     verbose_schedule=False,
     transform_dump=False,
@@ -403,9 +438,15 @@ def auto_tensorize_v3(
     drop_output=False,
     build_parallel=1,
     run_parallel=1,
+    database=None,
+    warm_start=False,
+    pipeline=False,
+    mapping_topk=None,
+    mapping_model=None,
 ):
 
     measure_opt.target = target
+    builder, runner = get_measure_funcs(target, builder, runner)
     match_results = get_match_results(target_dag, target)
 
     if len(match_results) == 0:
@@ -448,6 +489,16 @@ def auto_tensorize_v3(
     if os.path.exists(transform_log_file) and os.path.isfile(transform_log_file):
         gen.load_from_file(transform_log_file)
     app = MappingApplier(match_result, verbose=transform_dump, strict=transform_strict)
+    ranked_records = None
+    if mapping_topk is not None:
+        # only tune the most promising mappings
+        ranked_records = [
+            x[2] for x in rank_mappings([match_result], model=mapping_model, topk=mapping_topk)
+        ]
+        if verbose:
+            print("Top ranked mappings:", flush=True)
+            for record in ranked_records:
+                print(record, flush=True)
 
     class ScheduleContext:
         def __init__(self, schedule_gen, schedule_app, sc_info, checker, generate_schedule):
@@ -462,6 +513,7 @@ def auto_tensorize_v3(
     best_ctx = None
     best_params = None
     pure_test = False
+    workload_hash = get_workload_hash(target_dag) if database is not None else None
 
     iterations = trials // schedule_trials
     print("Total iterations:", iterations, flush=True)
@@ -476,14 +528,18 @@ def auto_tensorize_v3(
         if not pure_test:
             feasible = False
             while not feasible:
-                record = gen.get_next(policy="random")
-                try:
-                    tmp_app = MappingApplier(match_result, strict=transform_strict)
-                    tmp_app.apply(record, drop_output=drop_output)
-                    feasible = True
-                except RuntimeError as e:
+                if ranked_records is not None:
+                    if not ranked_records:
+                        raise RuntimeError("No feasible mapping among the top ranked ones.")
+                    record = ranked_records[it % len(ranked_records)]
+                else:
+                    record = gen.get_next(policy="random")
+                feasible = app.is_feasible(record, drop_output=drop_output)
+                if not feasible:
                     print("Catch an infeasible mapping:", flush=True)
                     print(record, flush=True)
+                    if ranked_records is not None:
+                        ranked_records.remove(record)
 
         else:
             try:
@@ -510,7 +566,11 @@ def auto_tensorize_v3(
         if record_key in schedule_context_cache:
             sch_ctx = schedule_context_cache[record_key]
         else:
-            current_log_file = str(record_key) + "_" + schedule_log_file
+            if database is not None:
+                # records go to the database instead of per-mapping logs
+                current_log_file = os.devnull
+            else:
+                current_log_file = str(record_key) + "_" + schedule_log_file
             if str(target) == "cuda":
                 if not enable_split_K:
                     if use_shared_store:
@@ -558,7 +618,7 @@ def auto_tensorize_v3(
                 schedule_app = MaliScheduleApplier(match_result, sc_info)
                 # TODO: write a checker for MALI GPU
                 checker = MaliProgramChecker(arch="g76")
-            elif str(target) == "llvm -mcpu=skylake-avx512":
+            elif str(target) in llvm_targets:
                 schedule_gen = LLVMScheduleGenerator(
                     match_result, new_state, log_file=current_log_file
                 )
@@ -566,8 +626,7 @@ def auto_tensorize_v3(
                     schedule_gen.load_from_file(current_log_file)
                 sc_info = schedule_gen.get_schedule_compute_info()
                 schedule_app = LLVMScheduleApplier(match_result, sc_info)
-                # TODO: write a checker for CPU
-                checker = EmptyChecker()
+                checker = LLVMProgramChecker(arch=X86.from_target(str(target)).arch)
             elif str(target).startswith("tenet"):
                 target = str(target)
                 parts = target.split(" ")
@@ -596,6 +655,28 @@ def auto_tensorize_v3(
                     checker = EmptyChecker()
             else:
                 raise RuntimeError("Do not support target: %s" % target)
+            if database is not None:
+                schedule_gen.attach_database(
+                    database,
+                    make_tuning_key(
+                        target,
+                        match_result.hw_abs_dag.get_name(),
+                        match_result.compute_key,
+                        match_result.shape_key,
+                        record.as_key(),
+                        workload_hash,
+                    ),
+                )
+                if warm_start and not schedule_gen.has_entry():
+                    schedule_gen.warm_start(
+                        database,
+                        make_tuning_key_prefix(
+                            target,
+                            match_result.hw_abs_dag.get_name(),
+                            match_result.compute_key,
+                            match_result.shape_key,
+                        ),
+                    )
 
             # use tuning to find params
             if schedule_trials:
@@ -612,6 +693,7 @@ def auto_tensorize_v3(
                     search_group_size=search_group_size,
                     build_parallel=build_parallel,
                     run_parallel=run_parallel,
+                    pipeline=pipeline,
                 )
             else:
                 generate_schedule = None
@@ -666,8 +748,8 @@ def auto_tensorize_v4(
     schedule_log_dir="schedules",
     trials=200,
     repeat_rounds=10,
-    builder=pebble_local_builder_build,
-    runner=pebble_local_runner_run,
+    builder=None,
+    runner=None,
     verbose_schedule=False,
     transform_dump=False,
     transform_strict=True,
@@ -682,9 +764,13 @@ def auto_tensorize_v4(
     explore_full_match=False,
     enable_perf_model=False,
     perf_percentage=0.5,
+    database=None,
+    warm_start=False,
+    pipeline=False,
 ):
 
     measure_opt.target = target
+    builder, runner = get_measure_funcs(target, builder, runner)
     match_results = get_match_results(target_dag, target)
 
     if len(match_results) == 0:
@@ -735,18 +821,15 @@ def auto_tensorize_v4(
     for match_result in shape_key_match_results:
         all_matches.append(match_result)
         gen = MappingGenerator(match_result)
-        mappings = gen.get_all()
-        # filter out infeasible mappings
-        feasible_mappings = []
-        tmp_app = MappingApplier(match_result, strict=transform_strict)
-        for mapping in mappings:
-            try:
-                tmp_app.apply(mapping, drop_output=drop_output)
-                feasible_mappings.append(mapping)
-            except RuntimeError as e:
+        app = MappingApplier(match_result, verbose=transform_dump, strict=transform_strict)
+        # filter out infeasible mappings, the mapped states are kept in app
+        mappings = []
+        for mapping in gen.get_all():
+            if app.is_feasible(mapping, drop_output=drop_output):
+                mappings.append(mapping)
+            else:
                 print("Catch an infeasible mapping:", flush=True)
                 print(mapping, flush=True)
-        mappings = feasible_mappings
         # record the feasible mappings
         all_mappings.append(mappings)
         total_matchings += 1
@@ -754,7 +837,6 @@ def auto_tensorize_v4(
         total_mappings += len(mappings)
         mapping_weights.append([1.0 / len(mappings) for m in mappings])
         weights_updates.append([0.0 for m in mappings])
-        app = MappingApplier(match_result, verbose=transform_dump, strict=transform_strict)
         appliers.append(app)
     if total_mappings == 0:
         print("Can't find any mappings!", flush=True)
@@ -775,6 +857,7 @@ def auto_tensorize_v4(
     best_params = None
     best_mapping = None
     pure_test = False
+    workload_hash = get_workload_hash(target_dag) if database is not None else None
 
     if trials == 0:
         # pure test mode, no tuning
@@ -824,9 +907,13 @@ def auto_tensorize_v4(
                 new_state = app.apply(record, drop_output=drop_output)
                 # prepare tune log file
                 record_key = record.as_key()
-                current_log_file = os.path.join(
-                    schedule_log_dir, "mapping_" + str(record_key) + "_" + schedule_log_file
-                )
+                if database is not None:
+                    # records go to the database instead of per-mapping logs
+                    current_log_file = os.devnull
+                else:
+                    current_log_file = os.path.join(
+                        schedule_log_dir, "mapping_" + str(record_key) + "_" + schedule_log_file
+                    )
                 if record_key in schedule_context_cache:
                     sch_ctx = schedule_context_cache[record_key]
                 else:
@@ -890,7 +977,7 @@ def auto_tensorize_v4(
                         schedule_app = MaliScheduleApplier(match_result, sc_info)
                         # TODO: write a checker for MALI GPU
                         checker = MaliProgramChecker(arch="g76")
-                    elif str(target) == "llvm -mcpu=skylake-avx512":
+                    elif str(target) in llvm_targets:
                         schedule_gen = LLVMScheduleGenerator(
                             match_result, new_state, log_file=current_log_file
                         )
@@ -898,8 +985,7 @@ def auto_tensorize_v4(
                             schedule_gen.load_from_file(current_log_file)
                         sc_info = schedule_gen.get_schedule_compute_info()
                         schedule_app = LLVMScheduleApplier(match_result, sc_info)
-                        # TODO: write a checker for CPU
-                        checker = EmptyChecker()
+                        checker = LLVMProgramChecker(arch=X86.from_target(str(target)).arch)
                     elif str(target).startswith("tenet"):
                         target = str(target)
                         parts = target.split(" ")
@@ -934,6 +1020,28 @@ def auto_tensorize_v4(
                             checker = EmptyChecker()
                     else:
                         raise RuntimeError("Do not support target: %s" % target)
+                    if database is not None:
+                        schedule_gen.attach_database(
+                            database,
+                            make_tuning_key(
+                                target,
+                                match_result.hw_abs_dag.get_name(),
+                                match_result.compute_key,
+                                match_result.shape_key,
+                                record_key,
+                                workload_hash,
+                            ),
+                        )
+                        if warm_start and not schedule_gen.has_entry():
+                            schedule_gen.warm_start(
+                                database,
+                                make_tuning_key_prefix(
+                                    target,
+                                    match_result.hw_abs_dag.get_name(),
+                                    match_result.compute_key,
+                                    match_result.shape_key,
+                                ),
+                            )
 
                     # tune loop
                     schedule_trials = tune_trials[mapping_id]
@@ -969,6 +1077,7 @@ def auto_tensorize_v4(
                                 search_group_size=search_group_size,
                                 build_parallel=build_parallel,
                                 run_parallel=run_parallel,
+                                pipeline=pipeline,
                             )
                     else:
                         generate_schedule = None
@@ -1,8 +1,13 @@
 import tvm
 import json
-from functools import reduce
+import itertools
+import multiprocessing
+import numpy as np
+from functools import reduce, lru_cache, partial
+from pebble import ProcessPool
+from concurrent.futures import TimeoutError
 from .. import _ffi_api
-from ..target import TENET
+from ..target import TENET, TENET_BUILTIN_SPECS
 
 
 class TenetContext(object):
@@ -129,51 +134,56 @@ def load_func(filename):
     return TenetFunc(obj["memory_size"], obj["space_time_loops"], obj["target"])
 
 
-def evaluate_tenet_accelerator(target):
+@lru_cache(maxsize=None)
+def _get_builtin_tenet_target(arch):
+    return TENET(arch=arch)
+
+
+def get_tenet_target(target):
+    """The TENET target of a target string
+
+    Builtin archs are shared by all queries, spec files are read again
+    each time so edits to them are seen.
+    """
     if str(target).startswith("tenet"):
-        _, arch = target.split(" ")
+        _, arch = target.split(" ", 1)
     else:
         arch = target
-    t = TENET(arch=arch)
-    return t.compute_latency()
+    if arch in TENET_BUILTIN_SPECS:
+        return _get_builtin_tenet_target(arch)
+    return TENET(arch=arch)
+
+
+def evaluate_tenet_accelerator(target):
+    return get_tenet_target(target).compute_latency()
 
 
 def get_memory_bandwidth(target, memory_scope):
-    if str(target).startswith("tenet"):
-        _, arch = target.split(" ")
-    else:
-        arch = target
-    t = TENET(arch=arch)
-    return t.memory_bandwidth(memory_scope)
+    return get_tenet_target(target).memory_bandwidth(memory_scope)
 
 
 def get_maximum_parallelism(target, level):
-    if str(target).startswith("tenet"):
-        _, arch = target.split(" ")
-    else:
-        arch = target
-    t = TENET(arch=arch)
-    return t.parallelism(level)
+    return get_tenet_target(target).parallelism(level)
 
 
 def get_maximum_memory(target, memory_scope):
-    if str(target).startswith("tenet"):
-        _, arch = target.split(" ")
-    else:
-        arch = target
-    t = TENET(arch=arch)
-    return t.memory_size(memory_scope)
+    return get_tenet_target(target).memory_size(memory_scope)
 
 
-def evaluate_func(func, verbose=0):
+def evaluate_func(func, verbose=0, arch=None):
+    """
+    arch: optional TENET
+        evaluate on this accelerator instead of the one of func.target
+    """
+    arch = get_tenet_target(func.target) if arch is None else arch
     memory_latency_vector = []
     compute_latency_vector = []
     for l, ([s, t], [scope, m]) in enumerate(
         reversed(list(zip(func.space_time_loops, func.memory_size)))
     ):
-        bandwidth = get_memory_bandwidth(func.target, scope)
-        parallelism = get_maximum_parallelism(func.target, l)
-        capacity = get_maximum_memory(func.target, scope)
+        bandwidth = arch.memory_bandwidth(scope)
+        parallelism = arch.parallelism(l)
+        capacity = arch.memory_size(scope)
         if m > capacity:
             raise RuntimeError(
                 f"Memory exceed limit {scope}: need({m/(2**10)}K), given({capacity/(2**10)}K)"
@@ -183,9 +193,7 @@ def evaluate_func(func, verbose=0):
         time_iterations = reduce(lambda x, y: x * y, t, 1)
         real_time_iterations = time_iterations * (space_iterations + parallelism - 1) // parallelism
         if l == 0:
-            compute_latency_vector.append(
-                real_time_iterations * evaluate_tenet_accelerator(func.target)
-            )
+            compute_latency_vector.append(real_time_iterations * arch.compute_latency())
         else:
             compute_latency_vector.append(
                 (real_time_iterations - 1)
@@ -200,3 +208,198 @@ def evaluate_func(func, verbose=0):
         for l, (c, m) in enumerate(zip(compute_latency_vector, memory_latency_vector)):
             print(f"Level {l}: compute {c/1e9} (G)cycles, memory {m/1e9} (G)cycles", flush=True)
     return (compute_latency_vector[-1] / 1e9,)  # G cycle
+
+
+def evaluate_batch(space_time_loops, memory_size, memory_scopes, target, arch=None):
+    """Evaluate many candidates of the same structure in one pass
+
+    Parameters
+    ----------
+    space_time_loops: list of [space, time], outer --> inner
+        space and time are int arrays of shape (N, number of loops)
+    memory_size: array of shape (N, level), outer --> inner
+    memory_scopes: list of str, outer --> inner
+    target: str
+    arch: optional TENET
+        evaluate on this accelerator instead of the one of target
+
+    Returns
+    -------
+    array of shape (N,)
+        latency in G cycles, inf for candidates exceeding memory
+    """
+    arch = get_tenet_target(target) if arch is None else arch
+    memory_size = np.asarray(memory_size, dtype="float64")
+    num = memory_size.shape[0]
+    level = len(memory_scopes)
+    assert len(space_time_loops) == level and memory_size.shape[1] == level
+    valid = np.ones(num, dtype=bool)
+    memory_latency = None
+    compute_latency = None
+    for l in range(level):
+        idx = level - 1 - l
+        s, t = space_time_loops[idx]
+        scope = memory_scopes[idx]
+        m = memory_size[:, idx]
+        parallelism = arch.parallelism(l)
+        valid &= m <= arch.memory_size(scope)
+        space_iterations = np.prod(np.asarray(s, dtype="int64").reshape(num, -1), axis=1)
+        time_iterations = np.prod(np.asarray(t, dtype="int64").reshape(num, -1), axis=1)
+        real_time_iterations = time_iterations * (space_iterations + parallelism - 1) // parallelism
+        if l == 0:
+            next_compute = real_time_iterations * arch.compute_latency()
+        else:
+            next_compute = (real_time_iterations - 1) * np.maximum(
+                memory_latency, compute_latency
+            ) + (memory_latency + compute_latency)
+        memory_latency = m / arch.memory_bandwidth(scope)
+        compute_latency = next_compute
+    return np.where(valid, compute_latency / 1e9, float("inf"))
+
+
+def evaluate_funcs(funcs, arch=None):
+    """Evaluate TenetFuncs of the same target and memory scopes
+
+    Loops of different lengths are padded with 1.
+
+    Parameters
+    ----------
+    funcs: list of TenetFunc
+    arch: optional TENET
+        evaluate on this accelerator instead of the one of the funcs
+
+    Returns
+    -------
+    array of shape (N,)
+        latency in G cycles, inf for funcs exceeding memory
+    """
+    if not funcs:
+        return np.zeros([0])
+    target = funcs[0].target
+    memory_scopes = [scope for scope, _ in funcs[0].memory_size]
+    for func in funcs:
+        assert func.target == target
+        assert [scope for scope, _ in func.memory_size] == memory_scopes
+
+    def stack(loops):
+        width = max([len(x) for x in loops] + [1])
+        return np.array([list(x) + [1] * (width - len(x)) for x in loops], dtype="int64")
+
+    space_time_loops = []
+    for l in range(len(memory_scopes)):
+        space = stack([func.space_time_loops[l][0] for func in funcs])
+        time = stack([func.space_time_loops[l][1] for func in funcs])
+        space_time_loops.append([space, time])
+    memory_size = [[m for _, m in func.memory_size] for func in funcs]
+    return evaluate_batch(space_time_loops, memory_size, memory_scopes, target, arch=arch)
+
+
+class CodesignPoint(object):
+    """One hardware variant with its best schedule"""
+
+    def __init__(self, params, latency, on_chip_memory, schedule):
+        self.params = params
+        self.latency = latency
+        self.on_chip_memory = on_chip_memory
+        self.schedule = schedule
+
+    def to_json(self):
+        return {
+            "params": self.params,
+            "latency": self.latency,
+            "on_chip_memory": self.on_chip_memory,
+            "schedule": self.schedule,
+        }
+
+    def __repr__(self):
+        return "CodesignPoint(latency=%f, on_chip_memory=%d, schedule=%d, params=%s)" % (
+            self.latency,
+            self.on_chip_memory,
+            self.schedule,
+            str(self.params),
+        )
+
+
+def expand_hardware_space(space):
+    """
+    space: dict
+        param --> list of values, see TENET.update for the params
+    ---
+    Returns:
+    list of dict, the cross product of the values
+    """
+    keys = list(space.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*[space[k] for k in keys])]
+
+
+def _codesign_worker(arch, funcs, params):
+    variant = arch.update(params)
+    costs = evaluate_funcs(funcs, arch=variant)
+    best = int(np.argmin(costs))
+    return CodesignPoint(params, float(costs[best]), variant.on_chip_memory(), best)
+
+
+def pareto_front(points):
+    """The points not dominated in both latency and on-chip memory"""
+    front = []
+    for point in sorted(points, key=lambda x: (x.on_chip_memory, x.latency)):
+        if point.latency == float("inf"):
+            continue
+        if not front or point.latency < front[-1].latency:
+            front.append(point)
+    return front
+
+
+def codesign_sweep(funcs, hardware_space, arch=None, n_parallel=None, timeout=None, verbose=1):
+    """Explore hardware params together with schedules
+
+    Every hardware variant in hardware_space evaluates all the schedules
+    and keeps the best one. The variants are spread over a process pool.
+
+    Parameters
+    ----------
+    funcs: list of TenetFunc
+        the schedule candidates, e.g., from tenet_inmemory_builder_build
+    hardware_space: dict
+        param --> list of values, see TENET.update for the params
+    arch: optional TENET
+        the base accelerator, the one of the funcs by default
+    n_parallel: optional int
+        processes in the pool, the number of cpus by default
+    timeout: optional float
+        seconds allowed for each variant
+
+    Returns
+    -------
+    points: list of CodesignPoint
+        one point for each variant, latency is inf if no schedule fits
+    front: list of CodesignPoint
+        the Pareto front of latency versus on-chip memory
+    """
+    assert len(funcs) > 0
+    arch = get_tenet_target(funcs[0].target) if arch is None else arch
+    params_lst = expand_hardware_space(hardware_space)
+    n_parallel = multiprocessing.cpu_count() if n_parallel is None else n_parallel
+    points = []
+    with ProcessPool(n_parallel) as pool:
+        # one variant per task, so a timeout only marks the variant that hit it
+        future = pool.map(
+            partial(_codesign_worker, arch, funcs), params_lst, chunksize=1, timeout=timeout
+        )
+        iterator = future.result()
+        for params in params_lst:
+            try:
+                point = next(iterator)
+            except StopIteration:
+                break
+            except TimeoutError:
+                point = CodesignPoint(
+                    params, float("inf"), arch.update(params).on_chip_memory(), -1
+                )
+            points.append(point)
+    front = pareto_front(points)
+    if verbose >= 1:
+        print("Pareto front of %d variants:" % len(points), flush=True)
+        for point in front:
+            print(point, flush=True)
+    return points, front
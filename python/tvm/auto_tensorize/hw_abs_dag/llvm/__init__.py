@@ -1 +1,3 @@
-from .x86_gemv import *
\ No newline at end of file
+from .x86_gemv import *
+from .x86_vnni import *
+from .x86_amx import *
\ No newline at end of file
@@ -0,0 +1,54 @@
+from ...hw_abstraction import *
+from ..hw_abs_dag_base import register_hw_abs_dag
+from .x86_gemv import AVX512SkylakeGemvHwAbsDAG
+
+
+@register_hw_abs_dag("llvm -mcpu=sapphirerapids", "amx-int8-gemm")
+class AMXInt8GemmHwAbsDAG(AVX512SkylakeGemvHwAbsDAG):
+    def __init__(self):
+        super(AMXInt8GemmHwAbsDAG, self).__init__()
+        self.hw_abs_dict = {"gemm": AMXInt8TileGemm}
+        self.main_hw_abs_name = "gemm"
+        self.anchor_point = "gemm"
+
+    def get_hw_abs_compute_expression_with_shape(self):
+        """
+        ---
+        Returns:
+        inputs, outputs: list of tvm.te.tensor.Tensor
+            the compute expression can be tracked
+            through [output.op.body for output in outputs]
+        """
+        hw_abs = self.hw_abs_dict["gemm"](self.get_name())
+        return hw_abs.get_compute_expression()
+
+    def get_name(self):
+        return "gemm"
+
+    def get_all_shape_keys(self):
+        return ["16x16x64"]
+
+    def get_dag_compute_expression_with_inputs(
+        self, compute_key, shape_key, hw_abs_keys, read_graph
+    ):
+        """
+        ---
+        Returns:
+        inputs, outputs: list of tvm.te.tensor.Tensor
+            the compute expression can be tracked
+            through [output.op.body for output in outputs]
+        """
+        assert len(hw_abs_keys) > 0
+        cache = {}
+        dag_inputs = []
+        dag_outputs = []
+
+        for hw_abs_key in hw_abs_keys:
+            tmp, ret = self.get_standalone_hw_abs_compute_expression(
+                compute_key, shape_key, hw_abs_key
+            )
+            dag_inputs.extend(tmp)
+            cache[hw_abs_key] = ret
+            dag_outputs.extend(ret)
+
+        return dag_inputs, dag_outputs, cache
@@ -0,0 +1,10 @@
+from ...hw_abstraction import *
+from ..hw_abs_dag_base import register_hw_abs_dag
+from .x86_gemv import AVX512SkylakeGemvHwAbsDAG
+
+
+@register_hw_abs_dag("llvm -mcpu=cascadelake", "avx-512-vnni-gemv")
+class AVX512VNNIGemvHwAbsDAG(AVX512SkylakeGemvHwAbsDAG):
+    def __init__(self):
+        super(AVX512VNNIGemvHwAbsDAG, self).__init__()
+        self.hw_abs_dict = {"gemv": AVX512VNNIGemv}
@@ -0,0 +1,234 @@
+import tvm
+from ..hw_abs_base import (
+    register_abstraction,
+    ComputeAbstraction,
+)
+
+# tile registers used by one intrinsic call
+AMX_TILE_C = 0
+AMX_TILE_A = 1
+AMX_TILE_B = 2
+
+
+@register_abstraction("llvm -mcpu=sapphirerapids", "amx-int8-gemm")
+class AMXInt8TileGemm(ComputeAbstraction):
+    rows = 16
+    k_outer = 16
+    k_inner = 4
+    cols = 16
+
+    def get_params_usage(self):
+        """
+        ---
+        Returns:
+        usage string: str
+            help to understand the instruction this hardware abstraction contains
+        """
+        usage = (
+            "AMXInt8TileGemm(tdpbusd_16x16x64_uint8_int8_int32_sapphirerapids)" "Args:",
+            "---",
+            "A: tile pointer for A [16, 16, 4], type is prefix unit8*",
+            "B: tile pointer for B [16, 16, 4] in VNNI layout, type is prefix int8*",
+            "C: tile pointer for C [16, 16], type prefix int32*",
+            "The process should request XTILEDATA permission from the kernel before use.",
+        )
+        return usage
+
+    def get_compute_expression(self):
+        """
+        ---
+        Returns:
+        inputs, outputs: list of tvm.te.tensor.Tensor
+            the compute expression can be tracked
+            through [output.op.body for output in outputs]
+        """
+        A = tvm.te.placeholder((self.rows, self.k_outer, self.k_inner), dtype="uint8", name="A")
+        B = tvm.te.placeholder((self.k_outer, self.cols, self.k_inner), dtype="int8", name="B")
+        ko = tvm.te.reduce_axis((0, self.k_outer), name="ko")
+        ki = tvm.te.reduce_axis((0, self.k_inner), name="ki")
+        C = tvm.te.compute(
+            (self.rows, self.cols),
+            lambda i, j: tvm.te.sum(
+                A[i, ko, ki].astype("int32") * B[ko, j, ki].astype("int32"), axis=[ko, ki]
+            ),
+            name="C",
+        )
+        return [A, B], [C]
+
+    def get_tile_config(self, ib):
+        """Palette 1 with 16 rows of 64 bytes for the C, A, B tiles"""
+        config = ib.allocate("uint8", 64, name="tile_config", scope="local")
+        for i in range(64):
+            config[i] = tvm.tir.const(0, "uint8")
+        config[0] = tvm.tir.const(1, "uint8")
+        for tile in [AMX_TILE_C, AMX_TILE_A, AMX_TILE_B]:
+            # colsb is a uint16 starting at byte 16, rows is a uint8 starting at byte 48
+            config[16 + 2 * tile] = tvm.tir.const(64, "uint8")
+            config[48 + tile] = tvm.tir.const(self.rows, "uint8")
+        return config
+
+    def get_intrinsic(self):
+        """
+        ---
+        Returns:
+        intrin: tvm.te.TensorIntrin
+        """
+        (A, B), (C,) = self.get_compute_expression()
+
+        A_buffer = tvm.tir.decl_buffer(
+            A.shape,
+            dtype="uint8",
+            name="a_buffer",
+            offset_factor=1,
+            strides=[tvm.te.var("lda"), self.k_inner, 1],
+        )
+        B_buffer = tvm.tir.decl_buffer(
+            B.shape,
+            dtype="int8",
+            name="b_buffer",
+            offset_factor=1,
+            strides=[tvm.te.var("ldb"), self.k_inner, 1],
+        )
+        C_buffer = tvm.tir.decl_buffer(
+            C.shape, dtype="int32", name="c_buffer", offset_factor=1, strides=[tvm.te.var("ldc"), 1]
+        )
+
+        bind_map = {A: A_buffer, B: B_buffer, C: C_buffer}
+
+        def _tile(tile):
+            return tvm.tir.const(tile, "uint8")
+
+        def _stride(buf, nbytes):
+            return (buf.strides[0] * nbytes).astype("int64")
+
+        def _intrin_func(ins, outs):
+            def _instr(index):
+                ib = tvm.tir.ir_builder.create()
+                if index == 1:
+                    for i in range(self.rows):
+                        ib.emit(outs[0].vstore([i, 0], tvm.tir.const(0, "int32x16")))
+                    return ib.get()
+
+                config = self.get_tile_config(ib)
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32",
+                        "llvm.x86.ldtilecfg",
+                        tvm.tir.const(0, "uint32"),
+                        config.asobject().data,
+                    )
+                )
+                if index == 0:
+                    ib.emit(
+                        tvm.tir.call_llvm_intrin(
+                            "int32",
+                            "llvm.x86.tilezero",
+                            tvm.tir.const(0, "uint32"),
+                            _tile(AMX_TILE_C),
+                        )
+                    )
+                else:
+                    ib.emit(
+                        tvm.tir.call_llvm_intrin(
+                            "int32",
+                            "llvm.x86.tileloadd64",
+                            tvm.tir.const(0, "uint32"),
+                            _tile(AMX_TILE_C),
+                            outs[0].access_ptr("r"),
+                            _stride(outs[0], 4),
+                        )
+                    )
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32",
+                        "llvm.x86.tileloadd64",
+                        tvm.tir.const(0, "uint32"),
+                        _tile(AMX_TILE_A),
+                        ins[0].access_ptr("r"),
+                        _stride(ins[0], 1),
+                    )
+                )
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32",
+                        "llvm.x86.tileloadd64",
+                        tvm.tir.const(0, "uint32"),
+                        _tile(AMX_TILE_B),
+                        ins[1].access_ptr("r"),
+                        _stride(ins[1], 1),
+                    )
+                )
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32",
+                        "llvm.x86.tdpbusd",
+                        tvm.tir.const(0, "uint32"),
+                        _tile(AMX_TILE_C),
+                        _tile(AMX_TILE_A),
+                        _tile(AMX_TILE_B),
+                    )
+                )
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32",
+                        "llvm.x86.tilestored64",
+                        tvm.tir.const(0, "uint32"),
+                        _tile(AMX_TILE_C),
+                        outs[0].access_ptr("w"),
+                        _stride(outs[0], 4),
+                    )
+                )
+                ib.emit(
+                    tvm.tir.call_llvm_intrin(
+                        "int32", "llvm.x86.tilerelease", tvm.tir.const(0, "uint32")
+                    )
+                )
+                return ib.get()
+
+            # body, reset, update
+            return _instr(0), _instr(1), _instr(2)
+
+        buffer_params = {"offset_factor": 1}
+        return tvm.te.decl_tensor_intrin(
+            C.op,
+            _intrin_func,
+            binds=bind_map,
+            default_buffer_params=buffer_params,
+        )
+
+    def get_buffer_memory_scope_info(self, arg_pos=0, args=None):
+        """
+        arg_pos: int
+            the position of argument which requires memory scope
+        args: optional list
+            the full args
+        ---
+        Returns:
+        memory scope info: dict of {tvm.runtime.String, tvm.tir.StringImm}
+            e.g., {target: opencl}
+        """
+        assert isinstance(arg_pos, int)
+        ret = {}
+        return ret
+
+    def get_instruction_prefix(self):
+        """
+        ---
+        Returns:
+        instruction prefix
+            e.g., arm_dot_vlen_local
+        """
+        return ""
+
+    def assemble_instruction(self, args):
+        """
+        args: list of str
+            the arguments in string format
+        ---
+        Returns:
+        full instruction: str
+            the instruction string in full format
+        """
+        for v in args:
+            assert isinstance(v, str)
+        return self.get_instruction_prefix()
@@ -0,0 +1,78 @@
+import tvm
+from ..hw_abs_base import register_abstraction
+from .x86_gemv import AVX512SkylakeGemv
+
+
+@register_abstraction("llvm -mcpu=cascadelake", "avx-512-vnni-gemv")
+class AVX512VNNIGemv(AVX512SkylakeGemv):
+    def get_params_usage(self):
+        """
+        ---
+        Returns:
+        usage string: str
+            help to understand the instruction this hardware abstraction contains
+        """
+        usage = (
+            "AVX512VNNIGemv(dot_16x1x16_uint8_int8_int32_cascadelake)" "Args:",
+            "---",
+            "A: matrix pointer for A, type is prefix unit8*",
+            "B: matrix pointer for B, type is prefix int8*",
+            "C: dst memory pointer C, type prefix int32*",
+        )
+        return usage
+
+    def get_intrinsic(self):
+        """
+        ---
+        Returns:
+        intrin: tvm.te.TensorIntrin
+        """
+        (A, B), (C,) = self.get_compute_expression()
+
+        A_buffer = tvm.tir.decl_buffer(
+            A.shape, dtype="uint8", name="a_buffer", offset_factor=1, strides=[1]
+        )
+        B_buffer = tvm.tir.decl_buffer(
+            B.shape, dtype="int8", name="b_buffer", offset_factor=1, strides=[tvm.te.var("ldw"), 1]
+        )
+
+        bind_map = {A: A_buffer, B: B_buffer}
+
+        def _intrin_func(ins, outs):
+            def _instr(index):
+                ib = tvm.tir.ir_builder.create()
+                if index == 1:
+                    ib.emit(outs[0].vstore(0, tvm.tir.const(0, "int32x16")))
+                    return ib.get()
+
+                a_int8 = ins[0].vload([0], "uint8x4")
+                re_int32 = tvm.tir.call_intrin("int32", "tir.reinterpret", a_int8)
+                vec_ai32 = re_int32.astype("int32x16")
+                vec_b = ins[1].vload([0, 0], "int8x64")
+                vec_bi32 = tvm.tir.call_intrin("int32x16", "tir.reinterpret", vec_b)
+                if index == 0:
+                    vec_c = tvm.tir.const(0, "int32x16")
+                else:
+                    vec_c = outs[0].vload([0], "int32x16")
+                # one vpdpbusd does the uint8 x int8 quad reduction and the accumulation
+                quad_reduction = tvm.tir.call_llvm_pure_intrin(
+                    "int32x16",
+                    "llvm.x86.avx512.vpdpbusd.512",
+                    tvm.tir.const(0, "uint32"),
+                    vec_c,
+                    vec_ai32,
+                    vec_bi32,
+                )
+                ib.emit(outs[0].vstore([0], quad_reduction))
+                return ib.get()
+
+            # body, reset, update
+            return _instr(0), _instr(1), _instr(2)
+
+        buffer_params = {"offset_factor": 1}
+        return tvm.te.decl_tensor_intrin(
+            C.op,
+            _intrin_func,
+            binds=bind_map,
+            default_buffer_params=buffer_params,
+        )
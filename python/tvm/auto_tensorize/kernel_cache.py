@@ -0,0 +1,109 @@
+import os
+import hashlib
+import tempfile
+import tvm
+from tvm.runtime import module
+from .auto_tensorize import get_schedule
+
+
+class KernelCache(object):
+    """On-disk cache of compiled tensorized kernels
+
+    Kernels are exported as shared libraries, so loading one only maps
+    the library into memory, with no lowering or compiling.
+    The key covers the tuning key, the TVM version, the target and the
+    schedule params, so re-tuned or upgraded kernels never hit stale files.
+
+    Parameters
+    ----------
+    cache_dir: str
+    """
+
+    def __init__(self, cache_dir="amos_kernels"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.loaded = {}
+
+    def make_key(self, tuning_key, target, params=None, target_host="llvm"):
+        """
+        tuning_key: str
+            see make_tuning_key
+        target: str
+        params: schedule params or None
+        """
+        parts = [str(tuning_key), tvm.__version__, str(target), str(target_host), str(params)]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + ".so")
+
+    def has(self, key):
+        return os.path.isfile(self.get_path(key))
+
+    def get_module(self, key):
+        """
+        Returns
+        -------
+        runtime.Module or None if not cached
+        """
+        if key not in self.loaded:
+            path = self.get_path(key)
+            if not os.path.isfile(path):
+                return None
+            self.loaded[key] = module.load_module(path)
+        return self.loaded[key]
+
+    def get(self, key, name="main"):
+        """
+        Returns
+        -------
+        PackedFunc or None if not cached
+        """
+        mod = self.get_module(key)
+        if mod is None:
+            return None
+        return mod[name]
+
+    def put(self, key, mod):
+        """
+        mod: runtime.Module
+            the result of tvm.build
+        """
+        path = self.get_path(key)
+        # export to a temporary file and rename, so concurrent readers
+        # never see a partial library
+        fd, tmp_path = tempfile.mkstemp(suffix=".so", dir=self.cache_dir)
+        os.close(fd)
+        try:
+            mod.export_library(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return path
+
+    def get_or_build(self, tuning_key, sch_app, params, target, target_host="llvm", name="main"):
+        """Return the cached kernel of the tuned params, build it on a miss
+
+        Parameters
+        ----------
+        tuning_key: str
+        sch_app: the schedule applier of the tuning result
+        params: the best schedule params of the tuning result
+        target: str
+        target_host: str
+        name: str
+
+        Returns
+        -------
+        PackedFunc
+        """
+        key = self.make_key(tuning_key, target, params, target_host=target_host)
+        func = self.get(key, name=name)
+        if func is not None:
+            return func
+        sch, args = get_schedule(sch_app, params)
+        mod = tvm.build(sch, args, target=target, target_host=target_host, name=name)
+        self.put(key, mod)
+        self.loaded[key] = mod
+        return mod[name]
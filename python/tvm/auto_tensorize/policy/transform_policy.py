@@ -1,3 +1,6 @@
+import os
+import json
+import math
 from functools import reduce
 from ..utils import bi_product
 import numpy as np
@@ -141,3 +144,169 @@ def choose_one(match_results, match_id, mapping_id):
     assert mapping_id < len(mappings)
     record = mappings[mapping_id]
     return match_result, record
+
+
+def get_mapping_features(match_result, bit_vec):
+    """Hardware-independent features of a mapping
+
+    Parameters
+    ----------
+    match_result: IntrinMatchResult
+    bit_vec: list of int
+        the chosen match points, i.e. Record.vmap_choice[0]
+
+    Returns
+    -------
+    list of float
+        [log2 intrinsic utilization, log2 intrinsic invocations,
+         number of extra fused target axes, number of mapped intrinsic axes]
+    """
+    utilization = 0.0
+    tiles = 0.0
+    fused = 0
+    mapped = 0
+    mapped_volume = 1
+    for k, lst in match_result.axis_map.items():
+        chosen = []
+        for ind, v in enumerate(bit_vec):
+            if v and not any([lst[ind].same_as(x) for x in chosen]):
+                chosen.append(lst[ind])
+        ext = reduce(lambda x, y: x * int(y.dom.extent), chosen, 1)
+        intrin_extent = int(k.dom.extent)
+        num_tiles = (ext + intrin_extent - 1) // intrin_extent
+        utilization += math.log2(ext / (num_tiles * intrin_extent))
+        tiles += math.log2(num_tiles)
+        fused += max(0, len(chosen) - 1)
+        mapped += 1 if chosen else 0
+        mapped_volume *= ext
+    total_volume = 1
+    for top in match_result.main_op_map.values():
+        for iv in list(top.axis) + list(top.reduce_axis):
+            total_volume *= int(iv.dom.extent)
+    # the loops outside the intrinsic are also invocations
+    outer = math.log2(max(1, total_volume // max(1, mapped_volume)))
+    return [utilization, tiles + outer, float(fused), float(mapped)]
+
+
+def analytical_mapping_score(features):
+    """Estimated log2 throughput of a mapping up to a constant
+
+    The useful work is the same for all the mappings of a workload,
+    so the time is proportional to the number of intrinsic invocations.
+    Each fused target axis adds index computation to data movement.
+    """
+    utilization, invocations, fused, mapped = features
+    return -invocations - 0.1 * fused
+
+
+class MappingCostModel(object):
+    """Rank mappings with a ridge regression learned from past mapping logs
+
+    The model predicts log2(value / best value of the same workload),
+    so logs of different workloads can be mixed. Before collecting
+    min_samples samples it falls back to analytical_mapping_score.
+
+    Parameters
+    ----------
+    alpha: float
+        l2 regularization
+    min_samples: int
+    """
+
+    def __init__(self, alpha=1.0, min_samples=8):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.xs = []
+        self.ys = []
+        self.weights = None
+
+    def update(self, match_result, bit_vecs, values):
+        pairs = [(b, v) for b, v in zip(bit_vecs, values) if v > 0]
+        if not pairs:
+            return
+        best = max([v for _, v in pairs])
+        for bit_vec, value in pairs:
+            features = get_mapping_features(match_result, bit_vec)
+            self.xs.append(features + [analytical_mapping_score(features)])
+            self.ys.append(math.log2(value / best))
+        self.weights = None
+
+    def add_log(self, match_result, log_file):
+        """Learn from the transform log of auto_tensorize_v3
+
+        Returns
+        -------
+        the number of loaded records
+        """
+        bit_vecs = []
+        values = []
+        if os.path.exists(log_file) and os.path.isfile(log_file):
+            with open(log_file, "r") as fin:
+                for line in fin:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    obj = json.loads(line)
+                    bit_vecs.append(obj["record"]["vmap"][0])
+                    values.append(obj["value"])
+        self.update(match_result, bit_vecs, values)
+        return len(values)
+
+    def fit(self):
+        X = np.array(self.xs, dtype="float64")
+        X = np.concatenate([X, np.ones((X.shape[0], 1))], axis=1)
+        y = np.array(self.ys, dtype="float64")
+        A = X.T.dot(X) + self.alpha * np.eye(X.shape[1])
+        self.weights = np.linalg.solve(A, X.T.dot(y))
+
+    def predict(self, match_result, bit_vecs):
+        features = [get_mapping_features(match_result, b) for b in bit_vecs]
+        if len(self.xs) < self.min_samples:
+            return [analytical_mapping_score(f) for f in features]
+        if self.weights is None:
+            self.fit()
+        X = np.array([f + [analytical_mapping_score(f)] for f in features], dtype="float64")
+        X = np.concatenate([X, np.ones((X.shape[0], 1))], axis=1)
+        return X.dot(self.weights).tolist()
+
+
+def rank_mappings(match_results, model=None, topk=None):
+    """Rank all the mappings of the match results without hardware
+
+    Parameters
+    ----------
+    match_results: list of IntrinMatchResult
+    model: MappingCostModel or None
+        None to use analytical_mapping_score only
+    topk: int or None
+
+    Returns
+    -------
+    list of (score, match_result, record), the best first
+    """
+    ranked = []
+    for match_result in match_results:
+        if not len(match_result.axis_map.values()):
+            continue
+        gen = MappingGenerator(match_result, verbose_init=False)
+        records = gen.get_all()
+        bit_vecs = [record.vmap_choice[0] for record in records]
+        if model is None:
+            scores = [
+                analytical_mapping_score(get_mapping_features(match_result, b)) for b in bit_vecs
+            ]
+        else:
+            scores = model.predict(match_result, bit_vecs)
+        for score, record in zip(scores, records):
+            ranked.append((score, match_result, record))
+    ranked = sorted(ranked, key=lambda x: -x[0])
+    if topk is not None:
+        ranked = ranked[:topk]
+    return ranked
+
+
+def cost_model_fit(match_results, model=None):
+    ranked = rank_mappings(match_results, model=model, topk=1)
+    assert len(ranked) > 0
+    score, match_result, record = ranked[0]
+    return match_result, record
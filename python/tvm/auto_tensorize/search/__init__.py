@@ -1,5 +1,8 @@
 from .ansor_integrate import *
 from .checker import *
+from .cost_model import *
+from .database import *
 from .measure import *
 from .parameter import *
 from .record import Entry
+from .artifact import *
@@ -0,0 +1,117 @@
+import os
+import uuid
+import shutil
+import atexit
+import tempfile
+from collections import OrderedDict
+from tvm.contrib import tar, ndk, cc
+from tvm.runtime import module
+
+
+def get_build_func(build_func):
+    """
+    build_func: str
+        "default" (tar), "ndk" or "so"
+    """
+    assert isinstance(build_func, str)
+    if build_func == "default":
+        return tar.tar
+    elif build_func == "ndk":
+        return ndk.create_shared
+    elif build_func == "so":
+        return cc.create_shared
+    else:
+        raise ValueError("Invalid build_func" + build_func)
+
+
+def get_local_build_func(measure_opt):
+    """The build function to use for measure_opt
+
+    Local runners load shared objects directly, so the tar of "default"
+    is linked once in the parallel builders instead of being untarred
+    and linked again for every trial in the runner.
+    """
+    if measure_opt.build_func == "default" and not measure_opt.use_rpc:
+        return "so"
+    return measure_opt.build_func
+
+
+class ArtifactStore(object):
+    """Scratch directory for the built modules of one tuning process
+
+    All the builders write to the same directory and the runners release
+    the files after measurement, the directory itself is removed at exit.
+    The files of the most recent max_retained artifacts are kept so that
+    they can be measured again. The runners load them in forked workers,
+    so every measurement loads its module from the file.
+    """
+
+    def __init__(self, root=None, max_retained=0):
+        """
+        root: optional str
+            where to create the scratch directory, e.g., /dev/shm to keep
+            the modules in memory if it is not mounted noexec
+        max_retained: int
+            the number of released artifacts kept for re-measurement
+        """
+        self.dirname = tempfile.mkdtemp(prefix="at_artifacts_", dir=root)
+        self.max_retained = max_retained
+        self.retained = OrderedDict()
+        self.pid = os.getpid()
+        atexit.register(self.cleanup)
+
+    def new_filename(self, output_format):
+        return os.path.join(self.dirname, uuid.uuid4().hex + "." + output_format)
+
+    def load(self, filename):
+        """Load the module of filename"""
+        return module.load_module(filename)
+
+    def _remove(self, filename):
+        # load_module leaves the linked .so and the untarred directory of a tar
+        for path in [filename, filename + ".so", os.path.splitext(filename)[0]]:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            elif os.path.exists(path):
+                os.remove(path)
+
+    def release(self, filename):
+        """The runner is done with filename"""
+        if not filename:
+            return
+        for name in filename.split("-***-"):
+            if not name.startswith(self.dirname):
+                continue
+            if self.max_retained > 0:
+                self.retained[name] = True
+                self.retained.move_to_end(name)
+                while len(self.retained) > self.max_retained:
+                    evicted, _ = self.retained.popitem(last=False)
+                    self._remove(evicted)
+            else:
+                self._remove(name)
+
+    def cleanup(self):
+        # forked workers share the directory with the creator
+        if os.getpid() != self.pid:
+            return
+        self.retained.clear()
+        shutil.rmtree(self.dirname, ignore_errors=True)
+
+
+GLOBAL_ARTIFACT_STORE = None
+
+
+def get_artifact_store():
+    global GLOBAL_ARTIFACT_STORE
+    if GLOBAL_ARTIFACT_STORE is None:
+        GLOBAL_ARTIFACT_STORE = ArtifactStore()
+    return GLOBAL_ARTIFACT_STORE
+
+
+def set_artifact_store(store):
+    """Use store for all the builders and runners of this process"""
+    global GLOBAL_ARTIFACT_STORE
+    old = GLOBAL_ARTIFACT_STORE
+    GLOBAL_ARTIFACT_STORE = store
+    return old
@@ -1,3 +1,4 @@
+import tvm
 from tvm.contrib import nvcc
 from .. import _ffi_api
 from ..target import *
@@ -146,3 +147,71 @@ class MaliProgramChecker(Checker):
             self.check_threads_per_block(ir_module)
         if self.scope >= MaliCheckScope.kWarp:
             self.check_register_per_warp(ir_module)
+
+
+class LLVMProgramChecker(Checker):
+    def __init__(self, arch="skylake-avx512", acc_dtype="int32", verbose_init=True):
+        if verbose_init:
+            print("Using arch: {}".format(arch), flush=True)
+        self.arch_info = X86(arch=arch)
+        self.acc_dtype = acc_dtype
+        self.max_register_bytes = self.arch_info.get_register_bytes()
+        self.max_l1_bytes = self.arch_info.get_l1_bytes()
+        self.max_l2_bytes = self.arch_info.get_l2_bytes()
+
+    def get_thread_buffers(self, stmt):
+        """Allocations made by one worker thread.
+
+        Only the buffers allocated inside a parallel loop are private to a thread,
+        the buffers outside are temporaries the schedule does not tile for the cache.
+        """
+        in_parallel = []
+
+        def _collect(buffers):
+            def _visit(op):
+                if isinstance(op, tvm.tir.Allocate):
+                    size = 1
+                    for e in op.extents:
+                        if not isinstance(e, tvm.tir.IntImm):
+                            return
+                        size *= e.value
+                    buffers.append((op.dtype, size * tvm.runtime.DataType(op.dtype).bits // 8))
+
+            return _visit
+
+        def _visit_parallel(op):
+            if isinstance(op, tvm.tir.For) and op.for_type == tvm.tir.For.Parallel:
+                buffers = []
+                tvm.tir.stmt_functor.post_order_visit(op.body, _collect(buffers))
+                in_parallel.extend(buffers)
+
+        tvm.tir.stmt_functor.post_order_visit(stmt, _visit_parallel)
+        return in_parallel
+
+    def check_register(self, buffers):
+        acc_size = sum(size for dtype, size in buffers if dtype == self.acc_dtype)
+        if acc_size > self.max_register_bytes:
+            raise CheckError(
+                "Accumulator excess register bytes: "
+                "{} (required) vs. {} (given)".format(acc_size, self.max_register_bytes)
+            )
+
+    def check_cache(self, buffers):
+        for _, size in buffers:
+            if size > self.max_l1_bytes:
+                raise CheckError(
+                    "Buffer excess L1 bytes: "
+                    "{} (required) vs. {} (given)".format(size, self.max_l1_bytes)
+                )
+        total_size = sum(size for _, size in buffers)
+        if total_size > self.max_l2_bytes:
+            raise CheckError(
+                "Working set excess L2 bytes: "
+                "{} (required) vs. {} (given)".format(total_size, self.max_l2_bytes)
+            )
+
+    def check(self, ir_module):
+        for _, v in ir_module.functions.items():
+            buffers = self.get_thread_buffers(v.body)
+            self.check_register(buffers)
+            self.check_cache(buffers)
@@ -0,0 +1,163 @@
+import math
+import numpy as np
+
+
+def _is_direction(d):
+    if isinstance(d, bool):
+        return False
+    if isinstance(d, int):
+        return d in (-1, 0, 1)
+    if isinstance(d, (list, tuple)):
+        return len(d) > 0 and all([isinstance(x, int) and _is_direction(x) for x in d])
+    return False
+
+
+def _is_pair(x):
+    if not isinstance(x, (list, tuple)) or len(x) != 2 or not _is_direction(x[1]):
+        return False
+    value = x[0]
+    if isinstance(value, (list, tuple)):
+        return all([isinstance(v, (bool, int, float)) for v in value])
+    return isinstance(value, (bool, int, float, str))
+
+
+def strip_direction(value):
+    """Remove the search direction from a (value, direction) pair.
+
+    Every field of a schedule record is either one pair produced by
+    CDParamGenerator.get or a list of such pairs (one per split generator).
+    The generators make pairs as tuples, records read back from json
+    only have lists and are told apart by the types of their elements.
+
+    Parameters
+    ----------
+    value: tuple or list
+
+    Returns
+    -------
+    the hidden values without directions
+    """
+    if isinstance(value, tuple) and _is_pair(value):
+        return value[0]
+    if isinstance(value, list):
+        if all([_is_pair(x) for x in value]):
+            # list of pairs, empty list included
+            return [x[0] for x in value]
+        if _is_pair(value):
+            return value[0]
+    return value
+
+
+def flatten_numbers(value, ret):
+    if isinstance(value, (list, tuple)):
+        for v in value:
+            flatten_numbers(v, ret)
+    elif isinstance(value, dict):
+        for k in sorted(value.keys()):
+            flatten_numbers(value[k], ret)
+    elif isinstance(value, (bool, int, float)):
+        ret.append(float(value))
+
+
+def get_record_features(record):
+    """Featurize a schedule record (CUDAParamsV2, LLVMParams, TenetParams...)
+
+    Parameters
+    ----------
+    record: any object with to_json()
+
+    Returns
+    -------
+    list of float
+    """
+    obj = record.to_json()
+    ret = []
+    for k in sorted(obj.keys()):
+        flatten_numbers(strip_direction(obj[k]), ret)
+    # factors are multiplicative, use log scale
+    return [math.log2(abs(x) + 1) for x in ret]
+
+
+class CostModel(object):
+    def update(self, records, values):
+        raise NotImplementedError()
+
+    def predict(self, records):
+        raise NotImplementedError()
+
+
+class RandomCostModel(CostModel):
+    def update(self, records, values):
+        pass
+
+    def predict(self, records):
+        return np.random.random(len(records)).tolist()
+
+
+class RidgeCostModel(CostModel):
+    """Online ridge regression over record features
+
+    The model predicts log(1/time_cost) of a record. It uses the
+    record factors and their pairwise products as features so that
+    interactions like warp_num * block_num are captured.
+
+    Parameters
+    ----------
+    alpha: float
+        l2 regularization
+    min_samples: int
+        use random prediction before collecting so many samples
+    max_samples: int
+        only keep the latest samples
+    """
+
+    def __init__(self, alpha=1.0, min_samples=16, max_samples=4096):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.xs = []
+        self.ys = []
+        self.weights = None
+        self.mean = None
+        self.std = None
+        self.dirty = False
+
+    def _expand(self, feature):
+        x = np.array(feature, dtype="float64")
+        quad = np.outer(x, x)[np.triu_indices(len(x))]
+        return np.concatenate([x, quad])
+
+    def update(self, records, values):
+        for record, value in zip(records, values):
+            self.xs.append(self._expand(get_record_features(record)))
+            self.ys.append(math.log(max(value, 1e-10)))
+        if len(self.xs) > self.max_samples:
+            self.xs = self.xs[-self.max_samples :]
+            self.ys = self.ys[-self.max_samples :]
+        self.dirty = True
+
+    def fit(self):
+        X = np.stack(self.xs)
+        y = np.array(self.ys)
+        # failed builds/runs should rank below the worst valid one,
+        # but not so far away that they dominate the regression
+        valid = y > math.log(1e-9)
+        if valid.any():
+            y[~valid] = y[valid].min() - 1.0
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0) + 1e-5
+        X = (X - self.mean) / self.std
+        X = np.concatenate([X, np.ones((X.shape[0], 1))], axis=1)
+        A = X.T.dot(X) + self.alpha * np.eye(X.shape[1])
+        self.weights = np.linalg.solve(A, X.T.dot(y))
+        self.dirty = False
+
+    def predict(self, records):
+        if len(self.xs) < self.min_samples:
+            return np.random.random(len(records)).tolist()
+        if self.dirty:
+            self.fit()
+        X = np.stack([self._expand(get_record_features(r)) for r in records])
+        X = (X - self.mean) / self.std
+        X = np.concatenate([X, np.ones((X.shape[0], 1))], axis=1)
+        return X.dot(self.weights).tolist()
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+
+def get_workload_hash(target_dag):
+    """Hash the computation and shapes of a ComputeDAG
+
+    Parameters
+    ----------
+    target_dag: ComputeDAG
+
+    Returns
+    -------
+    str
+    """
+    parts = []
+    for inp in target_dag.get_inputs():
+        parts.append("%s:%s" % ([int(x) for x in inp.shape], inp.dtype))
+    for op in target_dag.op_lst:
+        parts.append(str(getattr(op, "body", op.name)))
+    for t in target_dag.tensors:
+        parts.append("%s:%s" % ([int(x) for x in t.shape], t.dtype))
+    return hashlib.md5("\n".join(parts).encode()).hexdigest()
+
+
+def make_tuning_key(target, hw_abs_dag, compute_key, shape_key, mapping, workload):
+    """Make the key of a tuning task in TuningDatabase
+
+    Parameters
+    ----------
+    target: str
+    hw_abs_dag: str
+        the name of the hardware abstraction dag
+    compute_key: str
+    shape_key: str
+    mapping: str
+        the mapping record key, e.g. Record.as_key()
+    workload: str
+        the workload hash, see get_workload_hash
+
+    Returns
+    -------
+    str
+    """
+    return "|".join(
+        [
+            str(target),
+            str(hw_abs_dag),
+            str(compute_key),
+            str(shape_key),
+            str(mapping),
+            str(workload),
+        ]
+    )
+
+
+def make_tuning_key_prefix(target, hw_abs_dag, compute_key, shape_key):
+    """The key prefix shared by all mappings and workloads of one intrinsic"""
+    return "|".join([str(target), str(hw_abs_dag), str(compute_key), str(shape_key)]) + "|"
+
+
+class TuningDatabase(object):
+    """Persistent tuning records shared across runs
+
+    Records are stored in a SQLite file indexed by (key, value), so best-k
+    queries do not scan the records of other tasks and several processes
+    can append to the same file concurrently.
+
+    Parameters
+    ----------
+    path: str
+        the database file
+    timeout: float
+        seconds to wait for a lock held by another writer
+    """
+
+    def __init__(self, path="amos_tuning.db", timeout=60):
+        self.path = path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "key TEXT NOT NULL, "
+                "record TEXT NOT NULL, "
+                "value REAL NOT NULL, "
+                "time REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_key_value ON records (key, value DESC)"
+            )
+            self.conn.commit()
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        conn = getattr(self, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.conn = None
+
+    def add(self, key, record, value):
+        """
+        key: str
+        record: dict, the json object of a record
+        value: float, larger is better
+        """
+        self.add_many(key, [(record, value)])
+
+    def add_many(self, key, records):
+        rows = [(key, json.dumps(r), float(v), time.time()) for r, v in records]
+        with self.lock:
+            self.conn.executemany(
+                "INSERT INTO records (key, record, value, time) VALUES (?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+
+    def topk(self, key, k=1):
+        """
+        Returns
+        -------
+        list of (dict, float) sorted from the best
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT record, value FROM records WHERE key = ? ORDER BY value DESC LIMIT ?",
+                (key, k),
+            ).fetchall()
+        return [(json.loads(r), v) for r, v in rows]
+
+    def get_all(self, key):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT record, value FROM records WHERE key = ? ORDER BY id", (key,)
+            ).fetchall()
+        return [(json.loads(r), v) for r, v in rows]
+
+    def count(self, key):
+        with self.lock:
+            (ret,) = self.conn.execute(
+                "SELECT COUNT(*) FROM records WHERE key = ?", (key,)
+            ).fetchone()
+        return ret
+
+    def keys(self, prefix=""):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT key FROM records WHERE key >= ? AND key < ?",
+                (prefix, prefix + "\uffff"),
+            ).fetchall()
+        return [x[0] for x in rows]
+
+    def import_log(self, key, log_file):
+        """Import a JSON-lines log written by SAEntryGenerator
+
+        Returns
+        -------
+        the number of imported records
+        """
+        records = []
+        if os.path.exists(log_file) and os.path.isfile(log_file):
+            with open(log_file, "r") as fin:
+                for line in fin:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    obj = json.loads(line)
+                    records.append((obj["record"], obj["value"]))
+        if records:
+            self.add_many(key, records)
+        return len(records)
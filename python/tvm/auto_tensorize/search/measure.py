@@ -5,6 +5,7 @@ import time
 import tempfile
 import shutil
 import traceback
+import math
 import numpy as np
 from tvm.contrib import tar, ndk
 from tvm import auto_scheduler
@@ -12,6 +13,11 @@ from tvm.driver import build_module
 from tvm.ir import transform
 from tvm.runtime import Object, module, ndarray
 import multiprocessing as multi
+import threading
+import queue
+import itertools
+import copy
+import functools
 from pebble import concurrent
 from concurrent.futures import TimeoutError
 from pebble import ProcessPool, ProcessExpired
@@ -21,6 +27,8 @@ from tempfile import mkstemp
 from tvm import rpc
 from tvm.contrib import ndk
 from ..backend import tenet
+from .checker import EmptyChecker
+from .artifact import get_build_func, get_local_build_func, get_artifact_store
 
 
 class MeasureOptions(object):
@@ -42,7 +50,18 @@ class MeasureOptions(object):
         host=None,
         port=None,
         priority=1,
+        early_reject_factor=None,
+        probe_number=1,
+        probe_repeat=3,
+        probe_min_repeat_ms=0,
     ):
+        """
+        early_reject_factor: optional float
+            if given, the local runner first probes every candidate with
+            probe_number/probe_repeat/probe_min_repeat_ms, and only the ones
+            within early_reject_factor times the best probe are measured
+            with number/repeat/min_repeat_ms
+        """
         self.target = target
         self.build_func = build_func
         self.target_host = target_host
@@ -59,16 +78,23 @@ class MeasureOptions(object):
         self.host = host
         self.port = port
         self.priority = priority
+        self.early_reject_factor = early_reject_factor
+        self.probe_number = probe_number
+        self.probe_repeat = probe_repeat
+        self.probe_min_repeat_ms = probe_min_repeat_ms
 
 
 GRAPH_EVALUATE_INPUTS = None
 EVALUTE_INPUTS = None
 EVALUTE_SCHEDULE_INPUTS = None
 EVALUTE_SCHEDULES_INPUTS = None
-GLOBAL_BUILD_INPUTS = None
-GLOBAL_RUN_INPUTS = None
-GLOBAL_RPC_BUILD_INPUTS = None
-GLOBAL_RPC_RUN_INPUTS = None
+# call id --> inputs, so that concurrent builders/runners
+# in different threads do not overwrite each other's inputs
+GLOBAL_BUILD_INPUTS = {}
+GLOBAL_RUN_INPUTS = {}
+GLOBAL_RPC_BUILD_INPUTS = {}
+GLOBAL_RPC_RUN_INPUTS = {}
+GLOBAL_CALL_IDS = itertools.count()
 MAX_FLOAT = 1e10
 
 
@@ -347,7 +373,7 @@ def evaluate_params(schedule_app, params, measure_opt, timeout=100, dump=False):
 # which is around 3x faster than pebble when 32 build tasks are done in one shot
 
 
-def pebble_local_build_worker(index):
+def pebble_local_build_worker(index, call_id=None):
     """
     Build function of LocalBuilder to be ran in the Builder thread pool.
 
@@ -365,7 +391,7 @@ def pebble_local_build_worker(index):
 
     # We use fork and a global variable to copy arguments between processes.
     # This can avoid expensive serialization of TVM IR when using multiprocessing.Pool
-    if not GLOBAL_BUILD_INPUTS:
+    if call_id not in GLOBAL_BUILD_INPUTS:
         raise ValueError("GLOBAL_BUILD_INPUTS not found")
     (
         sch_app,
@@ -378,15 +404,9 @@ def pebble_local_build_worker(index):
         verbose,
         checker,
         enable_perf_model,
-    ) = GLOBAL_BUILD_INPUTS
-    assert isinstance(build_func, str)
-
-    if build_func == "default":
-        build_func = tar.tar
-    elif build_func == "ndk":
-        build_func = ndk.create_shared
-    else:
-        raise ValueError("Invalid build_func" + build_func)
+    ) = GLOBAL_BUILD_INPUTS[call_id]
+    build_func = get_build_func(build_func)
+    store = get_artifact_store()
 
     def timed_func():
         tic = time.time()
@@ -409,9 +429,8 @@ def pebble_local_build_worker(index):
             error_msg = auto_scheduler.measure.make_error_msg()
             # print(error_msg)
         if error_no == 0:
-            dirname = tempfile.mkdtemp()
             if str(target).startswith("tenet"):
-                filename = os.path.join(dirname, "tmp_func.tenet")
+                filename = store.new_filename("tenet")
 
                 func = tenet.build(
                     sch, args, sch_app.tenet_ctx, target=target, target_host=target_host, name=name
@@ -422,7 +441,7 @@ def pebble_local_build_worker(index):
                 parts = str(target).split(" ")
                 assert len(parts) > 1
                 if parts[1] == "cuda":
-                    cuda_filename = os.path.join(dirname, "tmp_func." + build_func.output_format)
+                    cuda_filename = store.new_filename(build_func.output_format)
 
                     try:
                         # TODO(merrymercy): Port the unroll pass.
@@ -439,7 +458,7 @@ def pebble_local_build_worker(index):
                     filename = "-***-".join([filename, cuda_filename])
             else:
                 if enable_perf_model:
-                    filename = os.path.join(dirname, "tmp_func.tenet")
+                    filename = store.new_filename("tenet")
 
                     func = tenet.build(
                         sch,
@@ -452,7 +471,7 @@ def pebble_local_build_worker(index):
 
                     func.save(filename)
                 else:
-                    filename = os.path.join(dirname, "tmp_func." + build_func.output_format)
+                    filename = store.new_filename(build_func.output_format)
 
                     try:
                         # TODO(merrymercy): Port the unroll pass.
@@ -506,14 +525,15 @@ def pebble_local_builder_build(
     """
     target = measure_opt.target
     target_host = measure_opt.target_host
-    build_func = measure_opt.build_func
+    build_func = get_local_build_func(measure_opt)
     timeout = measure_opt.timeout
     verbose = measure_opt.verbose
     # We use fork and a global variable to copy arguments between processes.
     # This can avoid expensive serialization of TVM IR when using multiprocessing.Pool
     global GLOBAL_BUILD_INPUTS
 
-    GLOBAL_BUILD_INPUTS = (
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_BUILD_INPUTS[call_id] = (
         sch_app,
         params_lst,
         build_func,
@@ -526,8 +546,27 @@ def pebble_local_builder_build(
         enable_perf_model,
     )
 
+    results = pebble_build_in_pool(
+        pebble_local_build_worker, call_id, len(params_lst), n_parallel, timeout, verbose
+    )
+    del GLOBAL_BUILD_INPUTS[call_id]
+
+    if verbose >= 1:
+        print("", flush=True)
+
+    return results
+
+
+def pebble_build_in_pool(worker, call_id, num, n_parallel, timeout, verbose):
+    """Run the build worker for indices [0, num) in a pebble pool"""
+    # the workers share the artifact store of this process
+    get_artifact_store()
     with ProcessPool(n_parallel) as pool:
-        future = pool.map(pebble_local_build_worker, range(len(params_lst)), timeout=timeout)
+        future = pool.map(
+            functools.partial(worker, call_id=call_id),
+            range(num),
+            timeout=timeout,
+        )
         iterator = future.result()
 
         results = []
@@ -552,6 +591,109 @@ def pebble_local_builder_build(
                     # print(error)
                 result = None, [], auto_scheduler.measure.MeasureErrorNo.COMPILE_HOST, None, timeout
             results.append(auto_scheduler.measure.BuildResult(*result))
+    return results
+
+
+def pebble_schedule_build_worker(index, call_id=None):
+    """
+    Build one of the ready-made schedules of pebble_schedule_builder_build.
+
+    Returns
+    -------
+    res : tuple of BuildResult fields
+    """
+    global GLOBAL_BUILD_INPUTS
+
+    if call_id not in GLOBAL_BUILD_INPUTS:
+        raise ValueError("GLOBAL_BUILD_INPUTS not found")
+    (
+        schs,
+        args_lst,
+        build_func,
+        name,
+        target,
+        target_host,
+        verbose,
+        checker,
+    ) = GLOBAL_BUILD_INPUTS[call_id]
+    build_func = get_build_func(build_func)
+    store = get_artifact_store()
+
+    tic = time.time()
+    sch = schs[index]
+    args = list(args_lst[index])
+    error_no = auto_scheduler.measure.MeasureErrorNo.NO_ERROR
+    error_msg = None
+    filename = ""
+    try:
+        ir_module = tvm.lower(sch, args, simple_mode=True)
+        checker.check(ir_module)
+    # pylint: disable=broad-except
+    except Exception:
+        error_no = auto_scheduler.measure.MeasureErrorNo.INSTANTIATION_ERROR
+        error_msg = auto_scheduler.measure.make_error_msg()
+    if error_no == 0:
+        filename = store.new_filename(build_func.output_format)
+        try:
+            with transform.PassContext():
+                func = build_module.build(
+                    sch, args, target=target, target_host=target_host, name=name
+                )
+            func.export_library(filename, build_func)
+        # pylint: disable=broad-except
+        except Exception:
+            error_no = auto_scheduler.measure.MeasureErrorNo.COMPILE_HOST
+            error_msg = auto_scheduler.measure.make_error_msg()
+
+    if verbose >= 1:
+        if error_no == auto_scheduler.measure.MeasureErrorNo.NO_ERROR:
+            print(".Y", end="", flush=True)
+        else:
+            print(".E", end="", flush=True)  # Build error
+
+    return (filename, args, error_no, error_msg, time.time() - tic)
+
+
+def pebble_schedule_builder_build(
+    schs, args_lst, measure_opt, checker=None, n_parallel=1, name="main"
+):
+    """
+    Build ready-made schedules, e.g., proposals of the TG scheduler,
+    so that they can go through pebble_local_runner_run.
+
+    Parameters
+    ----------
+    schs : List[Schedule]
+    args_lst : List[List[Tensor]]
+        The arguments of each schedule.
+    n_parallel : int
+        Number of process used to build in parallel.
+
+    Returns
+    -------
+    res : List[BuildResult]
+    """
+    assert len(schs) == len(args_lst)
+    verbose = measure_opt.verbose
+    timeout = measure_opt.timeout
+    checker = EmptyChecker() if checker is None else checker
+    global GLOBAL_BUILD_INPUTS
+
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_BUILD_INPUTS[call_id] = (
+        schs,
+        args_lst,
+        get_local_build_func(measure_opt),
+        name,
+        measure_opt.target,
+        measure_opt.target_host,
+        verbose,
+        checker,
+    )
+    results = pebble_build_in_pool(
+        pebble_schedule_build_worker, call_id, len(schs), n_parallel, timeout, verbose
+    )
+    del GLOBAL_BUILD_INPUTS[call_id]
 
     if verbose >= 1:
         print("", flush=True)
@@ -559,7 +701,16 @@ def pebble_local_builder_build(
     return results
 
 
-def pebble_local_run_worker(index):
+def release_build_results(build_results):
+    """Remove the artifacts of build_results, the runners are done with them"""
+    store = get_artifact_store()
+    for res in build_results:
+        filename = getattr(res, "filename", None)
+        if filename:
+            store.release(filename)
+
+
+def pebble_local_run_worker(index, call_id=None):
     global GLOBAL_RUN_INPUTS
     (
         target,
@@ -574,7 +725,7 @@ def pebble_local_run_worker(index):
         enable_cpu_cache_flush,
         verbose,
         enable_perf_model,
-    ) = GLOBAL_RUN_INPUTS
+    ) = GLOBAL_RUN_INPUTS[call_id]
 
     def timed_func(build_res):
         if build_res.error_no != 0:
@@ -607,7 +758,7 @@ def pebble_local_run_worker(index):
                     func = tenet.load_func(filename)
                     costs = tenet.evaluate_func(func, verbose=verbose)
 
-                    cuda_func = module.load_module(cuda_filename)
+                    cuda_func = get_artifact_store().load(cuda_filename)
                     ctx = ndarray.context("cuda", dev_id)
                     # Limitation:
                     # We can not get PackFunction directly in the remote mode as it is wrapped
@@ -663,7 +814,7 @@ def pebble_local_run_worker(index):
                     #     print("\n",error_msg)
             else:
                 try:
-                    func = module.load_module(build_res.filename)
+                    func = get_artifact_store().load(build_res.filename)
                     ctx = ndarray.context(str(target), dev_id)
                     # Limitation:
                     # We can not get PackFunction directly in the remote mode as it is wrapped
@@ -710,7 +861,6 @@ def pebble_local_run_worker(index):
                         error_msg = auto_scheduler.measure.make_error_msg()
                         # print(error_msg)
 
-        shutil.rmtree(os.path.dirname(build_res.filename))
         toc = time.time()
         time.sleep(cooldown_interval)
 
@@ -724,20 +874,19 @@ def pebble_local_run_worker(index):
     return timed_func(build_results[index])
 
 
-def pebble_local_runner_run(
-    build_results, measure_opt, name="main", n_parallel=1, enable_perf_model=False
+def pebble_local_run_in_pool(
+    build_results, measure_opt, number, repeat, min_repeat_ms, name, n_parallel, enable_perf_model
 ):
+    """Run build_results in a pebble pool, returns the fields of MeasureResults"""
     target = measure_opt.target
     dev_id = measure_opt.dev_id
     timeout = measure_opt.timeout
-    number = measure_opt.number
-    repeat = measure_opt.repeat
-    min_repeat_ms = measure_opt.min_repeat_ms
     cooldown_interval = measure_opt.cooldown_interval
     enable_cpu_cache_flush = measure_opt.enable_cpu_cache_flush
     verbose = measure_opt.verbose
     global GLOBAL_RUN_INPUTS
-    GLOBAL_RUN_INPUTS = (
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_RUN_INPUTS[call_id] = (
         target,
         dev_id,
         build_results,
@@ -751,9 +900,13 @@ def pebble_local_runner_run(
         verbose,
         enable_perf_model,
     )
-    measure_results = []
+    results = []
     with ProcessPool(n_parallel) as pool:
-        future = pool.map(pebble_local_run_worker, range(len(build_results)), timeout=timeout)
+        future = pool.map(
+            functools.partial(pebble_local_run_worker, call_id=call_id),
+            range(len(build_results)),
+            timeout=timeout,
+        )
         iterator = future.result()
 
         while True:
@@ -782,15 +935,333 @@ def pebble_local_runner_run(
                     timeout + timeout,
                     time.time(),
                 )
-            measure_results.append(auto_scheduler.measure.MeasureResult(*result))
+            results.append(result)
+    del GLOBAL_RUN_INPUTS[call_id]
+    return results
+
+
+def confidence_interval(costs, z=1.96):
+    """Normal approximation of the interval of the mean cost"""
+    costs = np.array([float(x) for x in costs])
+    mean = float(np.mean(costs))
+    if len(costs) < 2:
+        return (mean, mean)
+    half = z * float(np.std(costs, ddof=1)) / math.sqrt(len(costs))
+    return (mean - half, mean + half)
+
+
+class AdaptiveMeasureResult(object):
+    """MeasureResult with the statistics of adaptive measurement
+
+    Attributes of MeasureResult are forwarded to result.
+    """
+
+    def __init__(self, result, confidence_interval, num_samples, early_rejected):
+        self.result = result
+        self.confidence_interval = confidence_interval
+        self.num_samples = num_samples
+        self.early_rejected = early_rejected
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__["result"], name)
+
+
+def adaptive_local_run(build_results, measure_opt, name="main", n_parallel=1):
+    """
+    Successive halving with one rung: probe every candidate shortly,
+    then measure only the ones within early_reject_factor times the
+    best probe with the full number/repeat/min_repeat_ms.
+
+    Returns
+    -------
+    res : List[AdaptiveMeasureResult]
+    """
+    factor = measure_opt.early_reject_factor
+    probes = pebble_local_run_in_pool(
+        build_results,
+        measure_opt,
+        measure_opt.probe_number,
+        measure_opt.probe_repeat,
+        measure_opt.probe_min_repeat_ms,
+        name,
+        n_parallel,
+        False,
+    )
+    means = [
+        float(np.mean([float(x) for x in costs])) if error_no == 0 else MAX_FLOAT
+        for costs, error_no, _, _, _ in probes
+    ]
+    best = min(means + [MAX_FLOAT])
+    survivors = [i for i, m in enumerate(means) if m < MAX_FLOAT and m <= factor * best]
+    fulls = pebble_local_run_in_pool(
+        [build_results[i] for i in survivors],
+        measure_opt,
+        measure_opt.number,
+        measure_opt.repeat,
+        measure_opt.min_repeat_ms,
+        name,
+        n_parallel,
+        False,
+    )
+    results = list(probes)
+    for i, full in zip(survivors, fulls):
+        costs, error_no, error_msg, time_cost, timestamp = full
+        # a full run failing after a good probe keeps the probe
+        if error_no == 0:
+            results[i] = (costs, error_no, error_msg, time_cost + probes[i][3], timestamp)
+    measure_results = []
+    survivor_set = set(survivors)
+    for i, result in enumerate(results):
+        costs, error_no = result[0], result[1]
+        interval = confidence_interval(costs) if error_no == 0 else (MAX_FLOAT, MAX_FLOAT)
+        measure_results.append(
+            AdaptiveMeasureResult(
+                auto_scheduler.measure.MeasureResult(*result),
+                interval,
+                len(costs),
+                i not in survivor_set and error_no == 0,
+            )
+        )
+    return measure_results
+
+
+def pebble_local_runner_run(
+    build_results, measure_opt, name="main", n_parallel=1, enable_perf_model=False
+):
+    verbose = measure_opt.verbose
+    adaptive = (
+        getattr(measure_opt, "early_reject_factor", None) is not None
+        and not enable_perf_model
+        and not str(measure_opt.target).startswith("tenet")
+    )
+    if adaptive:
+        measure_results = adaptive_local_run(
+            build_results, measure_opt, name=name, n_parallel=n_parallel
+        )
+    else:
+        results = pebble_local_run_in_pool(
+            build_results,
+            measure_opt,
+            measure_opt.number,
+            measure_opt.repeat,
+            measure_opt.min_repeat_ms,
+            name,
+            n_parallel,
+            enable_perf_model,
+        )
+        measure_results = [auto_scheduler.measure.MeasureResult(*x) for x in results]
+    # release here so that timed out and crashed runs are cleaned as well
+    release_build_results(build_results)
+
+    if verbose >= 1:
+        print("", flush=True)
+
+    return measure_results
+
+
+class InMemoryBuildResult(object):
+    """BuildResult of an analytical target
+
+    The built TenetFunc stays in memory instead of going to a file.
+    """
+
+    def __init__(self, func, args, error_no, error_msg, time_cost):
+        self.func = func
+        self.filename = ""
+        self.args = args
+        self.error_no = error_no
+        self.error_msg = error_msg
+        self.time_cost = time_cost
+
+
+def is_analytical_target(target, enable_perf_model=False):
+    """Whether measuring on the target only evaluates the TENET model"""
+    if enable_perf_model:
+        return True
+    parts = str(target).split(" ")
+    return parts[0] == "tenet" and (len(parts) < 2 or parts[1] != "cuda")
+
+
+def tenet_inmemory_build_worker(index, call_id=None):
+    """
+    Build one TenetFunc of tenet_inmemory_builder_build.
+
+    Returns
+    -------
+    res : tuple of (TenetFunc, error_no, error_msg, time_cost)
+    """
+    global GLOBAL_BUILD_INPUTS
+
+    if call_id not in GLOBAL_BUILD_INPUTS:
+        raise ValueError("GLOBAL_BUILD_INPUTS not found")
+    sch_app, params_lst, args, name, target, target_host, checker = GLOBAL_BUILD_INPUTS[call_id]
+    tic = time.time()
+    func = None
+    error_no = auto_scheduler.measure.MeasureErrorNo.NO_ERROR
+    error_msg = None
+    try:
+        target_dag = sch_app.target_dag
+        sch = tvm.te.create_schedule([x.op for x in target_dag.tensors])
+        sch = sch_app.apply(sch, params_lst[index])
+        ir_module = tvm.lower(sch, args, simple_mode=True)
+        checker.check(ir_module)
+        func = tenet.build(
+            sch, args, sch_app.tenet_ctx, target=target, target_host=target_host, name=name
+        )
+    # pylint: disable=broad-except
+    except Exception:
+        error_no = auto_scheduler.measure.MeasureErrorNo.INSTANTIATION_ERROR
+        error_msg = auto_scheduler.measure.make_error_msg()
+    return func, error_no, error_msg, time.time() - tic
+
+
+def tenet_inmemory_builder_build(
+    sch_app, params_lst, measure_opt, checker, n_parallel=1, name="main", enable_perf_model=False
+):
+    """
+    Build TenetFuncs without temporary files.
+
+    Analytical targets are pure Python, the TenetFuncs are sent back from
+    the pool instead of going to files. The pool is still needed because
+    a lowering may hang, it is bounded by measure_opt.timeout.
+    Other targets fall back to pebble_local_builder_build.
+
+    Returns
+    -------
+    res : List[InMemoryBuildResult]
+    """
+    target = measure_opt.target
+    if not is_analytical_target(target, enable_perf_model):
+        return pebble_local_builder_build(
+            sch_app,
+            params_lst,
+            measure_opt,
+            checker,
+            n_parallel=n_parallel,
+            name=name,
+            enable_perf_model=enable_perf_model,
+        )
+    timeout = measure_opt.timeout
+    verbose = measure_opt.verbose
+    target_dag = sch_app.target_dag
+    args = target_dag.get_inputs() + list(target_dag.tensors)
+    global GLOBAL_BUILD_INPUTS
+
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_BUILD_INPUTS[call_id] = (
+        sch_app,
+        params_lst,
+        args,
+        name,
+        target,
+        measure_opt.target_host,
+        checker,
+    )
+    results = []
+    with ProcessPool(n_parallel) as pool:
+        future = pool.map(
+            functools.partial(tenet_inmemory_build_worker, call_id=call_id),
+            range(len(params_lst)),
+            timeout=timeout,
+        )
+        iterator = future.result()
 
+        while True:
+            try:
+                func, error_no, error_msg, time_cost = next(iterator)
+            except StopIteration:
+                break
+            except TimeoutError as error:
+                func, error_no, error_msg, time_cost = (
+                    None,
+                    auto_scheduler.measure.MeasureErrorNo.BUILD_TIMEOUT,
+                    None,
+                    timeout,
+                )
+            except Exception as error:
+                func, error_no, error_msg, time_cost = (
+                    None,
+                    auto_scheduler.measure.MeasureErrorNo.COMPILE_HOST,
+                    None,
+                    timeout,
+                )
+            if verbose >= 1:
+                if error_no == auto_scheduler.measure.MeasureErrorNo.NO_ERROR:
+                    print(".Y", end="", flush=True)
+                elif error_no == auto_scheduler.measure.MeasureErrorNo.BUILD_TIMEOUT:
+                    print(".T", end="", flush=True)
+                else:
+                    print(".E", end="", flush=True)
+            results.append(InMemoryBuildResult(func, args, error_no, error_msg, time_cost))
+    del GLOBAL_BUILD_INPUTS[call_id]
     if verbose >= 1:
         print("", flush=True)
+    return results
+
+
+def tenet_inmemory_runner_run(
+    build_results, measure_opt, name="main", n_parallel=1, enable_perf_model=False
+):
+    """
+    Evaluate the TenetFuncs of tenet_inmemory_builder_build in one batch.
+
+    Build results from other builders fall back to pebble_local_runner_run.
+
+    Returns
+    -------
+    res : List[MeasureResult]
+    """
+    if not all([isinstance(x, InMemoryBuildResult) for x in build_results]):
+        return pebble_local_runner_run(
+            build_results,
+            measure_opt,
+            name=name,
+            n_parallel=n_parallel,
+            enable_perf_model=enable_perf_model,
+        )
+    verbose = measure_opt.verbose
+    tic = time.time()
+    # group the funcs that can be evaluated together
+    groups = OrderedDict()
+    for i, res in enumerate(build_results):
+        if res.error_no == auto_scheduler.measure.MeasureErrorNo.NO_ERROR:
+            key = (
+                res.func.target,
+                tuple([scope for scope, _ in res.func.memory_size]),
+                len(res.func.space_time_loops),
+            )
+            groups.setdefault(key, []).append(i)
+    costs = [MAX_FLOAT for res in build_results]
+    for indices in groups.values():
+        values = tenet.evaluate_funcs([build_results[i].func for i in indices])
+        for i, v in zip(indices, values):
+            costs[i] = float(v)
+    toc = time.time()
 
+    measure_results = []
+    for res, cost in zip(build_results, costs):
+        error_no = res.error_no
+        error_msg = res.error_msg
+        if error_no == auto_scheduler.measure.MeasureErrorNo.NO_ERROR and not cost < MAX_FLOAT:
+            cost = MAX_FLOAT
+            error_no = auto_scheduler.measure.MeasureErrorNo.RUNTIME_DEVICE
+            error_msg = "Memory exceed limit"
+        if verbose >= 1:
+            if error_no == auto_scheduler.measure.MeasureErrorNo.NO_ERROR:
+                print("*Y", end="", flush=True)
+            else:
+                print("*E", end="", flush=True)
+        measure_results.append(
+            auto_scheduler.measure.MeasureResult(
+                (cost,), error_no, error_msg, toc - tic + res.time_cost, toc
+            )
+        )
+    if verbose >= 1:
+        print("", flush=True)
     return measure_results
 
 
-def pebble_rpc_run_worker(index):
+def pebble_rpc_run_worker(index, call_id=None):
     """Function to be ran in the RPCRunner thread pool.
 
     Parameters
@@ -820,7 +1291,7 @@ def pebble_rpc_run_worker(index):
         cooldown_interval,
         enable_cpu_cache_flush,
         verbose,
-    ) = GLOBAL_RPC_RUN_INPUTS
+    ) = GLOBAL_RPC_RUN_INPUTS[call_id]
 
     max_float = MAX_FLOAT
     build_res = build_results[index]
@@ -894,7 +1365,6 @@ def pebble_rpc_run_worker(index):
                 error_no = auto_scheduler.measure.MeasureErrorNo.RUNTIME_DEVICE
                 error_msg = auto_scheduler.measure.make_error_msg()
 
-        shutil.rmtree(os.path.dirname(build_res.filename))
         toc = time.time()
 
         time.sleep(cooldown_interval)
@@ -925,7 +1395,8 @@ def pebble_rpc_runner_run(build_results, measure_opt, name="main"):
     priority = measure_opt.priority
 
     global GLOBAL_RPC_RUN_INPUTS
-    GLOBAL_RPC_RUN_INPUTS = (
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_RPC_RUN_INPUTS[call_id] = (
         target,
         dev_id,
         build_results,
@@ -945,7 +1416,11 @@ def pebble_rpc_runner_run(build_results, measure_opt, name="main"):
 
     measure_results = []
     with ProcessPool(1) as pool:
-        future = pool.map(pebble_rpc_run_worker, range(len(build_results)), timeout=timeout)
+        future = pool.map(
+            functools.partial(pebble_rpc_run_worker, call_id=call_id),
+            range(len(build_results)),
+            timeout=timeout,
+        )
         iterator = future.result()
 
         while True:
@@ -974,6 +1449,8 @@ def pebble_rpc_runner_run(build_results, measure_opt, name="main"):
                     time.time(),
                 )
             measure_results.append(auto_scheduler.measure.MeasureResult(*result))
+    del GLOBAL_RPC_RUN_INPUTS[call_id]
+    release_build_results(build_results)
 
     if verbose >= 1:
         print("", flush=True)
@@ -981,22 +1458,18 @@ def pebble_rpc_runner_run(build_results, measure_opt, name="main"):
     return measure_results
 
 
-def tg_parallel_build_worker(name):
+def tg_parallel_build_worker(name, call_id=None):
     global GLOBAL_BUILD_INPUTS
 
     # We use fork and a global variable to copy arguments between processes.
     # This can avoid expensive serialization of TVM IR when using multiprocessing.Pool
-    if not GLOBAL_BUILD_INPUTS:
+    if call_id not in GLOBAL_BUILD_INPUTS:
         raise ValueError("GLOBAL_BUILD_INPUTS not found")
-    (sch_app, params_lst, build_func, target, target_host, verbose, checker) = GLOBAL_BUILD_INPUTS
-    assert isinstance(build_func, str)
-
-    if build_func == "default":
-        build_func = tar.tar
-    elif build_func == "ndk":
-        build_func = ndk.create_shared
-    else:
-        raise ValueError("Invalid build_func" + build_func)
+    sch_app, params_lst, build_func, target, target_host, verbose, checker = GLOBAL_BUILD_INPUTS[
+        call_id
+    ]
+    build_func = get_build_func(build_func)
+    store = get_artifact_store()
 
     target_dag = sch_app.target_dag
     inputs = target_dag.get_inputs()
@@ -1044,8 +1517,7 @@ def tg_parallel_build_worker(name):
                         print(".Y", end="", flush=True)
                     mod_err_nos.append(err)
                     mod_err_msgs.append(err_msgs[i])
-                    dirname = tempfile.mkdtemp()
-                    filename = os.path.join(dirname, "tmp_func." + build_func.output_format)
+                    filename = store.new_filename(build_func.output_format)
                     filenames[i] = filename
                     mod.export_library(filename, build_func)
             else:
@@ -1068,15 +1540,27 @@ def tg_parallel_build_worker(name):
 def tg_parallel_builder_build(sch_app, params_lst, measure_opt, checker, name="main"):
     target = measure_opt.target
     target_host = measure_opt.target_host
-    build_func = measure_opt.build_func
+    build_func = get_local_build_func(measure_opt)
     timeout = measure_opt.timeout
     verbose = measure_opt.verbose
     global GLOBAL_BUILD_INPUTS
 
-    GLOBAL_BUILD_INPUTS = (sch_app, params_lst, build_func, target, target_host, verbose, checker)
+    call_id = next(GLOBAL_CALL_IDS)
+    GLOBAL_BUILD_INPUTS[call_id] = (
+        sch_app,
+        params_lst,
+        build_func,
+        target,
+        target_host,
+        verbose,
+        checker,
+    )
 
+    get_artifact_store()
     with ProcessPool(1) as pool:
-        future = pool.map(tg_parallel_build_worker, [name], timeout=timeout)
+        future = pool.map(
+            functools.partial(tg_parallel_build_worker, call_id=call_id), [name], timeout=timeout
+        )
         iterator = future.result()
 
         while True:
@@ -1102,5 +1586,165 @@ def tg_parallel_builder_build(sch_app, params_lst, measure_opt, checker, name="m
                 ]
 
         results = [auto_scheduler.measure.BuildResult(*x) for x in results]
+    del GLOBAL_BUILD_INPUTS[call_id]
 
     return results
+
+
+def pipeline_build_worker(build, params_lst, conn):
+    try:
+        conn.send((True, build(params_lst)))
+    # pylint: disable=broad-except
+    except Exception as error:
+        try:
+            conn.send((False, error))
+        except Exception:
+            conn.send((False, RuntimeError(traceback.format_exc())))
+    conn.close()
+
+
+def measure_batches(propose, build, run, num_batches, pipeline=False, max_pending=1):
+    """Build and run batches of params, optionally in a pipeline
+
+    In pipeline mode the next batches are proposed and built in forked
+    processes while the current one is running on the device. Everything
+    else stays in the calling thread, so no process is forked while this
+    process is in the middle of a build. At most max_pending batches are
+    built ahead, so the proposals are never more than max_pending batches
+    behind the feedback.
+
+    Parameters
+    ----------
+    propose: callable
+        propose(batch_id) -> list of params
+    build: callable
+        build(params_lst) -> list of BuildResult, must be picklable
+        results in pipeline mode
+    run: callable
+        run(build_results) -> list of MeasureResult
+    num_batches: int
+    pipeline: bool
+    max_pending: int
+
+    Returns
+    -------
+    generator of (params_lst, run_results)
+        propose is never called while the consumer is handling a batch,
+        so it is safe to update the generator between two batches
+    """
+    if not pipeline:
+        for b in range(num_batches):
+            params_lst = propose(b)
+            yield params_lst, run(build(params_lst))
+        return
+
+    # the build processes write to the artifact store of this process
+    get_artifact_store()
+    ctx = multi.get_context("fork")
+    pending = []
+
+    def submit(b):
+        params_lst = propose(b)
+        recv_conn, send_conn = ctx.Pipe(duplex=False)
+        # not daemonic, the builders fork their own pools
+        proc = ctx.Process(target=pipeline_build_worker, args=(build, params_lst, send_conn))
+        proc.start()
+        send_conn.close()
+        pending.append((params_lst, proc, recv_conn))
+
+    def wait(item):
+        params_lst, proc, recv_conn = item
+        try:
+            success, ret = recv_conn.recv()
+        except EOFError:
+            success, ret = False, RuntimeError("Build process exited with %s" % proc.exitcode)
+        recv_conn.close()
+        proc.join()
+        if not success:
+            raise ret
+        return params_lst, ret
+
+    try:
+        next_batch = 0
+        while next_batch < num_batches or pending:
+            if not pending:
+                submit(next_batch)
+                next_batch += 1
+            params_lst, build_results = wait(pending.pop(0))
+            while next_batch < num_batches and len(pending) < max_pending:
+                submit(next_batch)
+                next_batch += 1
+            yield params_lst, run(build_results)
+    finally:
+        # the consumer stops early
+        for _, proc, recv_conn in pending:
+            proc.terminate()
+            proc.join()
+            recv_conn.close()
+
+
+class MeasureLease(object):
+    """Share the build workers and the devices among concurrent tuners
+
+    Each builder call holds n_parallel of the build_workers slots, so
+    several tuners never fork more processes than build_workers in total.
+    Each runner call holds one device exclusively, so measurements of
+    different tuners never interfere with each other.
+
+    Parameters
+    ----------
+    dev_ids: list of int
+    build_workers: int
+        default is the number of cpus
+    """
+
+    def __init__(self, dev_ids=(0,), build_workers=None):
+        assert len(dev_ids) > 0
+        self.build_workers = build_workers if build_workers else multi.cpu_count()
+        self.free_workers = self.build_workers
+        self.cond = threading.Condition()
+        self.devices = queue.Queue()
+        for dev_id in dev_ids:
+            self.devices.put(dev_id)
+
+    def acquire_workers(self, n_parallel):
+        n_parallel = max(1, min(n_parallel, self.build_workers))
+        with self.cond:
+            # take all the slots at once, so two waiting tuners
+            # never hold part of the slots each
+            self.cond.wait_for(lambda: self.free_workers >= n_parallel)
+            self.free_workers -= n_parallel
+        return n_parallel
+
+    def release_workers(self, n_parallel):
+        with self.cond:
+            self.free_workers += n_parallel
+            self.cond.notify_all()
+
+    def wrap_builder(self, builder):
+        builder = getattr(builder, "__wrapped__", builder)
+
+        @functools.wraps(builder)
+        def _builder(*args, n_parallel=1, **kwargs):
+            n_parallel = self.acquire_workers(n_parallel)
+            try:
+                return builder(*args, n_parallel=n_parallel, **kwargs)
+            finally:
+                self.release_workers(n_parallel)
+
+        return _builder
+
+    def wrap_runner(self, runner):
+        runner = getattr(runner, "__wrapped__", runner)
+
+        @functools.wraps(runner)
+        def _runner(build_results, measure_opt, *args, **kwargs):
+            dev_id = self.devices.get()
+            try:
+                measure_opt = copy.copy(measure_opt)
+                measure_opt.dev_id = dev_id
+                return runner(build_results, measure_opt, *args, **kwargs)
+            finally:
+                self.devices.put(dev_id)
+
+        return _runner
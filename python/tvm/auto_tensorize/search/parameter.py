@@ -2,7 +2,8 @@ import numpy as np
 import time
 import heapq
 from .measure import *
-from .record import Entry
+from .record import Entry, record_fingerprint
+from .cost_model import CostModel
 from ..utils import *
 import queue
 import logging
@@ -159,6 +160,9 @@ class SAEntryGenerator(EntryGenerator):
         allow_repeat=False,
         topk=20,
         verbose_init=True,
+        max_entries=None,
+        spill_file=None,
+        max_visited=None,
     ):
         self.eps = eps
         self.entries = []
@@ -173,6 +177,60 @@ class SAEntryGenerator(EntryGenerator):
         self.last_value = 0.0
         self.gen = self._get_next(self.allow_repeat)
         self.verbose_init = verbose_init
+        self.database = None
+        self.database_key = None
+        self.seeds = []
+        self.limit_entries(max_entries, spill_file, max_visited)
+
+    def limit_entries(self, max_entries, spill_file=None, max_visited=None):
+        """Only keep the best max_entries entries in memory
+
+        Parameters
+        ----------
+        max_entries: int or None
+            None for no limit
+        spill_file: str or None
+            append the dropped entries to this file,
+            it can be read back by load_from_file
+        max_visited: int or None
+            the number of visited records to remember, None for no limit.
+            The oldest are forgotten first, a forgotten record may be
+            proposed and measured again, so only bound it when the
+            memory matters more than the repeated measurements
+        """
+        assert max_entries is None or max_entries >= self.topk_num
+        self.max_entries = max_entries
+        self.spill_file = spill_file
+        self.max_visited = max_visited
+        if max_entries is not None and len(self.entries) > max_entries:
+            self.prune_entries()
+        self.prune_visited()
+
+    def mark_visited(self, key, value):
+        # re-insert so that the dict stays ordered by the last visit
+        self.visited.pop(key, None)
+        self.visited[key] = value
+        self.prune_visited()
+
+    def prune_visited(self):
+        if self.max_visited is None:
+            return
+        while len(self.visited) > self.max_visited:
+            del self.visited[next(iter(self.visited))]
+
+    def prune_entries(self):
+        self.entries.sort()
+        # a sorted list is still a valid heap
+        dropped = self.entries[self.max_entries :]
+        self.entries = self.entries[: self.max_entries]
+        if self.spill_file is not None and dropped:
+            with open(self.spill_file, "a") as fout:
+                for entry in dropped:
+                    print(json.dumps(entry.to_json()), file=fout)
+
+    def record_key(self, record):
+        """The key of record in self.visited"""
+        return record_fingerprint(record)
 
     def init_logger(self, verbose=True):
         if self.log_file is not None and self.log_file != "":
@@ -237,15 +295,16 @@ class SAEntryGenerator(EntryGenerator):
                 return self.entries[0]
             else:
                 raise RuntimeError("Unknown policy: %s" % policy)
-            if str(record) not in self.visited:
+            key = self.record_key(record)
+            if key not in self.visited:
                 if self.valid(record):
-                    self.visited[str(record)] = 0.0
+                    self.mark_visited(key, 0.0)
                     return record
             elif repeat:
-                self.feedback(record, self.visited[str(record)])
+                self.feedback(record, self.visited[key])
                 return record
             else:
-                self.feedback(record, self.visited[str(record)])
+                self.feedback(record, self.visited[key])
         print("It seems hard to find new candidates...", flush=True)
         return self.entries[0].record
 
@@ -268,14 +327,18 @@ class SAEntryGenerator(EntryGenerator):
 
     def feedback(self, record, value, log_to_file=True):
         entry = Entry(record, value)
-        self.visited[str(record)] = value
+        self.mark_visited(self.record_key(record), value)
         heapq.heappush(self.entries, entry)
+        if self.max_entries is not None and len(self.entries) >= 2 * self.max_entries:
+            self.prune_entries()
         # self.feedback_value(entry, value)
         self.update_score_table(value)
         # store the record
-        log = json.dumps(entry.to_json())
         if log_to_file:
+            log = json.dumps(entry.to_json())
             print(log, file=self.logger, flush=True)
+            if self.database is not None:
+                self.database.add(self.database_key, record.to_json(), value)
 
     def record_from_json(self, obj):
         raise NotImplementedError()
@@ -315,6 +378,34 @@ class SAEntryGenerator(EntryGenerator):
                 flush=True,
             )
 
+    def attach_database(self, database, key, load=True):
+        """Use a TuningDatabase instead of replaying the JSON log
+
+        Parameters
+        ----------
+        database: TuningDatabase
+        key: str
+            see make_tuning_key
+        load: bool
+            feed the existing records of this key into the generator
+        """
+        self.database = database
+        self.database_key = key
+        if not load:
+            return
+        count = 0
+        best = 0.0
+        for obj, value in database.get_all(key):
+            count += 1
+            best = max(value, best)
+            self.feedback(self.record_from_json(obj), value, False)
+        if self.verbose_init and count:
+            print(
+                "Load %d entries from database! The best known is %f ms"
+                % (count, 1 / (best + 1e-10) * 1e3),
+                flush=True,
+            )
+
     def get_best_entry(self):
         assert self.entries
         return self.entries[0]
@@ -334,9 +425,35 @@ class SAEntryGenerator(EntryGenerator):
     def get_records_mutate_one_generator(self, record, to_mutate, steps):
         raise NotImplementedError()
 
+    def add_seeds(self, records):
+        """Records to propose before any random or SA proposal"""
+        self.seeds.extend(records)
+
+    def warm_start(self, database, prefix, **kwargs):
+        """Seed the search from similar tuned workloads in database
+
+        Generators that can map records across shapes override this,
+        the others start cold.
+
+        Returns
+        -------
+        the number of seeds
+        """
+        return 0
+
     def _get_next(self, repeat=False):
         count = 0
         while True:
+            if self.seeds:
+                record = self.seeds.pop(0)
+                key = self.record_key(record)
+                if key not in self.visited and self.valid(record):
+                    self.last_choice = None
+                    self.last_value = 0.0
+                    self.mark_visited(key, 0.0)
+                    count += 1
+                    yield record
+                continue
             if not self.entries:
                 self.last_choice = None
                 self.last_value = 0.0
@@ -356,10 +473,11 @@ class SAEntryGenerator(EntryGenerator):
                         for next_record in self.get_records_mutate_one_generator(
                             record, gen_x, self.steps
                         ):
-                            if str(next_record) not in self.visited:
+                            key = self.record_key(next_record)
+                            if key not in self.visited:
                                 if self.valid(next_record):
                                     has_output = True
-                                    self.visited[str(next_record)] = 0.0
+                                    self.mark_visited(key, 0.0)
                                     count += 1
                                     yield next_record
                     # fallback
@@ -382,6 +500,49 @@ class SAEntryGenerator(EntryGenerator):
             return self.get(policy=policy)
         return next(self.gen)
 
+    def forget(self, record):
+        # allow a proposed but unmeasured record to be proposed again
+        key = self.record_key(record)
+        if key in self.visited and self.visited[key] == 0.0:
+            del self.visited[key]
+
+
+def propose_params(schedule_gen, number, policy="", cost_model=None, sample_ratio=8):
+    """Get new params from the generator, optionally pre-filtered by a cost model
+
+    Parameters
+    ----------
+    schedule_gen: SAEntryGenerator
+    number: int
+        how many params to return
+    cost_model: CostModel or None
+        when given, sample (number * sample_ratio) candidates and
+        keep the top number of them according to the prediction
+    sample_ratio: int
+
+    Returns
+    -------
+    list of params
+    """
+    if cost_model is None:
+        return [schedule_gen.get_next(policy=policy) for i in range(number)]
+    assert isinstance(cost_model, CostModel)
+    pool = []
+    keys = set()
+    for i in range(number * sample_ratio):
+        params = schedule_gen.get_next(policy=policy)
+        key = schedule_gen.record_key(params)
+        if key in keys:
+            continue
+        keys.add(key)
+        pool.append(params)
+    scores = cost_model.predict(pool)
+    order = np.argsort(-np.array(scores), kind="stable")
+    chosen = [pool[i] for i in order[:number]]
+    for i in order[number:]:
+        schedule_gen.forget(pool[i])
+    return chosen
+
 
 def find_optimized_parameters(
     match_results,
@@ -397,6 +558,9 @@ def find_optimized_parameters(
     verbose=False,
     build_parallel=1,
     run_parallel=1,
+    cost_model=None,
+    sample_ratio=8,
+    pipeline=False,
 ):
     best_value = 1 / MAX_FLOAT
     best_params = None
@@ -418,28 +582,36 @@ def find_optimized_parameters(
         flush=True,
     )
     tic = time.time()
-    for b in range(search_group_num):
+
+    def propose(b):
         print("Search round:", b, flush=True)
         schedule_gen.refresh()
-        params_lst = []
-        for i in range(search_group_size):
-            if b * search_group_size + i < trials:
-                # params = schedule_gen.get(policy=policy)
-                params = schedule_gen.get_next(policy=policy)
-                # my_params = {
-                # params.from_json(my_params)
-                # print(str(params))
-                params_lst.append(params)
-        assert params_lst
-        build_results = builder(
-            schedule_app, params_lst, measure_opt, checker, n_parallel=build_parallel
+        params_lst = propose_params(
+            schedule_gen,
+            min(search_group_size, trials - b * search_group_size),
+            policy=policy,
+            cost_model=cost_model,
+            sample_ratio=sample_ratio,
         )
-        run_results = runner(build_results, measure_opt, n_parallel=run_parallel)
+        assert params_lst
+        return params_lst
+
+    def build(params_lst):
+        return builder(schedule_app, params_lst, measure_opt, checker, n_parallel=build_parallel)
+
+    def run(build_results):
+        return runner(build_results, measure_opt, n_parallel=run_parallel)
+
+    for params_lst, run_results in measure_batches(
+        propose, build, run, search_group_num, pipeline=pipeline
+    ):
+        values = []
         for params, res in zip(params_lst, run_results):
             if verbose:
                 print(res)
             # use absolute performance
             value = 1 / np.mean([x.value for x in res.costs])
+            values.append(value)
             if value > 1 / MAX_FLOAT:  # valid results
                 schedule_gen.feedback(params, value)
             if value > best_value:
@@ -451,6 +623,8 @@ def find_optimized_parameters(
                 # print("Re-evaluate: %f ms" % cost, flush=True)
                 best_value = value
                 best_params = params
+        if cost_model is not None:
+            cost_model.update(params_lst, values)
         print("Current best timecost: ", 1 / best_value * 1e3, "ms", flush=True)
         if best_params is not None:
             print("Current best params:\n", best_params.to_json(), flush=True)
@@ -473,6 +647,9 @@ def find_optimized_parameters_v2(
     verbose=False,
     build_parallel=1,
     run_parallel=1,
+    cost_model=None,
+    sample_ratio=8,
+    pipeline=False,
 ):
     best_value = 1 / MAX_FLOAT
     best_params = None
@@ -494,30 +671,39 @@ def find_optimized_parameters_v2(
             flush=True,
         )
     tic = time.time()
-    while True:
-        for b in range(search_group_num):
-            if verbose:
-                print("Search round:", b, flush=True)
-            schedule_gen.refresh()
-            params_lst = []
-            for i in range(search_group_size):
-                if b * search_group_size + i < trials:
-                    # params = schedule_gen.get(policy=policy)
-                    params = schedule_gen.get_next(policy=policy)
-                    # print(str(params))
-                    params_lst.append(params)
-            assert params_lst
-            build_results = builder(
-                schedule_app, params_lst, measure_opt, checker, n_parallel=build_parallel
-            )
-            run_results = runner(build_results, measure_opt, n_parallel=run_parallel)
 
+    def propose(b):
+        if verbose:
+            print("Search round:", b, flush=True)
+        schedule_gen.refresh()
+        params_lst = propose_params(
+            schedule_gen,
+            min(search_group_size, trials - b * search_group_size),
+            policy=policy,
+            cost_model=cost_model,
+            sample_ratio=sample_ratio,
+        )
+        assert params_lst
+        return params_lst
+
+    def build(params_lst):
+        return builder(schedule_app, params_lst, measure_opt, checker, n_parallel=build_parallel)
+
+    def run(build_results):
+        return runner(build_results, measure_opt, n_parallel=run_parallel)
+
+    while True:
+        for b, (params_lst, run_results) in enumerate(
+            measure_batches(propose, build, run, search_group_num, pipeline=pipeline)
+        ):
             max_value = 1 / MAX_FLOAT
+            values = []
             for params, res in zip(params_lst, run_results):
                 if verbose:
                     print(res)
                 # use absolute performance
                 value = 1 / np.mean([x.value for x in res.costs])
+                values.append(value)
                 max_value = max(max_value, value)
                 if value > 1 / MAX_FLOAT:  # valid results
                     schedule_gen.feedback(params, value)
@@ -530,6 +716,8 @@ def find_optimized_parameters_v2(
                     # print("Re-evaluate: %f ms" % cost, flush=True)
                     best_value = value
                     best_params = params
+            if cost_model is not None:
+                cost_model.update(params_lst, values)
 
             if verbose:
                 print("Current best timecost: ", 1 / best_value * 1e3, "ms", flush=True)
@@ -604,7 +792,8 @@ def find_optimized_parameters_v3(
             assert params_lst_perf
 
             print("performance model estimation...", flush=True)
-            build_results_perf = builder(
+            # the performance model is analytical, keep the funcs in memory
+            build_results_perf = tenet_inmemory_builder_build(
                 schedule_app,
                 params_lst_perf,
                 measure_opt,
@@ -612,8 +801,8 @@ def find_optimized_parameters_v3(
                 n_parallel=build_parallel,
                 enable_perf_model=True,
             )
-            run_results_perf = runner(
-                build_results_perf, measure_opt, n_parallel=run_parallel, enable_perf_model=True
+            run_results_perf = tenet_inmemory_runner_run(
+                build_results_perf, measure_opt, enable_perf_model=True
             )
 
             params_value_lst = [
@@ -9,3 +9,33 @@ class Entry(object):
 
     def to_json(self):
         return {"record": self.record.to_json(), "value": self.value}
+
+
+def _freeze(v):
+    # the same equivalence as the __str__ of schedule params:
+    # (value, direction) pairs only keep the value
+    if isinstance(v, dict):
+        return tuple((x, _freeze(v[x])) for x in sorted(v.keys()))
+    if isinstance(v, list):
+        return tuple(_freeze(x) for x in v)
+    if isinstance(v, tuple) and len(v) == 2:
+        return _freeze(v[0])
+    return v
+
+
+def record_fingerprint(record):
+    """A fingerprint of schedule params
+
+    Two params have the same fingerprint if they have the same str(),
+    it is the hash of the tuple of their hidden values, so no string is built.
+    The hash changes between processes, do not store it.
+
+    Parameters
+    ----------
+    record: any object with to_json()
+
+    Returns
+    -------
+    int
+    """
+    return hash(_freeze(record.to_json()))
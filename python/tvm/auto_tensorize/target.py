@@ -1,10 +1,18 @@
+import os
 import tvm
+import copy
+import json
 import math
 from pebble import ProcessPool
 from concurrent.futures import TimeoutError
 
 
-supported_target = ["cuda", "opencl", "llvm -mcpu=skylake-avx512"]
+llvm_targets = [
+    "llvm -mcpu=skylake-avx512",
+    "llvm -mcpu=cascadelake",
+    "llvm -mcpu=sapphirerapids",
+]
+supported_target = ["cuda", "opencl"] + llvm_targets
 
 
 def get_vector_bitwidth(target):
@@ -13,7 +21,7 @@ def get_vector_bitwidth(target):
         return 128
     elif target == "opencl":
         return 128
-    elif target == "llvm -mcpu=skylake-avx512":
+    elif target in llvm_targets:
         return 256
 
 
@@ -113,138 +121,174 @@ class Mali(AcceleratorTarget):
         return self._arch_params[self.arch][4]
 
 
-class TENET(AcceleratorTarget):
-    def __init__(self, arch="gemm"):
+class X86(AcceleratorTarget):
+    # register_bytes, l1_bytes, l2_bytes, num_cores
+    # register_bytes counts 32 zmm registers, plus 8 1KB tiles for AMX
+    _arch_params = {
+        "skylake-avx512": (32 * 64, 32 * 2**10, 2**20, 28),
+        "cascadelake": (32 * 64, 32 * 2**10, 2**20, 28),
+        "sapphirerapids": (32 * 64 + 8 * 2**10, 48 * 2**10, 2 * 2**20, 56),
+    }
+
+    def __init__(self, arch="skylake-avx512"):
         self.arch = arch
 
-    # def get_shared_memory_bytes(self):
-    #     if self.arch == "gemm":
-    #         return 48 * 2**12
-    #     else:
-    #         raise RuntimeError(f"Unknown arch: {self.arch}")
-
-    # def get_register_bytes_per_thread(self):
-    #     if self.arch == "gemm":
-    #         return 256
-    #     else:
-    #         raise RuntimeError(f"Unknown arch: {self.arch}")
-
-    # def max_threads(self):
-    #     if self.arch == "gemm":
-    #         return 1024
-    #     else:
-    #         raise RuntimeError(f"Unknown arch: {self.arch}")
-
-    # def max_blocks(self):
-    #     if self.arch == "gemm":
-    #         return 2**16
-    #     else:
-    #         raise RuntimeError(f"Unknown arch: {self.arch}")
+    @classmethod
+    def from_target(cls, target):
+        assert target in llvm_targets, target
+        return cls(str(target).split("-mcpu=")[1])
 
-    def compute_latency(self):
-        if self.arch == "gemm":
-            return 64
-        elif self.arch == "axpy":
-            return 2
-        elif self.arch == "conv":
-            return 32 + math.log2(16)
-        elif self.arch == "cuda":
-            return 64
+    def get_register_bytes(self):
+        return self._arch_params[self.arch][0]
+
+    def get_l1_bytes(self):
+        return self._arch_params[self.arch][1]
+
+    def get_l2_bytes(self):
+        return self._arch_params[self.arch][2]
+
+    def max_threads(self):
+        return self._arch_params[self.arch][3]
+
+
+def _tenet_spec(compute_latency, levels):
+    return {
+        "compute_latency": compute_latency,
+        "levels": [
+            {"scope": scope, "size": size, "bandwidth": bandwidth, "parallelism": parallelism}
+            for scope, size, bandwidth, parallelism in levels
+        ],
+    }
+
+
+# levels are inner --> outer, bandwidth None means unbounded
+# scope, size, bandwidth (fp16), parallelism
+TENET_BUILTIN_SPECS = {
+    "gemm": _tenet_spec(
+        64,
+        [
+            ("local", 2**13, 16, 1),  # each subcore has one PE array
+            ("shared", 64 * 2**10, 256, 4),  # each core has 4 subcores
+            ("global", 40 * 2**30, None, 80),  # each device has 80 cores
+        ],
+    ),
+    "axpy": _tenet_spec(
+        2,
+        [
+            ("local", 2**13, 16, 1),
+            ("shared", 64 * 2**10, 256, 4),
+            ("global", 40 * 2**30, None, 80),
+        ],
+    ),
+    "conv": _tenet_spec(
+        32 + math.log2(16),
+        [
+            ("local", 2**13, 16, 1),
+            ("shared", 64 * 2**10, 256, 4),
+            ("global", 40 * 2**30, None, 80),
+        ],
+    ),
+    "cuda": _tenet_spec(
+        64,
+        [
+            ("local", 64 * 2**10, 16, 1),
+            ("shared", 128 * 2**10, 10, 4),
+            ("global", 16 * 2**30, 256, 84),
+        ],
+    ),
+}
+
+
+def load_tenet_spec(filename):
+    """Load a TENET accelerator spec from a json or yaml file
+
+    The spec looks like
+    {
+        "compute_latency": 64,
+        "levels": [  # inner --> outer
+            {"scope": "local", "size": 8192, "bandwidth": 16, "parallelism": 1},
+            ...
+        ]
+    }
+    """
+    with open(filename, "r") as fin:
+        if filename.endswith(".yaml") or filename.endswith(".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("Loading %s requires pyyaml." % filename)
+            spec = yaml.safe_load(fin)
         else:
-            raise RuntimeError(f"Unknown arch: {self.arch}")
+            spec = json.load(fin)
+    return spec
+
+
+class TENET(AcceleratorTarget):
+    def __init__(self, arch="gemm", spec=None):
+        """
+        arch: str
+            a builtin arch in TENET_BUILTIN_SPECS or a spec file
+        spec: optional dict
+            the spec to use instead of arch
+        """
+        self.arch = arch
+        if spec is None:
+            if arch in TENET_BUILTIN_SPECS:
+                spec = TENET_BUILTIN_SPECS[arch]
+            elif os.path.isfile(arch):
+                spec = load_tenet_spec(arch)
+            else:
+                raise RuntimeError(f"Unknown arch: {self.arch}")
+        self.spec = copy.deepcopy(spec)
+        self.levels = self.spec["levels"]
+        if len(self.levels) == 0:
+            raise RuntimeError(f"No memory level in arch: {self.arch}")
+        self.scope_levels = {level["scope"]: level for level in self.levels}
+
+    def num_levels(self):
+        return len(self.levels)
+
+    def compute_latency(self):
+        return self.spec["compute_latency"]
+
+    def _level_of_scope(self, scope):
+        if scope not in self.scope_levels:
+            raise RuntimeError(f"Unknown scope {scope} in arch: {self.arch}")
+        return self.scope_levels[scope]
 
     def memory_bandwidth(self, scope):
-        if self.arch == "gemm":
-            bandwith = { # fp16
-                "global": float("inf"),  # not used
-                "shared": 256,
-                "local": 16
-            }
-            return bandwith[scope]
-        elif self.arch == "axpy":
-            bandwith = { # fp16
-                "global": float("inf"),  # not used
-                "shared": 256,
-                "local": 16
-            }
-            return bandwith[scope]
-        elif self.arch == "conv":
-            bandwith = { # fp16
-                "global": float("inf"),  # not used
-                "shared": 256,
-                "local": 16
-            }
-            return bandwith[scope]
-        elif self.arch == "cuda":
-            bandwith = { # fp16
-                "global": 256,  # not used
-                "shared": 10,
-                "local": 16
-            }
-            return bandwith[scope]
-        else:
-            raise RuntimeError(f"Unknown arch: {self.arch}")
+        bandwidth = self._level_of_scope(scope)["bandwidth"]
+        return float("inf") if bandwidth is None else bandwidth
 
     def parallelism(self, level):
-        if self.arch == "gemm":
-            parallelism = {
-                0: 1, # each subcore has one PE array
-                1: 4, # each core has 4 subcores
-                2: 80 # each device has 80 cores
-            }
-            return parallelism[level]
-        elif self.arch == "axpy":
-            parallelism = {
-                0: 1, # each subcore has one PE array
-                1: 4, # each core has 1 subcores
-                2: 80 # each device has 28 cores
-            }
-            return parallelism[level]
-        elif self.arch == "conv":
-            parallelism = {
-                0: 1, # each subcore has one PE array
-                1: 4, # each core has 4 subcores
-                2: 80 # each device has 80 cores
-            }
-            return parallelism[level]
-        elif self.arch == "cuda":
-            parallelism = {
-                0: 1, # each subcore has one PE array
-                1: 4, # each core has 4 subcores
-                2: 84 # each device has 80 cores
-            }
-            return parallelism[level]
-        else:
-            raise RuntimeError(f"Unknown arch: {self.arch}")
+        if level >= len(self.levels):
+            raise RuntimeError(f"Unknown level {level} in arch: {self.arch}")
+        return self.levels[level]["parallelism"]
 
     def memory_size(self, scope):
-        if self.arch == "gemm":
-            size = {
-                "global": 40 * 2**30,  # 40 GB
-                "shared": 64 * 2**10,  # 64 KB
-                "local": 2**13  # 8 KB
-            }
-            return size[scope]
-        if self.arch == "axpy":
-            size = {
-                "global": 40 * 2**30,  # 40 GB
-                "shared": 64 * 2**10,  # 6 KB
-                "local": 2**13  # 8 KB
-            }
-            return size[scope]
-        if self.arch == "conv":
-            size = {
-                "global": 40 * 2**30,  # 40 GB
-                "shared": 64 * 2**10,  # 64 KB
-                "local": 2**13  # 8 KB
-            }
-            return size[scope]
-        if self.arch == "cuda":
-            size = {
-                "global": 16 * 2**30,  # 16 GB
-                "shared": 128 * 2**10,  # 128 KB
-                "local": 64 * 2**10  # 64 KB
-            }
-            return size[scope]
-        else:
-            raise RuntimeError(f"Unknown arch: {self.arch}")
+        return self._level_of_scope(scope)["size"]
+
+    def on_chip_memory(self):
+        """Bytes of all the levels but the outermost one"""
+        return sum([level["size"] for level in self.levels[:-1]])
+
+    def update(self, params):
+        """
+        params: dict
+            "compute_latency" or "<scope>.<key>" --> value,
+            e.g., {"local.parallelism": 4, "shared.size": 32768}
+        ---
+        Returns:
+        TENET with the params replaced
+        """
+        spec = copy.deepcopy(self.spec)
+        scope_levels = {level["scope"]: level for level in spec["levels"]}
+        for key, value in params.items():
+            if key == "compute_latency":
+                spec[key] = value
+                continue
+            scope, name = key.rsplit(".", 1)
+            if scope not in scope_levels or name not in scope_levels[scope]:
+                raise RuntimeError(f"Unknown param {key} in arch: {self.arch}")
+            scope_levels[scope][name] = value
+        return TENET(arch=self.arch, spec=spec)
@@ -339,6 +339,10 @@ class MappingApplier(object):
         )
         self.verbose = verbose
         self.strict = strict
+        # (record, drop_output) --> mapped state
+        self.state_cache = {}
+        # (record, drop_output) --> the error of an infeasible mapping
+        self.infeasible_cache = {}
 
     def apply_virtual_mapping(self, record, state, drop_output=False):
         # vmap
@@ -499,6 +503,43 @@ class MappingApplier(object):
         return fold_state
 
     def apply(self, record, drop_output=False):
-        state = self.apply_virtual_mapping(record, self.init_state, drop_output)
-        state = self.apply_concrete_mapping(record, state, drop_output)
+        """Map the main op by record, the results are cached per record
+
+        A RuntimeError is raised for an infeasible mapping, and raised
+        again without calling into FFI when the record is applied later.
+        """
+        key = (record.as_tuple(), drop_output)
+        if key in self.state_cache:
+            return self.state_cache[key]
+        if key in self.infeasible_cache:
+            raise RuntimeError(self.infeasible_cache[key])
+        try:
+            state = self.apply_virtual_mapping(record, self.init_state, drop_output)
+            state = self.apply_concrete_mapping(record, state, drop_output)
+        except RuntimeError as e:
+            self.infeasible_cache[key] = str(e)
+            raise
+        self.state_cache[key] = state
         return state
+
+    def is_feasible(self, record, drop_output=False):
+        try:
+            self.apply(record, drop_output=drop_output)
+            return True
+        except RuntimeError:
+            return False
+
+    def apply_all(self, records, drop_output=False):
+        """Validate and map all the records in one pass
+
+        Returns
+        -------
+        list of (record, MappingState) for the feasible records
+        """
+        ret = []
+        for record in records:
+            try:
+                ret.append((record, self.apply(record, drop_output=drop_output)))
+            except RuntimeError:
+                pass
+        return ret
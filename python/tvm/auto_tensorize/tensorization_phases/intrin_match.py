@@ -4,6 +4,10 @@ from ..target import *
 import tvm
 import tvm._ffi
 import tvm.te as te
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from .. import _ffi_api
 
 
@@ -102,6 +106,115 @@ def intrinsic_match(target: te.Tensor, intrin: te.Tensor, main_hw_abs: te.Tensor
     return results
 
 
+class LRUCache(object):
+    """A thread-safe dict that only keeps the capacity most recently used items"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key not in self.items:
+                return default
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def setdefault(self, key, value):
+        with self.lock:
+            if key not in self.items:
+                self.items[key] = value
+                while len(self.items) > self.capacity:
+                    self.items.popitem(last=False)
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.capacity:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self):
+        return len(self.items)
+
+
+# (hw_abs_dag class, compute_key, shape_key) --> (intrin_dag, main_tensors)
+EFFECTIVE_DAG_CACHE = LRUCache(256)
+# (op structure, intrin main op) --> (matched, list of {target axis index: intrin IterVar})
+MATCH_CACHE = LRUCache(4096)
+
+
+def get_op_structure_key(op):
+    """A key shared by ops with the same computation
+
+    The key is independent of object identity and of the names of op,
+    its axes and its inputs, the names are replaced by their positions.
+    """
+    if not isinstance(op, te.ComputeOp):
+        return None
+    axes = list(op.axis) + list(op.reduce_axis)
+    names = {}
+    for i, iv in enumerate(axes):
+        names[iv.var.name] = "v%d" % i
+    for i, t in enumerate(op.input_tensors):
+        names[t.name] = "t%d" % i
+    body = str(list(op.body))
+    if len(names) == len(axes) + len(op.input_tensors):
+        pattern = re.compile(
+            r"\b(%s)\b" % "|".join([re.escape(x) for x in sorted(names, key=len, reverse=True)])
+        )
+        body = pattern.sub(lambda m: names[m.group(0)], body)
+    else:
+        # repeated names are ambiguous, only identical names share the key
+        body = str((body, sorted(names.keys())))
+    extents = [str(iv.dom.extent) for iv in axes]
+    inputs = [(str(list(t.shape)), t.dtype) for t in op.input_tensors]
+    return (body, str(extents), str(inputs))
+
+
+def clear_match_cache():
+    EFFECTIVE_DAG_CACHE.clear()
+    MATCH_CACHE.clear()
+
+
+def cached_intrinsic_match(op, intrin_tensor, main_op):
+    """intrinsic_match memoized on the structure of op
+
+    Matched target axes are remembered by their positions, so another op
+    with the same structure reuses the result with its own IterVars.
+    """
+    op_key = get_op_structure_key(op)
+    if op_key is None:
+        return intrinsic_match(op.output(0), intrin_tensor, main_op)
+    key = (op_key, main_op)
+    axes = list(op.axis) + list(op.reduce_axis)
+    cached = MATCH_CACHE.get(key, None)
+    if cached is not None:
+        found, points = cached
+        if not found:
+            return {}
+        return {op: [{axes[i]: iiv for i, iiv in point.items()} for point in points]}
+    results = intrinsic_match(op.output(0), intrin_tensor, main_op)
+    if any([not x.same_as(op) for x in results.keys()]):
+        # only cache the results of op itself
+        return results
+    index = {tiv: i for i, tiv in enumerate(axes)}
+    points = []
+    for point in results.get(op, []):
+        if any([tiv not in index for tiv in point.keys()]):
+            return results
+        points.append({index[tiv]: iiv for tiv, iiv in point.items()})
+    MATCH_CACHE.put(key, (op in results, points))
+    return results
+
+
 def intrinsic_multi_match(target_dag, intrin_dag, main_op):
     intrin_tensors = list(intrin_dag.tensors)
     # TODO: (yicheng) remove such constraints, do a general DAG match
@@ -109,11 +222,22 @@ def intrinsic_multi_match(target_dag, intrin_dag, main_op):
     results = {}
     intrin_tensor = intrin_tensors[0]
     for op in target_dag.op_lst:
-        tmp = intrinsic_match(op.output(0), intrin_tensor, main_op)
+        tmp = cached_intrinsic_match(op, intrin_tensor, main_op)
         results.update(tmp)
     return results
 
 
+def get_effective_compute_dag(hw_abs_dag, compute_key, shape_key):
+    key = (type(hw_abs_dag), compute_key, shape_key)
+    cached = EFFECTIVE_DAG_CACHE.get(key, None)
+    if cached is not None:
+        return cached
+    ret = hw_abs_dag.get_effective_compute_dag(compute_key, shape_key)
+    # keep the first one so that all the results share the same intrin IterVars,
+    # the match results of an evicted one are keyed by its main op and age out
+    return EFFECTIVE_DAG_CACHE.setdefault(key, ret)
+
+
 def get_match_result_with_hw_abs_dag(target_dag, hw_abs_dag, compute_key, shape_key):
     """
     target_dag: ComputeDAG
@@ -121,7 +245,7 @@ def get_match_result_with_hw_abs_dag(target_dag, hw_abs_dag, compute_key, shape_
     compute_key: str
     shape_key: str
     """
-    intrin_dag, main_tensors = hw_abs_dag.get_effective_compute_dag(compute_key, shape_key)
+    intrin_dag, main_tensors = get_effective_compute_dag(hw_abs_dag, compute_key, shape_key)
     # target_tensors = list(target_dag.tensors)
     # intrin_tensors = list(intrin_dag.tensors)
     # TODO: (yicheng) remove such constraints, do a general DAG match
@@ -165,17 +289,29 @@ def get_match_result_with_hw_abs_dag(target_dag, hw_abs_dag, compute_key, shape_
     return match_results
 
 
-def get_match_results(target_dag, target):
+def get_match_results(target_dag, target, n_parallel=1):
     """
     target_dag: ComputeDAG
     target: str
+    n_parallel: int
+        number of threads to match (compute_key, shape_key) pairs
     """
-    ret = []
+    tasks = []
     for hw_abs_dag_cls in query_hw_abs_dag(target):
         hw_abs_dag = hw_abs_dag_cls()
         for compute_key in hw_abs_dag.get_all_compute_keys():
             for shape_key in hw_abs_dag.get_all_shape_keys():
-                ret.extend(
-                    get_match_result_with_hw_abs_dag(
-                        target_dag, hw_abs_dag, compute_key, shape_key))
+                tasks.append((target_dag, hw_abs_dag, compute_key, shape_key))
+
+    def worker(task):
+        return get_match_result_with_hw_abs_dag(*task)
+
+    if n_parallel > 1:
+        with ThreadPoolExecutor(n_parallel) as pool:
+            results = list(pool.map(worker, tasks))
+    else:
+        results = [worker(task) for task in tasks]
+    ret = []
+    for result in results:
+        ret.extend(result)
     return ret
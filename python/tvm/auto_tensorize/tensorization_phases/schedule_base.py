@@ -1,4 +1,5 @@
 import tvm
+import numpy as np
 from ..utils import *
 from ..target import *
 from ..search import CDParamGenerator, SAEntryGenerator
@@ -24,6 +25,8 @@ class ScheduleComputeInfo(object):
 class SplitFactorGenerator(CDParamGenerator):
     def __init__(self, extent, parts):
         assert isinstance(extent, int)
+        self.extent = extent
+        self.parts = parts
         factor_list = any_factor_split(extent, parts)
         self.choices, self.factor_map, dim, sum_val = remap_factors(
             factor_list)
@@ -62,6 +65,24 @@ class SplitFactorGenerator(CDParamGenerator):
     def diameter(self):
         return len(self.factor_map)
 
+    def project(self, factors):
+        """Find the valid split closest to factors of another extent
+
+        Parameters
+        ----------
+        factors: list of int
+            split factors, possibly of a different extent
+
+        Returns
+        -------
+        list of int
+        """
+        assert len(factors) == self.parts
+        target = np.log2(np.array(factors, dtype="float64"))
+        choices = np.array([self.map_from_hidden(x) for x in self.choices], dtype="float64")
+        dist = np.abs(np.log2(choices) - target).sum(axis=1)
+        return self.map_from_hidden(self.choices[int(np.argmin(dist))])
+
 
 class VectorizeLengthGenerator(CDParamGenerator):
     def __init__(self, target, dtype):
@@ -1,4 +1,5 @@
 import json
+import math
 from ...utils import *
 from ...target import *
 from ...search import CDParamGenerator, Entry, SAEntryGenerator
@@ -121,6 +122,7 @@ class CUDAScheduleGeneratorV2(AcceleratorScheduleGenerator):
         self.last_op_tiling_parts = last_tiling
         self.arch_info = CUDA(arch=arch)
         self.warp_size = self.arch_info.get_warp_size()
+        self.init_resource_model()
         # params generator
         self.init_param_generator()
         self.init_score_table()
@@ -209,6 +211,118 @@ class CUDAScheduleGeneratorV2(AcceleratorScheduleGenerator):
             self.hw_abs_dag.scope,
         )
 
+    def init_resource_model(self):
+        """Find the axes of the main op used by each of its inputs
+
+        valid uses them to estimate the shared memory and fragments
+        of a record from its split factors before lowering
+        """
+        reserve_spatial_num = int(self.hw_abs_dag_stage.reserve_inner_axis_count[self.main_op])
+        split_spatial_num = len(self.main_op.axis) - reserve_spatial_num
+        reserve_reduce_axis = set(
+            [int(x) for x in self.hw_abs_dag_stage.main_op_reserve_reduce_axis]
+        )
+        # var -> (kind, the index of the split factors or the extent)
+        axis_role = {}
+        for i, iv in enumerate(self.main_op.axis):
+            if i < split_spatial_num:
+                axis_role[iv.var] = ("spatial", i)
+            else:
+                axis_role[iv.var] = ("fragment", int(iv.dom.extent))
+        split_id = 0
+        for i, iv in enumerate(self.main_op.reduce_axis):
+            if i in reserve_reduce_axis:
+                axis_role[iv.var] = ("fragment", int(iv.dom.extent))
+            else:
+                axis_role[iv.var] = ("reduce", split_id)
+                split_id += 1
+
+        accesses = {}
+
+        def _collect(roles):
+            def _inner(node):
+                if isinstance(node, tvm.tir.Var) and node in axis_role:
+                    roles.add(axis_role[node])
+
+            return _inner
+
+        def _visit(node):
+            if isinstance(node, tvm.tir.ProducerLoad):
+                roles = accesses.setdefault(node.producer, set())
+                for index in node.indices:
+                    tvm.tir.stmt_functor.post_order_visit(index, _collect(roles))
+
+        for body in self.main_op.body:
+            tvm.tir.stmt_functor.post_order_visit(body, _visit)
+
+        def _bytes(dtype):
+            return tvm.runtime.DataType(dtype).bits // 8
+
+        # (roles, bytes in shared memory, bytes in fragment)
+        self.main_op_input_access = []
+        for t in self.main_op.input_tensors:
+            roles = list(accesses.get(t, set()))
+            operation_role = self.hw_abs_dag_stage.operation_role
+            if (
+                t.op in operation_role
+                and operation_role[t.op] == OperationRole.load_op
+                and len(t.op.input_tensors) > 0
+            ):
+                shared_bytes = _bytes(t.op.input_tensors[0].dtype)
+            else:
+                shared_bytes = 0
+            self.main_op_input_access.append((roles, shared_bytes, _bytes(t.dtype)))
+        # the accumulator fragments
+        self.main_op_output_access = (
+            [("spatial", i) for i in range(split_spatial_num)]
+            + [("fragment", int(iv.dom.extent)) for iv in self.main_op.axis[split_spatial_num:]],
+            _bytes(self.main_op.output(0).dtype),
+        )
+        self.max_shared_memory_bytes = self.arch_info.get_shared_memory_bytes()
+        self.max_register_bytes_per_warp = (
+            self.arch_info.get_register_bytes_per_thread() * self.warp_size
+        )
+
+    def _footprint(self, record, roles, spatial_level, reduce_level):
+        """The number of elements accessed through roles
+
+        spatial_level: the first spatial split level inside the tile
+        reduce_level: the first reduce split level inside the tile
+        """
+        ret = 1
+        for kind, v in roles:
+            if kind == "fragment":
+                ret *= v
+            elif kind == "spatial" and v < len(record.spatial_factors):
+                ret *= reduce(lambda x, y: x * y, record.spatial_factors[v][0][spatial_level:], 1)
+            elif kind == "reduce" and v < len(record.reduce_factors):
+                ret *= reduce(lambda x, y: x * y, record.reduce_factors[v][0][reduce_level:], 1)
+        return ret
+
+    def estimate_shared_memory_bytes(self, record):
+        """The shared memory of one block
+
+        The inputs are cached at the outermost reduce level of the main op,
+        which is computed at the warp level of the output op, and the shared
+        buffers are shared by all the warps of the block.
+        """
+        total = 0
+        for roles, shared_bytes, _ in self.main_op_input_access:
+            total += self._footprint(record, roles, -2, 1) * shared_bytes
+        return total
+
+    def estimate_register_bytes(self, record):
+        """The fragments of one warp
+
+        The accumulators cover the per warp tile of the output op and the
+        input fragments are loaded at the second outermost reduce level.
+        """
+        roles, acc_bytes = self.main_op_output_access
+        total = self._footprint(record, roles, -1, 2) * acc_bytes
+        for roles, _, fragment_bytes in self.main_op_input_access:
+            total += self._footprint(record, roles, -1, 2) * fragment_bytes
+        return total
+
     def init_param_generator(self):
         # for main op reduce split
         self.reduce_splits = []
@@ -293,6 +407,14 @@ class CUDAScheduleGeneratorV2(AcceleratorScheduleGenerator):
         block_num = record.last_factors[0][0][0]
         if block_num > max_blocks:
             return False
+        # reject the records that can't fit before lowering them,
+        # with the same limits as CUDAProgramChecker
+        if self.estimate_shared_memory_bytes(record) > self.max_shared_memory_bytes:
+            return False
+        # thread level fragments are distributed to the threads of a warp
+        if self.hw_abs_dag_stage.instruction_scope == InstructionScope.warp:
+            if self.estimate_register_bytes(record) > self.max_register_bytes_per_warp:
+                return False
         return True
 
     def record_from_json(self, obj):
@@ -338,6 +460,88 @@ class CUDAScheduleGeneratorV2(AcceleratorScheduleGenerator):
             )
         return record
 
+    def project_record(self, obj):
+        """Project a record tuned for another shape onto this one
+
+        Parameters
+        ----------
+        obj: dict
+            the json object of a CUDAParamsV2 of the same compute_key/shape_key
+
+        Returns
+        -------
+        CUDAParamsV2 or None if the records have different structures
+        """
+        if (
+            len(obj["spatial_factors"]) != len(self.spatial_splits)
+            or len(obj["reduce_factors"]) != len(self.reduce_splits)
+            or len(obj["last_factors"]) != len(self.last_splits)
+        ):
+            return None
+
+        def closest(candidates, v):
+            return min(candidates, key=lambda x: abs(math.log2(x) - math.log2(v)))
+
+        # -1 is the direction used for records that are not from a mutation
+        return self.record_cls(
+            (obj["inline"][0], -1),
+            (closest(self.vectorize.lengths, obj["vectorize"][0]), -1),
+            [
+                (gen.project(x[0]), -1)
+                for gen, x in zip(self.spatial_splits, obj["spatial_factors"])
+            ],
+            [(gen.project(x[0]), -1) for gen, x in zip(self.reduce_splits, obj["reduce_factors"])],
+            [(gen.project(x[0]), -1) for gen, x in zip(self.last_splits, obj["last_factors"])],
+            (closest(self.unroll_output.steps, obj["output_unroll_step"][0]), -1),
+            (closest(self.unroll_last.steps, obj["last_unroll_step"][0]), -1),
+        )
+
+    def warm_start(self, database, prefix, num_workloads=3, topk=4):
+        """Seed the search with the best records of the nearest tuned shapes
+
+        Parameters
+        ----------
+        database: TuningDatabase
+        prefix: str
+            the key prefix shared by compatible workloads,
+            see make_tuning_key_prefix
+        num_workloads: int
+            how many nearest workloads to use
+        topk: int
+            how many records to take from each workload
+
+        Returns
+        -------
+        the number of seeds
+        """
+        own = [gen.extent for gen in self.spatial_splits + self.reduce_splits]
+        candidates = []
+        for key in database.keys(prefix):
+            if key == self.database_key:
+                continue
+            top = database.topk(key, k=topk)
+            if not top:
+                continue
+            obj = top[0][0]
+            factors = obj["spatial_factors"] + obj["reduce_factors"]
+            if len(factors) != len(own):
+                continue
+            # the split factors of an axis multiply to its extent
+            extents = [reduce(lambda x, y: x * y, x[0], 1) for x in factors]
+            dist = sum([abs(math.log2(a) - math.log2(b)) for a, b in zip(extents, own)])
+            candidates.append((dist, top))
+        candidates = sorted(candidates, key=lambda x: x[0])
+        seeds = []
+        for dist, top in candidates[:num_workloads]:
+            for obj, value in top:
+                record = self.project_record(obj)
+                if record is not None:
+                    seeds.append(record)
+        self.add_seeds(seeds)
+        if self.verbose_init:
+            print("Warm start with %d records from similar shapes" % len(seeds), flush=True)
+        return len(seeds)
+
     def get_records_mutate_one_generator(self, record, to_mutate, steps):
         inline = record.inline
         vec = record.vectorize
@@ -92,7 +92,7 @@ class TenetScheduleGenerator(AcceleratorScheduleGenerator):
         self.reduce_tiling_parts = reduce_tiling
         self.spatial_tiling_parts = spatial_tiling
         self.last_op_tiling_parts = last_tiling
-        self.arch_info = TENET(arch=arch)
+        self.arch_info = TENET(arch=arch) if arch else None
         # self.warp_size = self.arch_info.get_warp_size()
         # params generator
         self.init_param_generator()
@@ -23,6 +23,7 @@ import tvm._ffi
 from tvm._ffi.base import _LIB, check_call, c_array, string_types, _FFI_MODE
 from tvm._ffi.runtime_ctypes import DataType, TVMContext, TVMArray, TVMArrayHandle
 from tvm._ffi.runtime_ctypes import DataTypeCode, tvm_shape_index_t
+from . import _ffi_api
 
 try:
     # pylint: disable=wrong-import-position
@@ -181,6 +182,25 @@ class NDArray(NDArrayBase):
         check_call(_LIB.TVMArrayCopyToBytes(self.handle, data, nbytes))
         return np_arr
 
+    def _create_view(self, shape, dtype=None):
+        """Create a view of this array that shares its memory
+
+        Parameters
+        ----------
+        shape : tuple of int
+            The shape of the view, must not be larger than this array.
+
+        dtype : str, optional
+            The data type of the view, default is the data type of this array.
+
+        Returns
+        -------
+        view : NDArray
+        """
+        if dtype is None:
+            dtype = self.dtype
+        return _ffi_api.TVMArrayCreateView(self, str(dtype), *[int(x) for x in shape])
+
     def copyto(self, target):
         """Copy array to target
 
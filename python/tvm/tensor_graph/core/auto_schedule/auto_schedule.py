@@ -12,6 +12,8 @@ import copy
 import json
 import time
 import math
+import re
+import hashlib
 
 from functools import reduce
 from .schedule_state import RealScheduleState
@@ -31,6 +33,7 @@ from tvm.auto_scheduler.cost_model import RandomModel, XGBModel
 from tvm.auto_scheduler.search_policy import SketchPolicy
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 
 def interpret_cuda_schedule(sch, tensors, subgraph, multi_entity, hd_config, debug=sys.stdout):
@@ -112,7 +115,23 @@ def build_func(sch, args, target, target_host, name, binds):
 
 
 class TGAutoScheduleContext(object):
-    def __init__(self, name, top_log_dir, subgraph, measure_option, verbose=False):
+    scheduler_name = "tg"
+    # defaults for all TG contexts, can be overridden per context
+    search_group_size = 10
+    build_parallel = 1
+    run_parallel = 1
+
+    def __init__(
+        self,
+        name,
+        top_log_dir,
+        subgraph,
+        measure_option,
+        verbose=False,
+        search_group_size=None,
+        build_parallel=None,
+        run_parallel=None,
+    ):
         self.measure_option = measure_option
         self.target = tvm.target.Target(measure_option.target)
         self.name = name
@@ -125,6 +144,14 @@ class TGAutoScheduleContext(object):
         self.result = None
         self.counter = 0
         self.total_trials = 0
+        if search_group_size is not None:
+            self.search_group_size = search_group_size
+        if build_parallel is not None:
+            self.build_parallel = build_parallel
+        if run_parallel is not None:
+            self.run_parallel = run_parallel
+        self.builder = at.pebble_schedule_builder_build
+        self.runner = at.pebble_local_runner_run
 
         if os.path.exists(self.log_name) and os.path.isfile(self.log_name):
             with open(self.log_name, "r") as fin:
@@ -154,22 +181,37 @@ class TGAutoScheduleContext(object):
     def __del__(self):
         self.logger.close()
 
+    def get_new_schedules(self, number):
+        """At most number new proposals, the failed ones are skipped"""
+        return tg.get_schedule_results(
+            self.name,
+            self.subgraph,
+            self.target,
+            self.measure_option.dev_id,
+            self.measure_option.timeout,
+            number,
+        )
+
     def get_new_schedule(self):
-        ret = None
-        while ret is None:
-            try:
-                ret = tg.get_schedule_result(
-                    self.name,
-                    self.subgraph,
-                    self.target,
-                    self.measure_option.dev_id,
-                    self.measure_option.timeout,
-                )
-            except Exception as e:
-                if self.verbose:
-                    print(e)
-                pass
-        return ret
+        results = self.get_new_schedules(1)
+        return results[0] if results else None
+
+    def measure(self, results):
+        """Build and run the proposals in the pebble pools, returns ms"""
+        build_results = self.builder(
+            [result.schedule for result in results],
+            [result.tensors for result in results],
+            self.measure_option,
+            n_parallel=self.build_parallel,
+        )
+        run_results = self.runner(build_results, self.measure_option, n_parallel=self.run_parallel)
+        timecosts = []
+        for res in run_results:
+            if res.error_no == 0:
+                timecosts.append(np.mean([x.value for x in res.costs]) * 1e3)
+            else:
+                timecosts.append(at.MAX_FLOAT)
+        return timecosts
 
     def count(self):
         self.counter = (self.counter + 1) % 16
@@ -184,25 +226,17 @@ class TGAutoScheduleContext(object):
         print("Autoscheduling %s by %d trials..." %
               (self.log_name, trials), flush=True)
         self.total_trials += trials
-        search_group_size = 10
+        search_group_size = self.search_group_size
         iterations = (trials + search_group_size - 1) // search_group_size
         beg = time.time()
         for i in range(iterations):
-            schs = []
-            args_lst = []
-            results = []
-            for j in range(search_group_size):
-                # this one is get new schedule
-                result = self.get_new_schedule()
-                # measure current result
-                results.append(result)
-                sch = result.schedule
-                args = result.tensors
-                schs.append(sch)
-                args_lst.append(args)
-
-            timecosts = at.evaluate_schedules(
-                schs, args_lst, self.measure_option)
+            # one FFI call proposes the whole group
+            results = self.get_new_schedules(search_group_size)
+            if not results:
+                print(".X", end="", flush=True)
+                continue
+
+            timecosts = self.measure(results)
 
             for result, timecost in zip(results, timecosts):
                 # timecost = 1.0
@@ -241,6 +275,22 @@ class TGAutoScheduleContext(object):
         else:
             return None, None, at.MAX_FLOAT
 
+    def get_best_record(self):
+        if self.best_result is None:
+            return None
+        entity = tg.multi_schedule_entity_to_string(self.best_result.schedule_entities)
+        return {"scheduler": self.scheduler_name, "entity": entity}
+
+    def install(self, record, cost):
+        """Use a record of get_best_record as the best schedule if it is better"""
+        perf = 1.0 / (cost + 1e-10)
+        if perf > self.best_perf:
+            entity = tg.string_to_multi_schedule_entity(record["entity"])
+            self.best_result = tg.get_schedule_result_from_entity(
+                self.name, self.subgraph, self.target, entity
+            )
+            self.best_perf = perf
+
     def get_measure_opt(self):
         return self.measure_option
 
@@ -467,6 +517,9 @@ class AutoTensorizeContextV2(object):
             self.gen.load_from_file(self.log_name)
         self.app = at.MappingApplier(
             self.match_result, verbose=True, strict=False)
+        # checks the sampled mappings quietly
+        self.check_app = at.MappingApplier(
+            self.match_result, verbose=False, strict=False)
 
         class ScheduleContext:
             def __init__(self, schedule_gen, schedule_app, sc_info, checker, generate_schedule):
@@ -509,12 +562,8 @@ class AutoTensorizeContextV2(object):
                 feasible = False
                 while not feasible:
                     record = self.gen.get_next(policy="random")
-                    try:
-                        tmp_app = at.MappingApplier(
-                            self.match_result, strict=False)
-                        tmp_app.apply(record, drop_output=self.drop_output)
-                        feasible = True
-                    except RuntimeError as e:
+                    feasible = self.check_app.is_feasible(record, drop_output=self.drop_output)
+                    if not feasible:
                         print("Catch an infeasible mapping:", flush=True)
                         print(record, flush=True)
             else:
@@ -717,6 +766,8 @@ class AutoTensorizeContextV2(object):
 
 
 class AutoTensorizeContextV3(object):
+    scheduler_name = "auto_tensorize_v3"
+
     @classmethod
     def can_use(cls, name, top_log_dir, subgraph, measure_option):
         target_dag = at.compute_dag_from_tensors(
@@ -770,20 +821,17 @@ class AutoTensorizeContextV3(object):
             self.all_matches.append(match_result)
             gen = at.MappingGenerator(match_result)
             mappings = gen.get_all()
-            # filter out infeasible mappings
-            feasible_mappings = []
-            tmp_app = at.MappingApplier(match_result, strict=transform_strict)
-            for mapping in mappings:
-                try:
-                    tmp_app.apply(mapping, drop_output=self.drop_output)
-                    feasible_mappings.append(mapping)
-                except RuntimeError as e:
-                    pass
+            # filter out infeasible mappings, the mapped states are kept in app
+            app = at.MappingApplier(
+                match_result, verbose=False, strict=transform_strict)
+            feasible_mappings = app.apply_all(mappings, drop_output=self.drop_output)
             if len(feasible_mappings) == 0:
                 # relax
                 transform_strict = False
+                app = at.MappingApplier(
+                    match_result, verbose=False, strict=transform_strict)
             else:
-                mappings = feasible_mappings
+                mappings = [mapping for mapping, _ in feasible_mappings]
             # record the feasible mappings
             self.all_mappings.append(mappings)
             self.total_matchings += 1
@@ -792,8 +840,6 @@ class AutoTensorizeContextV3(object):
             self.mapping_weights.append(
                 [1.0 / len(mappings) for m in mappings])
             self.weights_updates.append([0.0 for m in mappings])
-            app = at.MappingApplier(
-                match_result, verbose=False, strict=transform_strict)
             self.appliers.append(app)
         assert self.total_mappings > 0
 
@@ -811,6 +857,9 @@ class AutoTensorizeContextV3(object):
         self.schedule_context_cache = {}
         self.best_value = 1 / at.MAX_FLOAT
         self.best_ctx = None
+        self.best_record = None
+        # (record, cost) from a schedule store
+        self.installed = None
         self.best_params = None
 
     def auto_schedule(self, trials):
@@ -1087,7 +1136,47 @@ class AutoTensorizeContextV3(object):
             raise RuntimeError("Do not support target: %s" % target)
         return schedule_gen, schedule_app, checker, sc_info
 
+    def get_schedule_from_record(self, record):
+        """Rebuild the schedule of {"mapping": mapping key, "params": params json}"""
+        for match_id in range(self.total_matchings):
+            match_result = self.all_matches[match_id]
+            app = self.appliers[match_id]
+            for mapping in self.all_mappings[match_id]:
+                if mapping.as_key() != record["mapping"]:
+                    continue
+                new_state = app.apply(mapping, drop_output=self.drop_output)
+                schedule_gen, schedule_app, checker, sc_info = self._get_schedule_ctx(
+                    match_result, new_state, os.path.devnull
+                )
+                params = schedule_gen.record_from_json(record["params"])
+                return at.get_schedule(schedule_app, params)
+        return None, None
+
+    def install(self, record, cost):
+        """Use a record of get_best_record as the best schedule if it is better"""
+        if self.installed is None or cost < self.installed[1]:
+            self.installed = (record, cost)
+
+    def get_best_record(self):
+        if self.best_record is None:
+            return None
+        return {
+            "scheduler": self.scheduler_name,
+            "mapping": self.best_record["mapping"],
+            "params": self.best_record["params"],
+        }
+
     def get_best_schedule(self):
+        sch, args, cost = self.get_tuned_best_schedule()
+        if self.installed is not None and self.installed[1] < cost:
+            record, installed_cost = self.installed
+            installed_sch, installed_args = self.get_schedule_from_record(record)
+            if installed_sch is not None:
+                self.best_record = record
+                return installed_sch, installed_args, installed_cost
+        return sch, args, cost
+
+    def get_tuned_best_schedule(self):
         best_sch = None
         best_args = None
         best_mapping = None
@@ -1119,6 +1208,7 @@ class AutoTensorizeContextV3(object):
                     params_obj = best_mapping_params["params"]
                     params = schedule_gen.record_from_json(params_obj)
                     sch, args = at.get_schedule(schedule_app, params)
+                    self.best_record = best_mapping_params
                     return sch, args, best_mapping_params["cost"]
                 current_log_file = os.path.join(
                     self.log_dir, "at:" + self.name +
@@ -1156,51 +1246,106 @@ class AutoTensorizeContextV3(object):
                     "params": best_params.to_json(), "cost": best_cost}
                 string = json.dumps(obj)
                 fout.write(string)
+            self.best_record = obj
         return best_sch, best_args, best_cost
 
     def get_measure_opt(self):
         return self.measure_option
 
 
+def make_subgraph_key(target, tag):
+    """The key of a subgraph in a schedule store, shared by all models"""
+    return "%s|subgraph|%s" % (str(target), hashlib.md5(tag.encode()).hexdigest())
+
+
 class AutoScheduleGraphDispatch(object):
     working_set = {}
     results = {}
+    # task id --> (schedule store, subgraph key)
+    stores = {}
+    # tasks installed from a schedule store, which are not tuned again
+    frozen = set()
+
+    @classmethod
+    def create_from_store(cls, name, top_log_dir, subgraph, measure_option, record, cost):
+        if record["scheduler"] == TGAutoScheduleContext.scheduler_name:
+            ctx = TGAutoScheduleContext(name, top_log_dir, subgraph, measure_option)
+        elif record[
+            "scheduler"
+        ] == AutoTensorizeContextV3.scheduler_name and AutoTensorizeContextV3.can_use(
+            name, top_log_dir, subgraph, measure_option
+        ):
+            ctx = AutoTensorizeContextV3(name, top_log_dir, subgraph, measure_option)
+        else:
+            return None
+        ctx.install(record, cost)
+        return ctx
 
     @classmethod
     def add_task(
-        cls, name, top_log_dir, subgraph, measure_option, scheduler_option="auto_tensorize_v3"
+        cls,
+        name,
+        top_log_dir,
+        subgraph,
+        measure_option,
+        scheduler_option="auto_tensorize_v3",
+        schedule_store=None,
+        retune=False,
     ):
+        """
+        schedule_store: TuningDatabase
+            best schedules indexed by subgraph tag, shared across models and runs
+        retune: bool
+            whether to tune the subgraphs found in schedule_store
+        """
         use_at = 0
         next_id = len(AutoScheduleGraphDispatch.working_set)
-        if scheduler_option == "auto_tensorize_v3" or scheduler_option == "auto_tensorize":
-            if AutoTensorizeContextV3.can_use(name, top_log_dir, subgraph, measure_option):
-                ctx = AutoTensorizeContextV3(
-                    name, top_log_dir, subgraph, measure_option)
-                use_at = 1
-            else:
-                # fallback to TG
-                print("Fallback to TG")
+        stored = []
+        if schedule_store is not None:
+            key = make_subgraph_key(measure_option.target, subgraph.tag)
+            stored = schedule_store.topk(key, k=1)
+        ctx = None
+        if stored and not retune:
+            record, value = stored[0]
+            ctx = cls.create_from_store(
+                name, top_log_dir, subgraph, measure_option, record, 1 / value
+            )
+            if ctx is not None:
+                print("Reuse the stored schedule of %s" % name, flush=True)
+                use_at = int(isinstance(ctx, AutoTensorizeContextV3))
+                AutoScheduleGraphDispatch.frozen.add(next_id)
+        if ctx is None:
+            if scheduler_option == "auto_tensorize_v3" or scheduler_option == "auto_tensorize":
+                if AutoTensorizeContextV3.can_use(name, top_log_dir, subgraph, measure_option):
+                    ctx = AutoTensorizeContextV3(name, top_log_dir, subgraph, measure_option)
+                    use_at = 1
+                else:
+                    # fallback to TG
+                    print("Fallback to TG")
+                    ctx = TGAutoScheduleContext(name, top_log_dir, subgraph, measure_option)
+            elif scheduler_option == "auto_tensorize_v2":
+                if AutoTensorizeContextV2.can_use(name, top_log_dir, subgraph, measure_option):
+                    ctx = AutoTensorizeContextV2(name, top_log_dir, subgraph, measure_option)
+                    use_at = 1
+                else:
+                    # fallback to TG
+                    print("Fallback to TG")
+                    ctx = TGAutoScheduleContext(name, top_log_dir, subgraph, measure_option)
+            elif scheduler_option == "tg":
                 ctx = TGAutoScheduleContext(
                     name, top_log_dir, subgraph, measure_option)
-        elif scheduler_option == "auto_tensorize_v2":
-            if AutoTensorizeContextV2.can_use(name, top_log_dir, subgraph, measure_option):
-                ctx = AutoTensorizeContextV2(
-                    name, top_log_dir, subgraph, measure_option)
-                use_at = 1
+            elif scheduler_option == "ansor":
+                ctx = AnsorAutoScheduleContext(name, top_log_dir, subgraph, measure_option)
             else:
-                # fallback to TG
-                print("Fallback to TG")
-                ctx = TGAutoScheduleContext(
-                    name, top_log_dir, subgraph, measure_option)
-        elif scheduler_option == "tg":
-            ctx = TGAutoScheduleContext(
-                name, top_log_dir, subgraph, measure_option)
-        elif scheduler_option == "ansor":
-            ctx = AnsorAutoScheduleContext(
-                name, top_log_dir, subgraph, measure_option)
-        else:
-            raise RuntimeError("Unknown scheduler: %s" % scheduler_option)
+                raise RuntimeError("Unknown scheduler: %s" % scheduler_option)
+        if stored and next_id not in AutoScheduleGraphDispatch.frozen:
+            # start tuning from the stored schedule
+            record, value = stored[0]
+            if getattr(ctx, "scheduler_name", None) == record["scheduler"]:
+                ctx.install(record, 1 / value)
         AutoScheduleGraphDispatch.working_set[next_id] = ctx
+        if schedule_store is not None:
+            AutoScheduleGraphDispatch.stores[next_id] = (schedule_store, key)
         sch, args, perf = ctx.get_best_schedule()
         # if sch is not None:
         #   perf = at.evaluate_schedule(
@@ -1208,29 +1353,72 @@ class AutoScheduleGraphDispatch(object):
         # else:
         #   perf = at.MAX_FLOAT
         AutoScheduleGraphDispatch.results[next_id] = (sch, args, perf)
+        cls.save_to_store(next_id, perf)
         return next_id, ctx, use_at
 
+    @classmethod
+    def save_to_store(cls, tid, perf):
+        if tid not in AutoScheduleGraphDispatch.stores or perf >= at.MAX_FLOAT:
+            return
+        store, key = AutoScheduleGraphDispatch.stores[tid]
+        ctx = AutoScheduleGraphDispatch.working_set[tid]
+        if not hasattr(ctx, "get_best_record"):
+            return
+        best = store.topk(key, k=1)
+        # the store keeps 1/cost as value
+        if best and 1 / best[0][1] <= perf:
+            return
+        record = ctx.get_best_record()
+        if record is not None:
+            store.add(key, record, 1 / perf)
+
     @classmethod
     def remove_task(cls, task_id):
         if task_id in AutoScheduleGraphDispatch.working_set:
             del AutoScheduleGraphDispatch.working_set[task_id]
+        AutoScheduleGraphDispatch.stores.pop(task_id, None)
+        AutoScheduleGraphDispatch.frozen.discard(task_id)
+
+    @classmethod
+    def can_tune_concurrently(cls, ctx):
+        # TG proposals come from a process-wide scheduler map in C++ and
+        # Ansor measures through module-level states of auto_scheduler,
+        # so they stay serial
+        if isinstance(ctx, TGAutoScheduleContext):
+            return False
+        return hasattr(ctx, "builder") and hasattr(ctx, "runner")
 
     @classmethod
-    def auto_schedule(cls, selected_ids, trials_lst):
+    def auto_schedule(cls, selected_ids, trials_lst, n_parallel=1):
+        def tune(tid, trials):
+            ctx = AutoScheduleGraphDispatch.working_set[tid]
+            # if isinstance(ctx, TGAutoScheduleContext):
+            ctx.auto_schedule(trials)
+            sch, args, perf = ctx.get_best_schedule()
+            # if sch is not None:
+            #   perf = at.evaluate_schedule(
+            #     sch, args, ctx.get_measure_opt(), new_process=True)
+            # else:
+            #   perf = at.MAX_FLOAT
+            AutoScheduleGraphDispatch.results[tid] = (sch, args, perf)
+            cls.save_to_store(tid, perf)
+
+        concurrent_tasks = []
         for tid, trials in zip(selected_ids, trials_lst):
-            if not trials:
+            if not trials or tid in AutoScheduleGraphDispatch.frozen:
                 continue
             if tid in AutoScheduleGraphDispatch.working_set:
                 ctx = AutoScheduleGraphDispatch.working_set[tid]
-                # if isinstance(ctx, TGAutoScheduleContext):
-                ctx.auto_schedule(trials)
-                sch, args, perf = ctx.get_best_schedule()
-                # if sch is not None:
-                #   perf = at.evaluate_schedule(
-                #     sch, args, ctx.get_measure_opt(), new_process=True)
-                # else:
-                #   perf = at.MAX_FLOAT
-                AutoScheduleGraphDispatch.results[tid] = (sch, args, perf)
+                if n_parallel > 1 and cls.can_tune_concurrently(ctx):
+                    concurrent_tasks.append((tid, trials))
+                else:
+                    tune(tid, trials)
+        if concurrent_tasks:
+            with ThreadPoolExecutor(min(n_parallel, len(concurrent_tasks))) as pool:
+                futures = [pool.submit(tune, tid, trials) for tid, trials in concurrent_tasks]
+                for future in futures:
+                    # re-raise the errors of tuning threads
+                    future.result()
 
     @classmethod
     def query_schedule(cls, tid):
@@ -1252,6 +1440,11 @@ class AutoScheduleGraphDispatch(object):
             return (None, None, at.MAX_FLOAT)
 
 
+def get_subgraph_similarity_key(tag):
+    """Subgraphs with the same op bodies but different shapes share a key"""
+    return "$".join(re.findall(r"body:(.*?)\$", tag))
+
+
 class AutoScheduleMultiGraphContext(object):
     def __init__(
         self,
@@ -1262,7 +1455,45 @@ class AutoScheduleMultiGraphContext(object):
         gamma=0.02,
         trials=100,
         policy="equal",
+        parallel=1,
+        dev_ids=None,
+        build_workers=None,
+        window_size=3,
+        grad_alpha=0.2,
+        grad_beta=2.0,
+        patience=3,
+        min_improvement=0.01,
+        schedule_store=None,
+        retune=False,
     ):
+        """
+        policy: str
+            "equal", "rebalance" or "gradient"
+            "gradient" gives more trials to subgraphs that are expected
+            to reduce the end-to-end latency the most
+        window_size: int
+            rounds used to estimate the improvement slope ("gradient")
+        grad_alpha: float
+            weight of the observed slope against the optimistic guess ("gradient")
+        grad_beta: float
+            a subgraph is expected to reach 1/grad_beta of the best
+            throughput among its similar subgraphs ("gradient")
+        patience: int
+            a subgraph is no longer tuned if it improves less than
+            min_improvement in patience rounds ("gradient")
+        min_improvement: float
+        parallel: int
+            number of subgraphs tuned at the same time
+        dev_ids: list of int
+            devices shared by the concurrent subgraphs,
+            default is the dev_id of measure_option
+        build_workers: int
+            total build processes shared by the concurrent subgraphs
+        schedule_store: str or TuningDatabase
+            the store of the best subgraph schedules shared by all the models,
+            subgraphs found in it are not tuned again unless retune is True
+        retune: bool
+        """
         self.tir_multi_graph = tir_multi_graph
         self.performance_trace = {}
         self.schedules = {}
@@ -1275,9 +1506,29 @@ class AutoScheduleMultiGraphContext(object):
         self.gamma = gamma
         self.use_at_set = set()
         self.subgraph_count = {}
+        self.tid_to_graph_tag = {}
+        self.gflop = {}
+        self.similarity_key = {}
+        # accumulated trials of each round of performance_trace
+        self.trials_trace = {}
+        self.plateaued = set()
+        self.window_size = window_size
+        self.grad_alpha = grad_alpha
+        self.grad_beta = grad_beta
+        self.patience = patience
+        self.min_improvement = min_improvement
         self.log_dir = name
         if not (os.path.exists(self.log_dir) and os.path.isdir(self.log_dir)):
             os.mkdir(self.log_dir)
+        if isinstance(schedule_store, str):
+            schedule_store = at.TuningDatabase(schedule_store)
+        self.schedule_store = schedule_store
+        self.parallel = parallel
+        self.lease = None
+        if parallel > 1:
+            if dev_ids is None:
+                dev_ids = [measure_option.dev_id]
+            self.lease = at.MeasureLease(dev_ids=dev_ids, build_workers=build_workers)
         graphs = tg.get_graphs_from_tir_multi_graph(tir_multi_graph)
         graphs = OrderedDict(
             sorted([(x.value, y) for x, y in graphs.items()], key=lambda x: x[0]))
@@ -1289,10 +1540,19 @@ class AutoScheduleMultiGraphContext(object):
             else:
                 self.subgraph_count[subgraph.tag] = 1
             tid, ctx, use_at = AutoScheduleGraphDispatch.add_task(
-                new_name, self.log_dir, subgraph, measure_option, scheduler_option=scheduler_option
+                new_name,
+                self.log_dir,
+                subgraph,
+                measure_option,
+                scheduler_option=scheduler_option,
+                schedule_store=self.schedule_store,
+                retune=retune,
             )
             if use_at:
                 self.use_at_set.add(subgraph.tag)
+            if self.lease is not None and AutoScheduleGraphDispatch.can_tune_concurrently(ctx):
+                ctx.builder = self.lease.wrap_builder(ctx.builder)
+                ctx.runner = self.lease.wrap_runner(ctx.runner)
             sch, args, perf = AutoScheduleGraphDispatch.query_schedule(tid)
             self.performance_trace[tid] = [perf]
             self.C[tid] = perf
@@ -1302,21 +1562,111 @@ class AutoScheduleMultiGraphContext(object):
             self.schedules[tid] = (sch, args)
             self.contexts[tid] = ctx
             self.graph_tag_to_tid[subgraph.tag] = tid
-        self.L = len(self.graph_tag_to_tid) * trials
+            self.tid_to_graph_tag[tid] = subgraph.tag
+            self.gflop[tid] = subgraph.gflop
+            self.similarity_key[tid] = get_subgraph_similarity_key(subgraph.tag)
+            self.trials_trace[tid] = [0]
+        # the subgraphs installed from the store are not tuned
+        self.L = len([tid for tid in self.contexts if not self.is_frozen(tid)]) * trials
         self.trials = trials
         self.policy = policy
 
+    def is_frozen(self, tid):
+        return tid in AutoScheduleGraphDispatch.frozen
+
     def calculate_X(self, tid):
         raw = math.sqrt(self.C[tid] / (self.alpha[tid] + 1e-10))
         return raw
 
+    def is_plateaued(self, tid):
+        lst = self.performance_trace[tid]
+        if len(lst) <= self.patience:
+            return False
+        old, new = lst[-self.patience - 1], lst[-1]
+        if old >= at.MAX_FLOAT:
+            return new >= at.MAX_FLOAT
+        return old - new < self.min_improvement * old
+
+    def calculate_gradient(self, tid):
+        """d(end-to-end latency) / d(trials) of one subgraph, which is <= 0
+
+        Combines the latency slope of the recent rounds with an optimistic
+        guess from the best throughput among similar subgraphs.
+        """
+        lst = self.performance_trace[tid]
+        trials_lst = self.trials_trace[tid]
+        latency = lst[-1]
+        spent = trials_lst[-1]
+        start = max(0, len(lst) - 1 - self.window_size)
+        if lst[start] < at.MAX_FLOAT and trials_lst[-1] > trials_lst[start]:
+            backward = (latency - lst[start]) / (trials_lst[-1] - trials_lst[start])
+        else:
+            backward = 0.0
+        forward = -latency / max(1, spent)
+        best_throughput = max(
+            [
+                self.gflop[k] / self.performance_trace[k][-1]
+                for k in self.performance_trace.keys()
+                if k != tid
+                and self.similarity_key[k] == self.similarity_key[tid]
+                and self.performance_trace[k][-1] < at.MAX_FLOAT
+            ],
+            default=0.0,
+        )
+        if best_throughput > 0 and self.gflop[tid] > 0:
+            forward = min(forward, self.grad_beta * self.gflop[tid] / best_throughput - latency)
+        grad = self.grad_alpha * backward + (1 - self.grad_alpha) * forward
+        return min(0.0, grad) * self.subgraph_count[self.tid_to_graph_tag[tid]]
+
+    def select_gradient_tasks(self):
+        ret = []
+        trials = []
+        scores = {}
+        for tid, lst in self.performance_trace.items():
+            if tid in self.plateaued or self.is_frozen(tid):
+                continue
+            if self.trials_trace[tid][-1] == 0 or lst[-1] >= at.MAX_FLOAT:
+                # warm up: every subgraph needs a valid schedule first
+                if not self.is_plateaued(tid):
+                    ret.append(tid)
+                    trials.append(self.trials)
+                else:
+                    self.plateaued.add(tid)
+                continue
+            if self.is_plateaued(tid):
+                self.plateaued.add(tid)
+                continue
+            scores[tid] = -self.calculate_gradient(tid)
+        budget = self.L - sum(trials)
+        if scores and budget > 0:
+            sum_scores = sum(scores.values())
+            for tid, score in sorted(scores.items(), key=lambda x: -x[1]):
+                if sum_scores > 0:
+                    raw = int(budget * score / sum_scores)
+                else:
+                    raw = budget // len(scores)
+                if raw > 0:
+                    ret.append(tid)
+                    trials.append(raw)
+            if len(ret) == 0:
+                best = max(scores.keys(), key=lambda x: scores[x])
+                ret.append(best)
+                trials.append(budget)
+        return ret, trials
+
     def select_next_tasks(self):
         # this is the decision part, currently use the simple decision
+        if self.policy == "gradient":
+            return self.select_gradient_tasks()
         ret = []
         trials = []
-        sum_X = reduce(lambda x, y: x + y, self.X.values(), 0.0)
+        sum_X = reduce(
+            lambda x, y: x + y, [v for k, v in self.X.items() if not self.is_frozen(k)], 0.0
+        )
 
         for tid, lst in self.performance_trace.items():
+            if self.is_frozen(tid):
+                continue
             if self.policy == "equal":
                 ret.append(tid)
                 trials.append(self.trials)
@@ -1340,11 +1690,17 @@ class AutoScheduleMultiGraphContext(object):
 
     def auto_schedule(self):
         tids, trials = self.select_next_tasks()
-        AutoScheduleGraphDispatch.auto_schedule(tids, trials)
+        AutoScheduleGraphDispatch.auto_schedule(tids, trials, n_parallel=self.parallel)
+        tuned = {tid: trial for tid, trial in zip(tids, trials) if trial}
         for k, lst in self.performance_trace.items():
             sch, args, perf = AutoScheduleGraphDispatch.query_schedule(k)
             self.schedules[k] = (sch, args)
-            lst[-1] = perf  # only reserve one
+            if self.policy == "gradient" and k in tuned:
+                # the history of each tuned round is used for the slope
+                lst.append(perf)
+                self.trials_trace[k].append(self.trials_trace[k][-1] + tuned[k])
+            else:
+                lst[-1] = perf  # only reserve one
 
     def get_schedules(self):
         total = 0
@@ -1394,6 +1750,11 @@ class AutoScheduleMultiGraphDispatch(object):
         scheduler_option="auto_tensorize_v3",
         trials=100,
         policy="equal",
+        parallel=1,
+        dev_ids=None,
+        build_workers=None,
+        schedule_store=None,
+        retune=False,
     ):
         next_id = len(AutoScheduleMultiGraphDispatch.working_set)
         AutoScheduleMultiGraphDispatch.working_set[next_id] = AutoScheduleMultiGraphContext(
@@ -1403,6 +1764,11 @@ class AutoScheduleMultiGraphDispatch(object):
             scheduler_option=scheduler_option,
             trials=trials,
             policy=policy,
+            parallel=parallel,
+            dev_ids=dev_ids,
+            build_workers=build_workers,
+            schedule_store=schedule_store,
+            retune=retune,
         )
         return next_id
 
@@ -1,7 +1,9 @@
 import tvm
 import tvm._ffi
+import hashlib
 import numpy as np
 from functools import reduce
+from tvm.auto_tensorize.kernel_cache import KernelCache
 from tvm.tensor_graph.core.utils import to_int, to_tuple, flatten_tir_graph, op_feature
 
 
@@ -114,6 +116,44 @@ def able_inline(op, down_graph):
             break
     return is_compute and (not has_reduce) and (not is_output)
 
+def get_nbytes(tensor):
+    dtype = tvm.runtime.DataType(tensor.dtype)
+    return reduce(lambda x, y: x * y, to_tuple(tensor.shape), 1) * ((dtype.bits * dtype.lanes + 7) // 8)
+
+
+def plan_memory(lifetimes):
+    """Offline interval coloring of buffer lifetimes
+
+    Buffers are placed from the largest one, each into the smallest arena
+    whose buffers are never alive at the same time as it.
+
+    lifetimes: dict of {key: (nbytes, begin, end)}
+        begin and end are the first and the last positions in call order
+
+    returns:
+      dict of {key: arena id}
+      list of arena nbytes
+    """
+    assign = {}
+    arena_sizes = []
+    arena_spans = []
+    for key, (nbytes, begin, end) in sorted(lifetimes.items(), key=lambda kv: (-kv[1][0], kv[1][1])):
+        best = -1
+        for i, spans in enumerate(arena_spans):
+            if any([not (end < b or e < begin) for b, e in spans]):
+                continue
+            if best < 0 or arena_sizes[i] < arena_sizes[best]:
+                best = i
+        if best < 0:
+            best = len(arena_sizes)
+            arena_sizes.append(nbytes)
+            arena_spans.append([])
+        arena_sizes[best] = max(arena_sizes[best], nbytes)
+        arena_spans[best].append((begin, end))
+        assign[key] = best
+    return assign, arena_sizes
+
+
 class PyOpState(object):
     def __init__(self):
         self.injective = False
@@ -205,9 +245,14 @@ class PyTIRGraph(object):
         graph outputs
 
     wire    :  
+
+    module_cache_dir : (optional) str
+        built subgraph functions are kept in this directory by the hash
+        of their lowered IR and reused across graphs and runs
     """
 
-    def __init__(self, inputs, labels, outputs, weights, loss, gradients, lr, updates, wire=None):
+    def __init__(self, inputs, labels, outputs, weights, loss, gradients, lr, updates, wire=None,
+                 module_cache_dir=None):
         if not isinstance(inputs, (list, tuple)):
             inputs = [inputs]
 
@@ -268,6 +313,13 @@ class PyTIRGraph(object):
         self.bufs = {}
         self.functions = {}
         self.shared_functions = {}
+        # feature -> the schedule of its shared function
+        self.built_schedules = {}
+        self.memory_report = {}
+        # lowered IR hash -> function
+        self.ir_functions = {}
+        self.module_cache = None if module_cache_dir is None else KernelCache(module_cache_dir)
+        self.build_report = {}
 
         # initialize some of them
         for op in op_list:
@@ -360,6 +412,7 @@ class PyTIRGraph(object):
         self.bufs = {}
         self.functions = {}
         self.shared_functions = {}
+        self.built_schedules = {}
 
         # initialize some of them
         for op in self.op_list:
@@ -370,6 +423,56 @@ class PyTIRGraph(object):
     def clear_runtime(self):
         self.ctx = None
         self.tvm_array_dict = {}
+        self.memory_report = {}
+
+    def get_intermediate_lifetimes(self):
+        """
+        returns:
+          dict of {intermediate tensor: (nbytes, first position, last position in call_order)}
+        """
+        position = {mark: i for i, mark in enumerate(self.call_order)}
+        # subgraph outputs also include the gradients, updates and loss
+        # read by later subgraphs, callers read all of them after running
+        persistent = set(
+            list(self.outputs) + list(self.gradients) + list(self.updates) + list(self.weights)
+        )
+        if self.loss is not None:
+            persistent.add(self.loss)
+        lifetimes = {}
+        for mark, subgraph in self.subgraphs.items():
+            for out, old_tensor in subgraph.outputs.items():
+                if old_tensor not in persistent:
+                    lifetimes[old_tensor] = (get_nbytes(old_tensor), position[mark], position[mark])
+        for mark, subgraph in self.subgraphs.items():
+            for inp, old_tensor in subgraph.inputs.items():
+                if old_tensor in lifetimes:
+                    nbytes, begin, end = lifetimes[old_tensor]
+                    lifetimes[old_tensor] = (nbytes, begin, max(end, position[mark]))
+        return lifetimes
+
+    def plan_memory(self):
+        """Share memory among the intermediate buffers with disjoint lifetimes
+
+        returns:
+          dict of {intermediate tensor: arena id}
+          list of arena nbytes
+        """
+        lifetimes = self.get_intermediate_lifetimes()
+        assign, arena_sizes = plan_memory(lifetimes)
+        live_bytes = [0 for mark in self.call_order]
+        for nbytes, begin, end in lifetimes.values():
+            for i in range(begin, end + 1):
+                live_bytes[i] += nbytes
+        self.memory_report = {
+            "num_buffers": len(lifetimes),
+            "num_arenas": len(arena_sizes),
+            # bytes of intermediate buffers
+            "naive": sum([x[0] for x in lifetimes.values()]),
+            "planned": sum(arena_sizes),
+            # the lower bound of any plan
+            "peak_live": max(live_bytes, default=0),
+        }
+        return assign, arena_sizes
 
     def create_schedule_for(self, mark=0, force=False):
         subgraphs = self.subgraphs
@@ -420,19 +523,69 @@ class PyTIRGraph(object):
             self.schedules[mark] = s
             self.scheduled_subgraphs.add(feature)
 
+    def build_function(self, sch, bufs, target, force=False, name="default_function"):
+        """Build a subgraph, only compile it if its lowered IR is new
+
+        The lowered IR is looked up in memory first, then in module_cache_dir.
+        Both paths return the built runtime.Module.
+        force: bool
+            compile even if the IR was built before
+        name: str
+            the name of the lowered function
+        """
+        mod = tvm.lower(sch, bufs, name=name)
+        parts = [tvm.__version__, str(target), name, str(mod)]
+        key = hashlib.sha256("\n".join(parts).encode()).hexdigest()
+        if not force:
+            if key in self.ir_functions:
+                self.build_report["memory"] = self.build_report.get("memory", 0) + 1
+                return self.ir_functions[key]
+            if self.module_cache is not None:
+                func = self.module_cache.get_module(key)
+                if func is not None:
+                    # raises if the library lacks the lowered function
+                    func.get_function(name)
+                    self.build_report["disk"] = self.build_report.get("disk", 0) + 1
+                    self.ir_functions[key] = func
+                    return func
+        func = tvm.build(mod, target=target)
+        self.build_report["compiled"] = self.build_report.get("compiled", 0) + 1
+        if self.module_cache is not None:
+            self.module_cache.put(key, func)
+        self.ir_functions[key] = func
+        return func
+
+    def _get_shared_function(self, mark):
+        """The function of the feature of mark if its schedule was not replaced since
+
+        The subgraphs of one feature share one schedule and one function,
+        only a new schedule object needs lowering again
+        """
+        feature = self.subgraph_features[mark]
+        if feature not in self.shared_functions:
+            return None
+        sch = self.schedules.get(mark)
+        if sch is not None and sch is not self.built_schedules.get(feature):
+            return None
+        return self.shared_functions[feature]
+
     def build_for(self, target, mark=0, force=False):
         feature = self.subgraph_features[mark]
         if force:
-            self.shared_functions.pop(feature)
-        elif feature in self.shared_functions:
-            self.functions[mark] = self.shared_functions[feature]
-            return True
+            self.shared_functions.pop(feature, None)
+        else:
+            func = self._get_shared_function(mark)
+            if func is not None:
+                self.functions[mark] = func
+                self.build_report["shared"] = self.build_report.get("shared", 0) + 1
+                return True
         bufs = self.bufs[mark]
         sch = self.schedules[mark]
         try:
-            func = tvm.build(sch, bufs, target=target)
+            func = self.build_function(sch, bufs, target, force=force)
             self.functions[mark] = func
             self.shared_functions[feature] = func
+            self.built_schedules[feature] = sch
             # print("build success for subgraph", mark)
             return True
         except Exception as e:
@@ -443,19 +596,29 @@ class PyTIRGraph(object):
             return False
 
     def build(self, target, force=False):
+        """Build all the scheduled subgraphs
+
+        The subgraphs of one feature share one function. Only the features
+        with a new schedule are lowered again, and only the ones whose
+        lowered IR changed are compiled, unless force is True
+        """
         fail = 0
+        self.build_report = {}
         if force:
             self.shared_functions = {}
         for mark, sch in self.schedules.items():
             feature = self.subgraph_features[mark]
-            if feature in self.shared_functions:
-                self.functions[mark] = self.shared_functions[feature]
+            func = self._get_shared_function(mark)
+            if func is not None:
+                self.functions[mark] = func
+                self.build_report["shared"] = self.build_report.get("shared", 0) + 1
                 continue
             bufs = self.bufs[mark]
             try:
-                func = tvm.build(sch, bufs, target=target)
+                func = self.build_function(sch, bufs, target, force=force)
                 self.functions[mark] = func
                 self.shared_functions[feature] = func
+                self.built_schedules[feature] = sch
                 # print("build success for subgraph", mark)
             except Exception as e:
                 fail += 1
@@ -465,7 +628,13 @@ class PyTIRGraph(object):
                 print(tvm.lower(sch, bufs, simple_mode=True))
         return fail == 0
 
-    def allocate_buffer(self, target, dev, force=False):
+    def allocate_buffer(self, target, dev, force=False, reuse_memory=False):
+        """
+        reuse_memory: bool
+            intermediate buffers share memory when their lifetimes along call_order
+            do not overlap, the savings are in memory_report. Intermediate values are
+            overwritten by later subgraphs
+        """
         if not force and self.ctx is not None:
             return
         self.ctx = tvm.context(target, dev)
@@ -511,6 +680,13 @@ class PyTIRGraph(object):
         for i, update in enumerate(self.updates):
             self.tvm_array_dict[update] = self.tvm_array_dict[self.weights[i]]
         # intermediate buffer
+        if reuse_memory:
+            assign, arena_sizes = self.plan_memory()
+            arenas = [tvm.nd.empty((nbytes,), "uint8", ctx=self.ctx) for nbytes in arena_sizes]
+            for old_tensor, arena_id in assign.items():
+                self.tvm_array_dict[old_tensor] = arenas[arena_id]._create_view(
+                    to_tuple(old_tensor.shape), old_tensor.dtype)
+            return
         for subgraph in self.subgraphs.values():
             for out, old_tensor in subgraph.outputs.items():
                 if old_tensor not in self.outputs:
@@ -1,3 +1,4 @@
 from .layout import apply_layout_change, LayoutChangeFinder, LayoutChangeApplier
 # from .parallel_fusion import ParallelFusionFinder, ParallelFusionApplier
-from .parallel_fusion import ParallelFusionFinder, ParallelFusionApplier
\ No newline at end of file
+from .parallel_fusion import ParallelFusionFinder, ParallelFusionApplier
+from .parallel_fusion import HorizontalFusionFinder, HorizontalFusionApplier
@@ -3,7 +3,7 @@ from copy import copy
 
 import tvm
 
-from ..tensor import GraphTensor, GraphOp, GraphNode, compute
+from ..tensor import GraphTensor, GraphOp, GraphNode, NamedDimTensor, compute
 from ..abs_graph import GraphVisitor, ForwardGraph
 
 
@@ -142,3 +142,374 @@ def _split(*dims, split_lens, dim):
     for split_len in split_lens:
         yield _build_one_split(*dims, begin=begin, end=begin+split_len, dim=dim)
         begin += split_len
+
+
+def _freeze(value, seen=()):
+    """A hashable key comparing the values of closure cells and defaults
+
+    Objects without a value form (and tvm objects other than immediates,
+    which hash by handle) are keyed on their identity.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tvm.tir.IntImm, tvm.tir.FloatImm)):
+        return (type(value).__name__, value.dtype, value.value)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_freeze(v, seen) for v in value)
+    if isinstance(value, dict):
+        return ("dict",) + tuple(sorted(
+            ((_freeze(k, seen), _freeze(v, seen)) for k, v in value.items()), key=repr))
+    if hasattr(value, "__code__"):
+        return _func_key(value, seen)
+    try:
+        hash(value)
+    except TypeError:
+        return ("id", id(value))
+    return value
+
+
+def _func_key(func, seen=()):
+    """Sibling ops built by the same nested function share its code and closure"""
+    if not hasattr(func, "__code__"):
+        return func
+    if id(func) in seen:
+        # a recursive nested function refers to itself through its closure
+        return ("recursive", func.__code__)
+    seen = seen + (id(func),)
+    closure = tuple(_freeze(c.cell_contents, seen) for c in (func.__closure__ or ()))
+    return (func.__code__, closure, _freeze(func.__defaults__, seen))
+
+
+def _padded_ratio(shape, tile):
+    """Volume padded to whole tiles over the real volume"""
+    real = 1
+    padded = 1
+    for s in shape:
+        real *= int(s)
+        padded *= (int(s) + tile - 1) // tile * tile
+    return padded / real
+
+
+def _same_except(shapes, dim):
+    shapes = [[int(s) for i, s in enumerate(shape) if i != dim] for shape in shapes]
+    return all(shape == shapes[0] for shape in shapes)
+
+
+class HorizontalFusionFinder(GraphVisitor):
+    """Find groups of independent ops that can run as one larger op
+
+    Two kinds of groups are found:
+
+    fusion_groups: siblings reading the same node whose other inputs are
+        all weights. The weights are concatenated along the fused dimension
+        chosen by the least tile padding of the fused output.
+    batch_groups: same-shaped independent ops with reductions (e.g. the
+        GEMMs of attention heads or LSTM gates) that are stacked into one
+        batched op with a new leading dimension. Each unshared input is
+        copied into a stacked tensor whose every element is selected
+        through a chain of up to max_batch - 1 if_then_else, so the
+        batches are capped at max_batch ops.
+
+    Parameters
+    ----------
+    min_num_branches : int
+        the smallest group to fuse
+    tile : int
+        the tile size of the target intrinsic used to cost the fused dimension
+    max_batch : int
+        the largest number of ops stacked into one batched op
+    """
+
+    def __init__(self, min_num_branches=2, tile=16, max_batch=8):
+        super().__init__("up")
+        self.min_num_branches = min_num_branches
+        self.tile = tile
+        self.max_batch = max_batch
+        self.fusion_groups = list()
+        self.batch_groups = list()
+        self.params = None
+        self.ops = list()
+
+    def __call__(self, graph):
+        self.params = {}
+        for output in graph.outputs:
+            _, self.params = output(self.params)
+        super().__call__(graph)
+        self.find_batch_groups(graph)
+
+    def choose_fused_dim(self, graph, children, weight_positions):
+        out_tensor = self.params[children[0]].tvm_tensor
+        candidates = None
+        weight_dims = []
+        for pos in weight_positions:
+            weight = self.params[children[0].inputs[pos]].tvm_tensor
+            dims = {int(o): int(w) for o, w in tvm.tg.find_fusible_dim(out_tensor, [weight])}
+            weight_dims.append(dims)
+            candidates = set(dims.keys()) if candidates is None else candidates & set(dims.keys())
+
+        best = None
+        for dim in sorted(candidates or []):
+            if not _same_except([child.shape for child in children], dim):
+                continue
+            if not all(_same_except([child.inputs[pos].shape for child in children], dims[dim])
+                       for pos, dims in zip(weight_positions, weight_dims)):
+                continue
+            fused_shape = list(children[0].shape)
+            fused_shape[dim] = sum(int(child.shape[dim]) for child in children)
+            cost = _padded_ratio(fused_shape, self.tile)
+            if best is None or cost < best[0]:
+                best = (cost, dim, [dims[dim] for dims in weight_dims])
+        return best
+
+    def _visit(self, graph, graph_op):
+        op_type_to_children = defaultdict(list)
+        for child in graph_op.children:
+            if child in self.params:
+                positions = tuple(i for i, inp in enumerate(child.inputs) if inp is graph_op)
+                key = (_func_key(child.func), tuple(child.reduces), len(child.inputs), positions)
+                if child not in op_type_to_children[key]:
+                    op_type_to_children[key].append(child)
+
+        for (_, _, num_inputs, positions), children in op_type_to_children.items():
+            if len(children) < self.min_num_branches:
+                continue
+            weight_positions = [i for i in range(num_inputs) if i not in positions]
+            if not weight_positions:
+                continue
+            if not all(child.inputs[pos] in graph.weights
+                       for child in children for pos in weight_positions):
+                continue
+            weights = [[child.inputs[pos] for child in children] for pos in weight_positions]
+            if any(len(set(ws)) != len(ws) for ws in weights):
+                continue
+            best = self.choose_fused_dim(graph, children, weight_positions)
+            if best is None:
+                continue
+            _, fused_dim_output, fused_dims_weight = best
+
+            self.fusion_groups.append({
+                "branch_point": graph_op,
+                "parallel_ops": children,
+                "weight_positions": weight_positions,
+                "weights": weights,
+                "fused_dims_weight": fused_dims_weight,
+                "fused_dim_output": fused_dim_output,
+            })
+
+    def visit_tensor(self, graph, graph_tensor):
+        self._visit(graph, graph_tensor)
+
+    def visit_op(self, graph, graph_op: GraphOp):
+        self._visit(graph, graph_op)
+
+        for inp in graph_op.inputs:
+            self.visit(graph, inp)
+        self.ops.append(graph_op)
+
+    def find_batch_groups(self, graph):
+        fused = set()
+        for group in self.fusion_groups:
+            fused.update(group["parallel_ops"])
+
+        ancestors = {}
+        for op in self.ops:
+            ancestors[op] = set()
+            for inp in op.inputs:
+                if isinstance(inp, GraphOp):
+                    ancestors[op].add(inp)
+                    ancestors[op].update(ancestors[inp])
+
+        same_ops = defaultdict(list)
+        for op in self.ops:
+            if op in fused or not op.reduces:
+                continue
+            key = (_func_key(op.func), tuple(op.shape), tuple(op.reduces),
+                   tuple((tuple(inp.shape), inp.dtype) for inp in op.inputs))
+            same_ops[key].append(op)
+
+        for ops in same_ops.values():
+            # greedily split into batches without dependence inside
+            batches = []
+            for op in ops:
+                for batch in batches:
+                    if len(batch) >= self.max_batch:
+                        continue
+                    if all(op not in ancestors[x] and x not in ancestors[op] for x in batch):
+                        batch.append(op)
+                        break
+                else:
+                    batches.append([op])
+            for batch in batches:
+                if len(batch) < self.min_num_branches:
+                    continue
+                shared = [all(x.inputs[i] is batch[0].inputs[i] for x in batch)
+                          for i in range(len(batch[0].inputs))]
+                if all(shared):
+                    continue
+                self.batch_groups.append({
+                    "parallel_ops": batch,
+                    "shared_inputs": shared,
+                })
+
+
+class _BatchSlice(NamedDimTensor):
+    """One slice of a stacked tensor, indexed like the original tensor"""
+
+    def __init__(self, stacked, batch_var):
+        super().__init__(stacked.tvm_tensor, op=stacked.op)
+        self.batch_var = batch_var
+        self.shape = stacked.shape[1:]
+
+    def __getitem__(self, indices):
+        if not isinstance(indices, (list, tuple)):
+            indices = [indices]
+        return self.tvm_tensor(self.batch_var, *indices)
+
+
+def _stack(num_dims):
+    # the stacked copy is materialized and each element goes through one
+    # select per member, hence HorizontalFusionFinder.max_batch
+    def _inner_stack(*args, requires_grad=True, name="compute"):
+        shape = args[:num_dims + 1]
+        tensors = args[num_dims + 1:]
+
+        def _fcompute(*indices):
+            ret = tensors[-1](*indices[1:])
+            for i in reversed(range(len(tensors) - 1)):
+                ret = tvm.tir.if_then_else(indices[0] == i, tensors[i](*indices[1:]), ret)
+            return ret
+        return compute(shape, _fcompute, name=name, requires_grad=requires_grad)
+    return _inner_stack
+
+
+def _take(index, num_dims):
+    def _inner_take(*args, requires_grad=True, name="compute"):
+        shape = args[:num_dims]
+        batched = args[num_dims]
+        return compute(shape, lambda *indices: batched(index, *indices),
+                       name=name, requires_grad=requires_grad)
+    return _inner_take
+
+
+def _batch(func, num_dims, num_reduces, shared_inputs):
+    def _inner_batch(*args, requires_grad=True, name="compute"):
+        shape = args[:num_dims + 1]
+        reduces = args[num_dims + 1:num_dims + 1 + num_reduces]
+        tensors = args[num_dims + 1 + num_reduces:]
+        batch_var = tvm.tir.Var("b", "int32")
+        slices = [t if shared else _BatchSlice(t, batch_var)
+                  for t, shared in zip(tensors, shared_inputs)]
+        one = func(*shape[1:], *reduces, *slices, requires_grad=requires_grad)
+        one_op = one.tvm_tensor.op
+        org_axis = [iv.var for iv in one_op.axis] + [batch_var]
+
+        def _fcompute(*indices):
+            axis = list(indices[1:]) + [indices[0]]
+            if len(one_op.reduce_axis) == 0:
+                return tvm.tg.substitute_expression(
+                    one_op.body[0], [], [], org_axis, axis, [], [])
+            reduce_axis = [tvm.te.reduce_axis(iv.dom, name=iv.var.name)
+                           for iv in one_op.reduce_axis]
+            return tvm.tg.substitute_expression(
+                one_op.body[0], [], [], org_axis, axis, list(one_op.reduce_axis), reduce_axis)
+        return compute(shape, _fcompute, name=name, requires_grad=requires_grad)
+    return _inner_batch
+
+
+def _replace_uses(graph_outputs, orig_ops, new_ops):
+    mapping = dict(zip(orig_ops, new_ops))
+    for orig_op, new_op in mapping.items():
+        new_op.children = orig_op.children
+        for child in orig_op.children:
+            for i, inp in enumerate(child.inputs):
+                if inp is orig_op:
+                    child.inputs[i] = new_op
+    return [mapping.get(o, o) for o in graph_outputs]
+
+
+class HorizontalFusionApplier:
+    """Apply the groups found by HorizontalFusionFinder
+
+    The concatenated weights are recorded in fused_weights as
+    (fused weight, original weights, concatenated dim) so that their
+    initial values can be assembled.
+    """
+
+    def __init__(self, fusion_groups, batch_groups=()):
+        self.fusion_groups = fusion_groups
+        self.batch_groups = batch_groups
+        self.fused_weights = list()
+
+    def transform(self, graph):
+        for fusion_group in self.fusion_groups:
+            graph = self.transform_one_group(fusion_group, graph)
+        for batch_group in self.batch_groups:
+            graph = self.transform_one_batch(batch_group, graph)
+        return graph
+
+    def transform_one_group(self, fusion_group, graph):
+        parallel_ops = fusion_group["parallel_ops"]
+        fused_dim_output = fusion_group["fused_dim_output"]
+        arg_list = list(parallel_ops[0].inputs)
+        new_weights = list(graph.weights)
+        for pos, weight_tensors, fused_dim_weight in zip(
+                fusion_group["weight_positions"], fusion_group["weights"],
+                fusion_group["fused_dims_weight"]):
+            fused_weight_shape = list(weight_tensors[0].shape)
+            fused_weight_shape[fused_dim_weight] = sum(w.shape[fused_dim_weight] for w in weight_tensors)
+            fused_weight_name = "parallel_fused_" + "_".join([w.name for w in weight_tensors])
+            fused_weight = GraphTensor(fused_weight_shape, dtype=weight_tensors[0].dtype,
+                                       name=fused_weight_name)
+            self.fused_weights.append((fused_weight, weight_tensors, fused_dim_weight))
+            arg_list[pos] = fused_weight
+            new_weights = [w for w in new_weights if w not in weight_tensors] + [fused_weight]
+
+        branch_point = fusion_group["branch_point"]
+        non_parallel_ops = [op for op in branch_point.children if op not in parallel_ops]
+        fused_dim_sizes = [op.shape[fused_dim_output] for op in parallel_ops]
+        fused_output_shape = list(parallel_ops[0].shape)
+        fused_output_shape[fused_dim_output] = sum(fused_dim_sizes)
+        fused_op_name = "parallel_fused_" + "_".join([op.name for op in parallel_ops])
+        fused_op = GraphOp(fused_output_shape, parallel_ops[0].reduces,
+                           arg_list, parallel_ops[0].func, name=fused_op_name)
+
+        split_op_funcs = _split(*fused_output_shape, split_lens=fused_dim_sizes, dim=fused_dim_output)
+        split_ops = list()
+        for i, func in enumerate(split_op_funcs):
+            split_shape = list(fused_output_shape)
+            split_shape[fused_dim_output] = fused_dim_sizes[i]
+            split_ops.append(GraphOp(split_shape, [], [fused_op], func, "split_" + parallel_ops[i].name))
+
+        branch_point.children = non_parallel_ops + [fused_op]
+        new_outputs = _replace_uses(graph.outputs, parallel_ops, split_ops)
+        return graph.make_new(copy(graph.inputs), new_outputs, new_weights)
+
+    def transform_one_batch(self, batch_group, graph):
+        parallel_ops = batch_group["parallel_ops"]
+        shared_inputs = batch_group["shared_inputs"]
+        num_batches = len(parallel_ops)
+        first = parallel_ops[0]
+
+        for op in parallel_ops:
+            for inp in op.inputs:
+                inp.children = [c for c in inp.children if c not in parallel_ops]
+
+        args = []
+        for i, shared in enumerate(shared_inputs):
+            if shared:
+                args.append(first.inputs[i])
+                continue
+            inputs = [op.inputs[i] for op in parallel_ops]
+            stack_shape = [num_batches] + list(inputs[0].shape)
+            stack_name = "stack_" + "_".join([inp.name for inp in inputs])
+            args.append(GraphOp(stack_shape, [], inputs, _stack(len(inputs[0].shape)), name=stack_name))
+
+        batched_name = "batched_" + "_".join([op.name for op in parallel_ops])
+        batched_func = _batch(first.func, len(first.shape), len(first.reduces), shared_inputs)
+        batched_op = GraphOp([num_batches] + list(first.shape), first.reduces, args,
+                             batched_func, name=batched_name)
+
+        take_ops = [GraphOp(list(first.shape), [], [batched_op], _take(i, len(first.shape)),
+                            name="take_" + op.name) for i, op in enumerate(parallel_ops)]
+        new_outputs = _replace_uses(graph.outputs, parallel_ops, take_ops)
+        return graph.make_new(copy(graph.inputs), new_outputs, copy(graph.weights))
@@ -1 +1 @@
-from .subgraph import set_mark_group_role, set_should_checkpoint
\ No newline at end of file
+from .subgraph import set_mark_group_role, set_should_checkpoint, CheckpointPlanner
\ No newline at end of file
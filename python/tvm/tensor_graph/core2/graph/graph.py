@@ -3,6 +3,7 @@ from tvm.runtime import Object
 from collections import Iterable
 
 from .concrete import Tensor, ComputeDAGMaker
+from .subgraph import CheckpointPlanner, get_should_checkpoint, set_should_checkpoint
 from tvm.tg import _ffi_api
 from ..nn.module import Module
 
@@ -174,7 +175,8 @@ def make_forward(main_module, inputs, max_subgraph_size=100, max_minigraph_size=
     )
 
 
-def make_backward(main_module, loss_module, optimizer, inputs, labels, max_subgraph_size=100, max_minigraph_size=100):
+def make_backward(main_module, loss_module, optimizer, inputs, labels, max_subgraph_size=100, max_minigraph_size=100,
+                  checkpoint_budget=None):
     """Convert a nn.Module to tg.Graph
 
     Parameters:
@@ -195,6 +197,10 @@ def make_backward(main_module, loss_module, optimizer, inputs, labels, max_subgr
         gradients = tvm.tg.Gradient(loss, weights)
         return gradients
 
+    checkpoint_budget : int
+        bytes allowed for the kept intermediate tensors, the other
+        tensors are recomputed. None uses the default checkpoint rule.
+
     Returns:
     --------
     tg.Graph
@@ -279,17 +285,30 @@ def make_backward(main_module, loss_module, optimizer, inputs, labels, max_subgr
     final_state_inputs = make_list(_main_states + _loss_states + _opt_states)
     final_state_outputs = make_list(
         _main_state_outputs + _loss_state_outputs + _opt_state_outputs)
-    return Graph(
-        final_inputs,
-        final_label,
-        final_outputs,
-        final_weights,
-        final_loss,
-        final_gradients,
-        final_optim_inputs,
-        final_updates,
-        final_state_inputs,
-        final_state_outputs,
-        max_subgraph_size=max_subgraph_size,
-        max_minigraph_size=max_minigraph_size
-    )
+    ######################################################
+    # plan the recomputation within the budget
+    ######################################################
+    default_rule = get_should_checkpoint()
+    if checkpoint_budget is not None:
+        planner = CheckpointPlanner(checkpoint_budget)
+        planner.plan(final_state_outputs + final_outputs + final_loss + final_gradients)
+        set_should_checkpoint(planner.should_checkpoint)
+    try:
+        graph = Graph(
+            final_inputs,
+            final_label,
+            final_outputs,
+            final_weights,
+            final_loss,
+            final_gradients,
+            final_optim_inputs,
+            final_updates,
+            final_state_inputs,
+            final_state_outputs,
+            max_subgraph_size=max_subgraph_size,
+            max_minigraph_size=max_minigraph_size
+        )
+    finally:
+        if checkpoint_budget is not None:
+            set_should_checkpoint(default_rule)
+    return graph
@@ -1,3 +1,4 @@
+import hashlib
 import tvm
 import tvm._ffi
 from ..utils import to_tuple
@@ -59,9 +60,136 @@ def should_checkpoint(op, op_role):
   return False
 
 
+class _Role(object):
+  def __init__(self, value):
+    self.value = value
+
+
+def get_op_key(op, cache=None):
+  """Identify an op across the copies made by the graph passes
+
+  The key also covers the producers of the op, so ops with the same
+  name and shape but different inputs get different keys.
+  cache : dict
+    op to key, shared by the calls on one graph
+  """
+  if cache is None:
+    cache = {}
+  if op in cache:
+    return cache[op]
+  name = op.name
+  while name.endswith(".cut"):
+    name = name[:-len(".cut")]
+  inputs = tuple((get_op_key(inp.op, cache), inp.value_index) for inp in op.input_tensors)
+  parts = (name, str(to_tuple(op.output(0).shape)), op.output(0).dtype, inputs)
+  key = hashlib.sha256(repr(parts).encode()).hexdigest()
+  cache[op] = key
+  return key
+
+
+def get_op_bytes(op):
+  num_elements = reduce(lambda x, y: x * y, to_tuple(op.output(0).shape), 1)
+  return num_elements * tvm.runtime.DataType(op.output(0).dtype).bits // 8
+
+
+class CheckpointPlanner(object):
+  """Choose the tensors to keep within a memory budget, the others are recomputed
+
+  Only the ops recomputed by the default rule are candidates. They are kept
+  in the order of recompute GFLOP per byte until the budget is used up, so
+  the recomputation added to the graph is kept low.
+
+  Parameters:
+  -----------
+  memory_budget : int
+    bytes of the intermediate tensors allowed to stay in memory
+  """
+  def __init__(self, memory_budget):
+    self.memory_budget = memory_budget
+    self.default_rule = _should_checkpoint_func
+    self.keep_keys = set()
+    self.key_cache = {}
+    self.report = {}
+
+  def plan(self, root_tensors):
+    ops = []
+    roles = {}
+    consumers = {}
+    visited = set()
+
+    def helper(op):
+      if op in visited:
+        return
+      visited.add(op)
+      for inp in op.input_tensors:
+        helper(inp.op)
+        consumers.setdefault(inp.op, set()).add(op)
+      if isinstance(op, tvm.te.ComputeOp):
+        input_roles = [_Role(roles[inp.op]) for inp in op.input_tensors if inp.op in roles]
+        roles[op] = _mark_group_role_func(op, input_roles)
+        ops.append(op)
+
+    for t in root_tensors:
+      helper(t.op)
+
+    roots = set([t.op for t in root_tensors])
+    mandatory_bytes = 0
+    # ops sharing a key share one decision, so they are kept together
+    groups = {}
+    for op in ops:
+      nbytes = get_op_bytes(op)
+      if op in roots or not self.default_rule(op, _Role(roles[op])):
+        mandatory_bytes += nbytes
+        continue
+      # recomputed once for each consumer
+      cost = tvm.tg.get_gflop(op) * max(1, len(consumers.get(op, [])))
+      group = groups.setdefault(get_op_key(op, self.key_cache), [0.0, 0])
+      group[0] += cost
+      group[1] += nbytes
+    candidates = [
+      (cost / max(1, nbytes), cost, nbytes, key) for key, (cost, nbytes) in groups.items()]
+
+    budget = self.memory_budget - mandatory_bytes
+    kept_bytes = 0
+    recompute_gflop = 0.0
+    self.keep_keys = set()
+    for _, cost, nbytes, key in sorted(candidates, key=lambda x: x[0], reverse=True):
+      if kept_bytes + nbytes <= budget:
+        kept_bytes += nbytes
+        self.keep_keys.add(key)
+      else:
+        recompute_gflop += cost
+    self.report = {
+      "mandatory_bytes": mandatory_bytes,
+      "kept_bytes": kept_bytes,
+      "num_candidates": len(candidates),
+      "num_kept": len(self.keep_keys),
+      "recompute_gflop": recompute_gflop,
+      "fit_budget": mandatory_bytes <= self.memory_budget
+    }
+    return self.keep_keys
+
+  def should_checkpoint(self, op, op_role):
+    if get_op_key(op, self.key_cache) in self.keep_keys:
+      return False
+    return self.default_rule(op, op_role)
+
+
+_mark_group_role_func = mark_group_role
+_should_checkpoint_func = should_checkpoint
+
+
 def set_mark_group_role(func):
+  global _mark_group_role_func
+  _mark_group_role_func = func
   tvm._ffi.register_func(func, "tg.graph2.mark_group_role", True)
 
 
+def get_should_checkpoint():
+  return _should_checkpoint_func
+
+
 def set_should_checkpoint(func):
+  global _should_checkpoint_func
+  _should_checkpoint_func = func
   tvm._ffi.register_func(func, "tg.graph2.should_checkpoint", True)
\ No newline at end of file
@@ -209,6 +209,38 @@ def get_schedule_result(
     )
 
 
+def get_schedule_results(
+  name,
+  subgraph,
+  target,
+  dev_id,
+  timeout,
+  number,
+  max_attempts=None
+):
+  """Get a batch of schedule results in one call
+
+  Proposals that fail are skipped, so fewer than number
+  results may be returned.
+
+  Parameters
+  ----------
+  number: int
+    the number of results wanted
+  max_attempts: int
+    the number of proposals tried at most, 2 * number by default
+
+  Returns
+  -------
+  list of ScheduleResult
+  """
+  if max_attempts is None:
+    max_attempts = 2 * number
+  return list(_ffi_api.get_schedule_results_without_feedback(
+    name, subgraph, target, dev_id, timeout, number, max_attempts
+  ))
+
+
 def get_schedule_result_from_entity(
   name,
   subgraph,
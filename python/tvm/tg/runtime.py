@@ -31,6 +31,7 @@ def create_session_option(
     synchronize_subgraph=True,
     execution_log_file="execution_log.txt",
     use_tensor_core=False,
+    execution_streams=1,
 ):
     """Creates a SessionOption
 
@@ -85,6 +86,10 @@ def create_session_option(
 
     use_tensor_core: bool
 
+    execution_streams : int
+          run independent subgraphs concurrently on this number of
+          CUDA streams (or CPU threads for llvm), 1 runs them in order
+
     Returns
     -------
     SessionOption
@@ -111,7 +116,8 @@ def create_session_option(
         execution_timeout,
         synchronize_subgraph,
         execution_log_file,
-        use_tensor_core
+        use_tensor_core,
+        execution_streams
     )
 
 
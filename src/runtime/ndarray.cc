@@ -25,6 +25,7 @@
 #include <tvm/runtime/c_runtime_api.h>
 #include <tvm/runtime/device_api.h>
 #include <tvm/runtime/ndarray.h>
+#include <tvm/runtime/registry.h>
 
 #include "runtime_base.h"
 
@@ -248,6 +249,16 @@ runtime::DataType NDArray::DataType() const {
 
 TVM_REGISTER_OBJECT_TYPE(NDArray::Container);
 
+TVM_REGISTER_GLOBAL("runtime.TVMArrayCreateView").set_body([](TVMArgs args, TVMRetValue* ret) {
+  NDArray arr = args[0];
+  DLDataType dtype = args[1];
+  std::vector<int64_t> shape;
+  for (int i = 2; i < args.size(); ++i) {
+    shape.push_back(args[i].operator int64_t());
+  }
+  *ret = arr.CreateView(shape, dtype);
+});
+
 }  // namespace runtime
 }  // namespace tvm
 
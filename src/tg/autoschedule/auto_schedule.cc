@@ -455,6 +455,33 @@ TVM_REGISTER_GLOBAL("tg.get_schedule_result_without_feedback")
 });
 
 
+TVM_REGISTER_GLOBAL("tg.get_schedule_results_without_feedback")
+.set_body_typed([](
+  String name,
+  TIRGraph subgraph,
+  Target target,
+  int dev_id,
+  int timeout,
+  int number,
+  int max_attempts
+){
+  // failed proposals are skipped, at most max_attempts proposals are tried
+  Array<ScheduleResult> results;
+  for (int i = 0; i < max_attempts && (int)results.size() < number; ++i) {
+    try {
+      ScheduleResult result = get_schedule_result(
+        name, subgraph, target, dev_id, timeout);
+      if (result.defined()) {
+        results.push_back(result);
+      }
+    } catch (const std::exception& e) {
+      continue;
+    }
+  }
+  return results;
+});
+
+
 TVM_REGISTER_GLOBAL("tg.get_schedule_result_from_entity")
 .set_body_typed([](
   String name,
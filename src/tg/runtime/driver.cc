@@ -3,6 +3,8 @@
 #include <cmath>
 #include <set>
 #include <map>
+#include <deque>
+#include <condition_variable>
 
 
 #include "../graph/concrete_graph.h"
@@ -37,7 +39,8 @@ SessionOption::SessionOption(
   double execution_timeout,
   bool synchronize_subgraph,
   std::string execution_log_file,
-  bool use_tensor_core) {
+  bool use_tensor_core,
+  int execution_streams) {
   auto node = make_object<SessionOptionNode>();
   node->report_profile = report_profile;
   node->report_iteration = report_iteration;
@@ -61,6 +64,7 @@ SessionOption::SessionOption(
   node->synchronize_subgraph = synchronize_subgraph;
   node->execution_log_file = execution_log_file;
   node->use_tensor_core = use_tensor_core;
+  node->execution_streams = execution_streams;
   data_ = std::move(node);
 }
 
@@ -730,6 +734,169 @@ void Session::run_evaluate(
 }
 
 
+void Session::run_functions_concurrently(
+  int task_id,
+  TIRMultiGraph multi_graph,
+  std::function<bool(IntKey key)> run_helper,
+  const std::vector<TVMStreamHandle>& streams,
+  std::vector<std::pair<IntKey, double> >& subgraph_times,
+  bool profile_subgraph) {
+  bool use_stream = ctx.device_type == kDLGPU;
+  const std::vector<IntKey>& call_order = static_call_order[task_id];
+  // the dependency among subgraphs
+  std::unordered_map<IntKey, std::vector<IntKey> > predecessors;
+  std::unordered_map<IntKey, std::vector<IntKey> > successors;
+  std::unordered_map<IntKey, int> num_pending;
+  for (auto k : call_order) {
+    predecessors[k];
+    num_pending[k] = 0;
+    // so that the workers never insert into this map
+    this->best_functions[k];
+  }
+  for (auto k : call_order) {
+    for (auto succ : multi_graph.Self()->graph_attrs[k]->successors) {
+      successors[k].push_back(succ);
+      predecessors[succ].push_back(k);
+      num_pending[succ] += 1;
+    }
+  }
+  // an update overwrites its weight in place, so it waits for the readers
+  for (auto edge : static_update_edges[task_id]) {
+    successors[edge.first].push_back(edge.second);
+    predecessors[edge.second].push_back(edge.first);
+    num_pending[edge.second] += 1;
+  }
+  {
+    // the extra edges may close a cycle, then dispatch in the static order
+    std::unordered_map<IntKey, int> remain = num_pending;
+    std::deque<IntKey> free_keys;
+    for (auto k : call_order) {
+      if (remain[k] == 0) {
+        free_keys.push_back(k);
+      }
+    }
+    size_t num_visit = 0;
+    while (!free_keys.empty()) {
+      IntKey k = free_keys.front();
+      free_keys.pop_front();
+      num_visit += 1;
+      for (auto succ : successors[k]) {
+        remain[succ] -= 1;
+        if (remain[succ] == 0) {
+          free_keys.push_back(succ);
+        }
+      }
+    }
+    if (num_visit != call_order.size()) {
+      print(4) << "Weight updates form a cycle, run subgraphs in order.\n";
+      predecessors.clear();
+      successors.clear();
+      for (size_t i = 0; i < call_order.size(); ++i) {
+        predecessors[call_order[i]];
+        num_pending[call_order[i]] = (i == 0) ? 0 : 1;
+        if (i > 0) {
+          successors[call_order[i - 1]].push_back(call_order[i]);
+          predecessors[call_order[i]].push_back(call_order[i - 1]);
+        }
+      }
+    }
+  }
+
+  std::deque<IntKey> ready;
+  for (auto k : call_order) {
+    if (num_pending[k] == 0) {
+      ready.push_back(k);
+    }
+  }
+  std::unordered_map<IntKey, int> stream_of;
+  std::mutex mutex;
+  std::condition_variable cv;
+  size_t num_done = 0;
+  std::exception_ptr error = nullptr;
+
+  auto worker = [&](int sid) {
+    runtime::DeviceAPI::Get(ctx)->SetDevice(ctx);
+    if (use_stream) {
+      runtime::DeviceAPI::Get(ctx)->SetStream(ctx, streams[sid]);
+    }
+    while (true) {
+      IntKey key;
+      std::set<int> wait_streams;
+      {
+        std::unique_lock<std::mutex> lock(mutex);
+        cv.wait(lock, [&]{ return !ready.empty() || num_done == call_order.size() || error; });
+        if (error || ready.empty()) {
+          break;
+        }
+        key = ready.front();
+        ready.pop_front();
+        for (auto p : predecessors[key]) {
+          if (stream_of[p] != sid) {
+            wait_streams.insert(stream_of[p]);
+          }
+        }
+      }
+
+      double execution_time = 0.0;
+      try {
+        // wait for the predecessors on the other streams by events
+        if (use_stream) {
+          for (auto s : wait_streams) {
+            runtime::DeviceAPI::Get(ctx)->SyncStreamFromTo(ctx, streams[s], streams[sid]);
+          }
+        }
+        auto beg = std::chrono::steady_clock::now();
+        while (!run_helper(key)) {
+        }
+        if (profile_subgraph) {
+          runtime::DeviceAPI::Get(ctx)->StreamSync(ctx, use_stream ? streams[sid] : nullptr);
+          auto end = std::chrono::steady_clock::now();
+          execution_time = std::chrono::duration_cast<std::chrono::microseconds>(end - beg).count() / 1e3;
+        }
+      } catch (...) {
+        std::unique_lock<std::mutex> lock(mutex);
+        error = std::current_exception();
+        cv.notify_all();
+        break;
+      }
+
+      {
+        std::unique_lock<std::mutex> lock(mutex);
+        stream_of[key] = sid;
+        num_done += 1;
+        for (auto succ : successors[key]) {
+          num_pending[succ] -= 1;
+          if (num_pending[succ] == 0) {
+            ready.push_back(succ);
+          }
+        }
+        if (profile_subgraph) {
+          subgraph_times.push_back(std::make_pair(key, execution_time));
+        }
+      }
+      cv.notify_all();
+    }
+  };
+
+  std::vector<std::thread> workers;
+  for (int i = 0; i < (int)streams.size(); ++i) {
+    workers.emplace_back(worker, i);
+  }
+  for (auto& th : workers) {
+    th.join();
+  }
+  // later work on the default stream sees all the results
+  if (use_stream) {
+    for (auto stream : streams) {
+      runtime::DeviceAPI::Get(ctx)->SyncStreamFromTo(ctx, stream, nullptr);
+    }
+  }
+  if (error) {
+    std::rethrow_exception(error);
+  }
+}
+
+
 void Session::run_functions(
   int task_id,
   TIRMultiGraph multi_graph,
@@ -851,6 +1018,35 @@ void Session::run_functions(
       ad_arrays.push_back(array_map);
     }
 
+    /* concurrent execution
+     * each worker thread owns a stream (CUDA) or runs on its own (LLVM)
+     */
+    int num_streams = sess_option->execution_streams;
+    std::vector<TVMStreamHandle> streams;
+    if (num_streams > 1) {
+      for (int i = 0; i < num_streams; ++i) {
+        if (ctx.device_type == kDLGPU) {
+          streams.push_back(runtime::DeviceAPI::Get(ctx)->CreateStream(ctx));
+        } else {
+          streams.push_back(nullptr);
+        }
+      }
+    }
+    // free the streams also when a subgraph throws
+    struct StreamGuard {
+      DLContext ctx;
+      const std::vector<TVMStreamHandle>& streams;
+      ~StreamGuard() {
+        if (ctx.device_type == kDLGPU) {
+          for (auto stream : streams) {
+            runtime::DeviceAPI::Get(ctx)->FreeStream(ctx, stream);
+          }
+        }
+      }
+    } stream_guard{ctx, streams};
+    // per subgraph profile is done by the workers when running concurrently
+    bool profile_in_order = (profile_level >= 2) && (num_streams <= 1);
+
     std::priority_queue<double> time_queue;
     for (int ad = 0; ad < advance_number; ++ad) {
       if (sess_option->report_iteration) {
@@ -876,7 +1072,7 @@ void Session::run_functions(
         * TODO: handle the order by some other
         * independent logic
         */
-        std::vector<tvm::runtime::NDArray> arrays = ad_arrays[ad][key];
+        std::vector<tvm::runtime::NDArray> arrays = ad_arrays[ad].at(key);
 
         if (!this->best_functions[key].empty()) {
           auto mod_func = this->best_functions[key].front();
@@ -885,7 +1081,7 @@ void Session::run_functions(
           auto func = std::get<2>(mod_func);
           ASSERT(func != nullptr) << "Get null function, don't know how to deal with it.";
 
-          if (profile_level >= 2) {
+          if (profile_in_order) {
             TIRGraph subgraph = multi_graph.Self()->graphs[key];
             // print(4, exe_log) << sch->schedule_entities.to_string() << "\n";
             // for (auto op : subgraph->operation_list) {
@@ -952,8 +1148,18 @@ void Session::run_functions(
       };  // end run helper
       
       auto beg = std::chrono::steady_clock::now();
-      for (auto k : static_call_order[task_id]) {
-        while (!run_helper(k)) {
+      if (num_streams > 1) {
+        std::vector<std::pair<IntKey, double> > subgraph_times;
+        run_functions_concurrently(
+          task_id, multi_graph, run_helper, streams, subgraph_times, profile_level >= 2);
+        for (auto kv : subgraph_times) {
+          print(1, exe_log) << "Subgraph: " << kv.first->value
+                            << " time cost: " << kv.second << " ms.\n";
+        }
+      } else {
+        for (auto k : static_call_order[task_id]) {
+          while (!run_helper(k)) {
+          }
         }
       }
 
@@ -1098,6 +1304,46 @@ int Session::add_task(TIRGraph graph) {
   }
 
   static_call_order[task_id] = order;
+
+  /* updates share the buffers of their weights,
+   * so every subgraph that reads a weight must finish
+   * before the subgraph that writes its update
+   */
+  std::unordered_map<te::Tensor, int> weight_index;
+  std::unordered_map<te::Tensor, int> update_index;
+  for (int i = 0; i < (int)graph->updates.size(); ++i) {
+    weight_index[graph->weights[i]] = i;
+    update_index[graph->updates[i]] = i;
+  }
+  std::unordered_map<int, std::vector<IntKey> > readers;
+  std::unordered_map<int, IntKey> producer;
+  for (auto kv : multi_graph->graphs) {
+    for (auto tt : kv.second->tensors) {
+      te::Tensor t = multi_graph.Self()->tensor_index[tt];
+      if (weight_index.find(t) != weight_index.end()) {
+        readers[weight_index[t]].push_back(kv.first);
+      }
+    }
+    for (auto tt : kv.second->outputs) {
+      te::Tensor t = multi_graph.Self()->tensor_index[tt];
+      if (update_index.find(t) != update_index.end()) {
+        producer[update_index[t]] = kv.first;
+      }
+    }
+  }
+  std::vector<std::pair<IntKey, IntKey> > update_edges;
+  std::set<std::pair<int, int> > seen;
+  for (auto kv : producer) {
+    for (auto reader : readers[kv.first]) {
+      if (reader->value == kv.second->value) {
+        continue;
+      }
+      if (seen.insert(std::make_pair(reader->value, kv.second->value)).second) {
+        update_edges.push_back(std::make_pair(reader, kv.second));
+      }
+    }
+  }
+  static_update_edges[task_id] = update_edges;
   return task_id;
 }
 
@@ -1506,7 +1752,8 @@ TVM_REGISTER_GLOBAL("tg.create_session_option")
   double execution_timeout,
   bool synchronize_subgraph,
   std::string execution_log_file,
-  bool use_tensor_core
+  bool use_tensor_core,
+  int execution_streams
 ) {
   SessionOption ret = SessionOption(
     report_profile,
@@ -1530,7 +1777,8 @@ TVM_REGISTER_GLOBAL("tg.create_session_option")
     execution_timeout,
     synchronize_subgraph,
     execution_log_file,
-    use_tensor_core);
+    use_tensor_core,
+    execution_streams);
   return ret;
 });
 
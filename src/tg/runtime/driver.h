@@ -47,6 +47,7 @@ class SessionOptionNode : public Object {
   bool synchronize_subgraph;
   std::string execution_log_file;
   bool use_tensor_core;
+  int execution_streams = 1;
 
   void VisitAttrs(tvm::AttrVisitor* v) {
     v->Visit("report_profile", &report_profile);
@@ -71,6 +72,7 @@ class SessionOptionNode : public Object {
     v->Visit("synchronize_subgraph", &synchronize_subgraph);
     v->Visit("execution_log_file", &execution_log_file);
     v->Visit("use_tensor_core", &use_tensor_core);
+    v->Visit("execution_streams", &execution_streams);
   }
 
   static constexpr const char* _type_key = "tg.autoschedule.SessionOption";
@@ -102,7 +104,8 @@ class SessionOption : public ObjectRef {
     double execution_timeout,
     bool synchronize_subgraph,
     std::string execution_log_file,
-    bool use_tensor_core);
+    bool use_tensor_core,
+    int execution_streams=1);
   
   SessionOption(int dummy);
 
@@ -128,6 +131,7 @@ class Session {
   std::unordered_map<int, TIRGraph> task_graph;
   std::unordered_map<int, TIRMultiGraph> task_cache;
   std::unordered_map<int, std::vector<IntKey> > static_call_order;
+  std::unordered_map<int, std::vector<std::pair<IntKey, IntKey> > > static_update_edges;
   std::unordered_map<te::Tensor, tvm::runtime::NDArray> persistent_tensors;
   std::unordered_map<te::Tensor, tvm::runtime::NDArray> volatile_tensors;
 
@@ -183,6 +187,14 @@ class Session {
     std::string save_to="saved_schedules.txt",
     int profile_level=0,
     bool no_actual_run=false);
+
+  void run_functions_concurrently(
+    int task_id,
+    TIRMultiGraph multi_graph,
+    std::function<bool(IntKey key)> run_helper,
+    const std::vector<TVMStreamHandle>& streams,
+    std::vector<std::pair<IntKey, double> >& subgraph_times,
+    bool profile_subgraph);
   
   int add_task(TIRGraph graph);
   void begin_tuning(int task_id, int advance_number, std::string reference="",
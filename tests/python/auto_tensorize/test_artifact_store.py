@@ -0,0 +1,53 @@
+import os
+from tvm.auto_tensorize.search.artifact import ArtifactStore
+
+
+def touch(store, output_format="so"):
+    filename = store.new_filename(output_format)
+    with open(filename, "w") as fout:
+        fout.write("dummy")
+    return filename
+
+
+def test_release():
+    store = ArtifactStore()
+    filename = touch(store, "tar")
+    # what load_module leaves next to a tar
+    with open(filename + ".so", "w") as fout:
+        fout.write("dummy")
+    os.mkdir(os.path.splitext(filename)[0])
+    store.release(filename)
+    assert os.listdir(store.dirname) == []
+    # files out of the store are not touched
+    store.release("/not/in/store.so")
+    store.cleanup()
+    assert not os.path.exists(store.dirname)
+
+
+def test_retained():
+    store = ArtifactStore(max_retained=2)
+    filenames = [touch(store) for i in range(4)]
+    for filename in filenames:
+        store.release(filename)
+    # only the most recent ones are kept
+    assert [os.path.exists(x) for x in filenames] == [False, False, True, True]
+    store.release(filenames[2])
+    store.release(touch(store))
+    assert not os.path.exists(filenames[3])
+    assert os.path.exists(filenames[2])
+    store.cleanup()
+
+
+def test_joined_filenames():
+    store = ArtifactStore()
+    tenet_file = touch(store, "tenet")
+    cuda_file = touch(store, "so")
+    store.release("-***-".join([tenet_file, cuda_file]))
+    assert os.listdir(store.dirname) == []
+    store.cleanup()
+
+
+if __name__ == "__main__":
+    test_release()
+    test_retained()
+    test_joined_filenames()
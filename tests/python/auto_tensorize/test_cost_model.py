@@ -0,0 +1,58 @@
+import numpy as np
+from tvm.auto_tensorize.search.cost_model import (
+    strip_direction,
+    get_record_features,
+    RidgeCostModel,
+)
+
+
+class FakeParams(object):
+    def __init__(self, inline, spatial_factors):
+        self.inline = inline
+        self.spatial_factors = spatial_factors
+
+    def to_json(self):
+        return {"inline": self.inline, "spatial_factors": self.spatial_factors}
+
+
+def test_strip_direction():
+    assert strip_direction((1, -1)) == 1
+    assert strip_direction([([2, 4, 1, 2], (1, 0, -1)), ([1, 1, 8, 2], -1)]) == [
+        [2, 4, 1, 2],
+        [1, 1, 8, 2],
+    ]
+    assert strip_direction([]) == []
+    # lists of scalar pairs of any length
+    assert strip_direction([(2, -1), (4, 1)]) == [2, 4]
+    assert strip_direction([(16, -1), (64, 1), (512, 0)]) == [16, 64, 512]
+    # as read back from json
+    assert strip_direction([[[2, 4, 1, 2], [1, 0, -1]]]) == [[2, 4, 1, 2]]
+    assert strip_direction([16, -1]) == 16
+
+
+def test_record_features():
+    params = FakeParams((1, -1), [([2, 4, 1, 2], (1, 0, -1)), ([1, 1, 8, 2], -1)])
+    features = get_record_features(params)
+    assert len(features) == 9
+
+
+def test_ridge_cost_model():
+    np.random.seed(0)
+    model = RidgeCostModel(min_samples=8)
+    records = []
+    values = []
+    for i in range(64):
+        a, b = np.random.choice([1, 2, 4, 8, 16], size=2)
+        records.append(FakeParams((0, -1), [([int(a), int(b)], -1)]))
+        values.append(float(a * 2 + b))
+    model.update(records[:48], values[:48])
+    pred = model.predict(records[48:])
+    # the best predicted candidate should be among the truly good ones
+    best = int(np.argmax(pred))
+    assert values[48 + best] >= np.median(values[48:])
+
+
+if __name__ == "__main__":
+    test_strip_direction()
+    test_record_features()
+    test_ridge_cost_model()
@@ -0,0 +1,84 @@
+import tvm
+from tvm import auto_tensorize as at
+
+
+def gemm(M, N, K):
+    A = tvm.te.placeholder([M, K], dtype="float16", name="A")
+    B = tvm.te.placeholder([K, N], dtype="float16", name="B")
+    k = tvm.te.reduce_axis([0, K], name="k")
+    C = tvm.te.compute(
+        [M, N],
+        lambda i, j: tvm.te.sum((A[i, k] * B[k, j]).astype("float16"), axis=k),
+        name="C",
+    )
+    return [A, B, C]
+
+
+def get_schedule_generator():
+    hw_abs_dag = at.WMMAFp16Fp16()
+    compute_key = "nnn"
+    shape_key = "16x16x16"
+    intrin_dag, _ = hw_abs_dag.get_effective_compute_dag(compute_key, shape_key)
+    A, B, C = gemm(1024, 1024, 1024)
+    target_dag = at.compute_dag_from_tensors([C])
+
+    main_op_map = {intrin_dag.op_lst[0]: target_dag.op_lst[0]}
+    ii, jj = intrin_dag.op_lst[0].axis
+    (kk,) = intrin_dag.op_lst[0].reduce_axis
+    i, j = target_dag.op_lst[0].axis
+    (k,) = target_dag.op_lst[0].reduce_axis
+    axis_map = {ii: [i], jj: [j], kk: [k]}
+    match_result = at.IntrinMatchResult(
+        hw_abs_dag, compute_key, shape_key, main_op_map, {}, axis_map, target_dag, intrin_dag
+    )
+
+    gen = at.MappingGenerator(match_result)
+    record = gen.get(policy="random")
+    app = at.MappingApplier(match_result)
+    new_state = app.apply(record)
+    return at.CUDAScheduleGeneratorV2(match_result, new_state, verbose_init=False)
+
+
+def make_record(schedule_gen, spatial_factors, reduce_factors):
+    return schedule_gen.record_cls(
+        (0, -1),
+        (2, -1),
+        [(x, -1) for x in spatial_factors],
+        [(x, -1) for x in reduce_factors],
+        [([1024, 8, 4], -1)],
+        (16, -1),
+        (16, -1),
+    )
+
+
+def test_resource_estimate():
+    schedule_gen = get_schedule_generator()
+    record = make_record(schedule_gen, [[16, 1, 2, 2], [16, 1, 2, 2]], [[16, 2, 2]])
+    # 64x64 fp16 tiles of A and B
+    assert schedule_gen.estimate_shared_memory_bytes(record) == 2 * 64 * 64 * 2
+    # 2x2 accumulators and 2x2 fragments for each of A and B
+    assert schedule_gen.estimate_register_bytes(record) == 3 * 4 * 16 * 16 * 2
+    assert schedule_gen.valid(record)
+
+
+def test_reject_before_lowering():
+    schedule_gen = get_schedule_generator()
+    # only 4 warps, but each block computes the whole output
+    record = make_record(schedule_gen, [[1, 1, 2, 32], [1, 1, 2, 32]], [[1, 8, 8]])
+    assert (
+        schedule_gen.estimate_shared_memory_bytes(record) > schedule_gen.max_shared_memory_bytes
+    )
+    assert not schedule_gen.valid(record)
+    # the sampled records all fit
+    for _ in range(20):
+        record = schedule_gen.get(policy="random")
+        assert schedule_gen.valid(record)
+        assert (
+            schedule_gen.estimate_shared_memory_bytes(record)
+            <= schedule_gen.max_shared_memory_bytes
+        )
+
+
+if __name__ == "__main__":
+    test_resource_estimate()
+    test_reject_before_lowering()
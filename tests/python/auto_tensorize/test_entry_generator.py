@@ -0,0 +1,93 @@
+import os
+import json
+import tempfile
+from tvm.auto_tensorize.search import SAEntryGenerator
+from tvm.auto_tensorize.search.record import record_fingerprint
+
+
+class FakeParams(object):
+    def __init__(self, inline, factors):
+        self.inline = inline
+        self.factors = factors
+
+    def to_json(self):
+        return {"inline": self.inline, "factors": self.factors}
+
+    def __str__(self):
+        obj = self.to_json()
+        new_obj = {}
+
+        def handle(v):
+            if isinstance(v, list):
+                return [handle(x) for x in v]
+            if isinstance(v, tuple) and len(v) == 2:
+                return handle(v[0])
+            return v
+
+        for k, v in obj.items():
+            new_obj[k] = handle(v)
+        return json.dumps(new_obj)
+
+
+class FakeGenerator(SAEntryGenerator):
+    def record_from_json(self, obj):
+        return FakeParams(obj["inline"], obj["factors"])
+
+
+def test_record_fingerprint():
+    a = FakeParams((1, -1), [([2, 4], (1, -1)), ([8, 1], -1)])
+    b = FakeParams((1, 0), [([2, 4], (0, 1)), ([8, 1], 0)])
+    c = FakeParams((1, 0), [([4, 2], (0, 1)), ([8, 1], 0)])
+    assert str(a) == str(b) and record_fingerprint(a) == record_fingerprint(b)
+    assert str(a) != str(c) and record_fingerprint(a) != record_fingerprint(c)
+    fingerprints = set(
+        [
+            record_fingerprint(FakeParams((i, -1), [([i, j], -1)]))
+            for i in range(64)
+            for j in range(64)
+        ]
+    )
+    assert len(fingerprints) == 64 * 64
+
+
+def test_bounded_entries():
+    dirname = tempfile.mkdtemp()
+    spill_file = os.path.join(dirname, "spill.log")
+    gen = FakeGenerator(
+        0.1,
+        FakeParams,
+        log_file="",
+        topk=4,
+        verbose_init=False,
+        max_entries=8,
+        spill_file=spill_file,
+    )
+    for i in range(100):
+        gen.feedback(FakeParams((i, -1), [([i, 1], -1)]), float(i))
+    assert gen.num_entries() < 16
+    assert gen.get_best_entry().value == 99.0
+    assert [x.value for x in gen.topk(k=4)] == [99.0, 98.0, 97.0, 96.0]
+    # every record is still visited, visited is not bounded by default
+    assert len(gen.visited) == 100
+    with open(spill_file, "r") as fin:
+        spilled = [json.loads(line) for line in fin]
+    assert len(spilled) + gen.num_entries() == 100
+
+
+def test_bounded_visited():
+    gen = FakeGenerator(
+        0.1, FakeParams, log_file="", topk=4, verbose_init=False, max_entries=8, max_visited=32
+    )
+    records = [FakeParams((i, -1), [([i, 1], -1)]) for i in range(100)]
+    for i, record in enumerate(records):
+        gen.feedback(record, float(i))
+    assert len(gen.visited) == 32
+    # the oldest records are forgotten first
+    assert gen.record_key(records[0]) not in gen.visited
+    assert gen.visited[gen.record_key(records[-1])] == 99.0
+
+
+if __name__ == "__main__":
+    test_record_fingerprint()
+    test_bounded_entries()
+    test_bounded_visited()
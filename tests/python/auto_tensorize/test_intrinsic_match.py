@@ -418,6 +418,75 @@ def test6(
     # print(tvm.lower(sch, args, simple_mode=True))
 
 
+@register_test
+def test7():
+    """Memoized match results of structurally identical DAGs"""
+    at.clear_match_cache()
+    A, B, Conv = conv2d(1, 64, 14, 14, 64, 3, 3, 1, 1, 1)
+    first = at.get_match_results(at.compute_dag_from_tensors([Conv]), "cuda")
+    # a new DAG with the same computation hits the cache
+    A, B, Conv = conv2d(1, 64, 14, 14, 64, 3, 3, 1, 1, 1)
+    target_dag = at.compute_dag_from_tensors([Conv])
+    second = at.get_match_results(target_dag, "cuda", n_parallel=4)
+    assert len(first) == len(second) > 0
+    for x, y in zip(first, second):
+        assert str(x) == str(y)
+        (top,) = y.main_op_map.values()
+        assert top.same_as(Conv.op)
+        for iiv, tivs in y.axis_map.items():
+            assert [t.var.name for t in tivs] == [t.var.name for t in x.axis_map[iiv]]
+            for t in tivs:
+                assert any([t.same_as(a) for a in list(Conv.op.axis) + list(Conv.op.reduce_axis)])
+
+    # renamed tensors and axes share the structure, and the cache
+    def gemm(prefix):
+        A = tvm.te.placeholder([256, 256], dtype="float16", name=prefix + "A")
+        B = tvm.te.placeholder([256, 256], dtype="float16", name=prefix + "B")
+        k = tvm.te.reduce_axis([0, 256], name=prefix + "k")
+        return tvm.te.compute(
+            [256, 256],
+            lambda i, j: tvm.te.sum((A[i, k] * B[k, j]).astype("float16"), axis=k),
+            name=prefix + "C",
+        )
+
+    from tvm.auto_tensorize.tensorization_phases import intrin_match
+
+    C = gemm("")
+    D = gemm("renamed_")
+    assert intrin_match.get_op_structure_key(C.op) == intrin_match.get_op_structure_key(D.op)
+    first = at.get_match_results(at.compute_dag_from_tensors([C]), "cuda")
+    num_cached = len(intrin_match.MATCH_CACHE)
+    second = at.get_match_results(at.compute_dag_from_tensors([D]), "cuda")
+    assert len(intrin_match.MATCH_CACHE) == num_cached
+    assert [str(x) for x in first] == [str(x) for x in second]
+    for y in second:
+        (top,) = y.main_op_map.values()
+        assert top.same_as(D.op)
+
+
+@register_test
+def test8():
+    """Rank mappings without hardware"""
+    A, B, Conv = conv2d(1, 64, 14, 14, 64, 3, 3, 1, 1, 1)
+    match_results = at.get_match_results(at.compute_dag_from_tensors([Conv]), "cuda")
+    ranked = at.rank_mappings(match_results[:1])
+    assert len(ranked) > 0
+    scores = [x[0] for x in ranked]
+    assert scores == sorted(scores, reverse=True)
+    for score, match_result, record in ranked[:3]:
+        print(score, record)
+
+    # learn that the top analytical mapping is actually slow
+    model = at.policy.MappingCostModel(min_samples=2)
+    bit_vecs = [x[2].vmap_choice[0] for x in ranked]
+    values = [1.0 for x in ranked]
+    values[0] = 0.01
+    model.update(match_results[0], bit_vecs, values)
+    new_ranked = at.rank_mappings(match_results[:1], model=model)
+    if len(ranked) > 1:
+        assert new_ranked[0][2].vmap_choice[0] != bit_vecs[0]
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
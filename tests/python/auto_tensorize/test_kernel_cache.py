@@ -0,0 +1,54 @@
+import tempfile
+import numpy as np
+import tvm
+from tvm import te
+from tvm import auto_tensorize as at
+
+
+class FakeDAG(object):
+    def __init__(self, inputs, tensors):
+        self.inputs = inputs
+        self.tensors = tensors
+
+    def get_inputs(self):
+        return self.inputs
+
+
+class FakeApplier(object):
+    def __init__(self):
+        A = te.placeholder([1024], name="A")
+        B = te.compute([1024], lambda i: A[i] + 1, name="B")
+        self.target_dag = FakeDAG([A], [B])
+        self.count = 0
+
+    def apply(self, sch, params):
+        self.count += 1
+        B = self.target_dag.tensors[0]
+        outer, inner = sch[B].split(B.op.axis[0], factor=params)
+        sch[B].vectorize(inner)
+        return sch
+
+
+def test_kernel_cache():
+    cache_dir = tempfile.mkdtemp()
+    sch_app = FakeApplier()
+    cache = at.KernelCache(cache_dir)
+    func = cache.get_or_build("llvm|fake|add|1024|||", sch_app, 8, "llvm")
+    assert sch_app.count == 1
+
+    # a new process only loads the library
+    cache = at.KernelCache(cache_dir)
+    func = cache.get_or_build("llvm|fake|add|1024|||", sch_app, 8, "llvm")
+    assert sch_app.count == 1
+    a = tvm.nd.array(np.random.uniform(size=[1024]).astype("float32"))
+    b = tvm.nd.array(np.zeros([1024], dtype="float32"))
+    func(a, b)
+    np.testing.assert_allclose(b.asnumpy(), a.asnumpy() + 1, rtol=1e-5)
+
+    # different params are different kernels
+    cache.get_or_build("llvm|fake|add|1024|||", sch_app, 16, "llvm")
+    assert sch_app.count == 2
+
+
+if __name__ == "__main__":
+    test_kernel_cache()
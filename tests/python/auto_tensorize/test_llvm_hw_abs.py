@@ -0,0 +1,68 @@
+import pytest
+import tvm
+from tvm import te
+from tvm import auto_tensorize as at
+
+
+def test_llvm_hw_abs_dag_registered():
+    for target, name in [
+        ("llvm -mcpu=skylake-avx512", "gemv"),
+        ("llvm -mcpu=cascadelake", "gemv"),
+        ("llvm -mcpu=sapphirerapids", "gemm"),
+    ]:
+        hw_abs_dags = at.query_hw_abs_dag(target)
+        assert len(hw_abs_dags) > 0
+        for hw_abs_dag_class in hw_abs_dags:
+            hw_abs_dag = hw_abs_dag_class()
+            assert hw_abs_dag.main_hw_abs_name == name
+            shape_key = hw_abs_dag.get_all_shape_keys()[0]
+            ins, outs = hw_abs_dag.get_standalone_hw_abs_compute_expression(
+                "dummy", shape_key, name
+            )
+            assert len(ins) == 2 and len(outs) == 1
+            assert outs[0].dtype == "int32"
+
+
+def test_amx_compute_expression():
+    hw_abs = at.AMXInt8TileGemm("gemm")
+    (A, B), (C,) = hw_abs.get_compute_expression()
+    assert [int(x) for x in A.shape] == [16, 16, 4]
+    assert [int(x) for x in B.shape] == [16, 16, 4]
+    assert [int(x) for x in C.shape] == [16, 16]
+
+
+def tiled_gemv(M, K, tile, parallel=True):
+    A = te.placeholder([K], dtype="uint8", name="A")
+    B = te.placeholder([M, K], dtype="int8", name="B")
+    k = te.reduce_axis([0, K], name="k")
+    C = te.compute(
+        [M],
+        lambda i: te.sum(A[k].astype("int32") * B[i, k].astype("int32"), axis=[k]),
+        name="C")
+    sch = te.create_schedule(C.op)
+    CL = sch.cache_write(C, "global")
+    if parallel:
+        io, ii = sch[C].split(C.op.axis[0], factor=tile)
+        sch[C].parallel(io)
+        sch[CL].compute_at(sch[C], io)
+    return tvm.lower(sch, [A, B, C], simple_mode=True)
+
+
+def test_llvm_program_checker():
+    checker = at.LLVMProgramChecker(arch="skylake-avx512", verbose_init=False)
+    # 16 int32 accumulators fit in the registers
+    checker.check(tiled_gemv(1024, 64, 16))
+    # 4096 int32 accumulators do not
+    with pytest.raises(at.CheckError):
+        checker.check(tiled_gemv(8192, 64, 4096))
+    # a temporary outside any parallel loop is not a per-thread buffer
+    checker.check(tiled_gemv(65536, 64, 65536, parallel=False))
+    # AMX tiles give more room for accumulators
+    checker = at.LLVMProgramChecker(arch="sapphirerapids", verbose_init=False)
+    checker.check(tiled_gemv(8192, 64, 1024))
+
+
+if __name__ == "__main__":
+    test_llvm_hw_abs_dag_registered()
+    test_amx_compute_expression()
+    test_llvm_program_checker()
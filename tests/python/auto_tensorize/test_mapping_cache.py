@@ -0,0 +1,47 @@
+import pytest
+import tvm
+from tvm import te
+from tvm import auto_tensorize as at
+
+
+def gemm(M, N, K):
+    A = te.placeholder([M, K], dtype="float16", name="A")
+    B = te.placeholder([K, N], dtype="float16", name="B")
+    k = te.reduce_axis([0, K], name="k")
+    C = te.compute(
+        [M, N],
+        lambda i, j: te.sum((A[i, k] * B[k, j]).astype("float32"), axis=[k]),
+        name="C")
+    return at.compute_dag_from_tensors([C])
+
+
+def test_mapping_cache():
+    target_dag = gemm(64, 64, 64)
+    match_result = at.get_match_results(target_dag, "cuda")[0]
+    app = at.MappingApplier(match_result)
+    records = at.MappingGenerator(match_result).get_all()
+    feasible = app.apply_all(records)
+    assert len(feasible) > 0
+    for record, state in feasible:
+        # applying again reuses the mapped state
+        assert app.apply(record) is state
+
+
+def test_mapping_negative_cache():
+    # the rows are fewer than the intrinsic rows
+    target_dag = gemm(4, 64, 64)
+    match_result = at.get_match_results(target_dag, "cuda")[0]
+    app = at.MappingApplier(match_result, strict=True)
+    records = at.MappingGenerator(match_result).get_all()
+    feasible = app.apply_all(records)
+    assert len(feasible) + len(app.infeasible_cache) == len(records)
+    for record in records:
+        if (record.as_tuple(), False) in app.infeasible_cache:
+            assert not app.is_feasible(record)
+            with pytest.raises(RuntimeError):
+                app.apply(record)
+
+
+if __name__ == "__main__":
+    test_mapping_cache()
+    test_mapping_negative_cache()
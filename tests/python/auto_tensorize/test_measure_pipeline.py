@@ -0,0 +1,160 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import tvm
+from tvm import te
+from tvm.auto_tensorize.search.measure import MeasureOptions, MeasureLease, measure_batches
+from tvm.auto_tensorize.search.measure import (
+    MAX_FLOAT,
+    pebble_schedule_builder_build,
+    pebble_local_runner_run,
+)
+from tvm.auto_tensorize.search.artifact import get_artifact_store
+
+def test_measure_batches():
+    feedback = []
+
+    def propose(b):
+        # every proposal sees all the feedback before the pending batches
+        assert len(feedback) >= b - 1
+        return [b]
+
+    def build(params_lst):
+        time.sleep(0.05)
+        return [(x, os.getpid()) for x in params_lst]
+
+    def run(build_results):
+        return [x * 10 for x, pid in build_results], [pid for x, pid in build_results]
+
+    for pipeline in [False, True]:
+        feedback = []
+        pids = set()
+        for params_lst, (run_results, build_pids) in measure_batches(
+            propose, build, run, 6, pipeline=pipeline
+        ):
+            feedback.append((params_lst, run_results))
+            pids.update(build_pids)
+        assert feedback == [([b], [b * 10]) for b in range(6)]
+        # the pipeline builds in forked processes, never in this one
+        assert (os.getpid() in pids) == (not pipeline)
+
+
+def test_measure_batches_build_error():
+    def build(params_lst):
+        raise ValueError("bad params")
+
+    batches = measure_batches(lambda b: [b], build, lambda x: x, 3, pipeline=True)
+    try:
+        next(batches)
+        assert False
+    except ValueError as error:
+        assert "bad params" in str(error)
+
+
+def test_measure_batches_early_stop():
+    batches = measure_batches(lambda b: [b], lambda x: x, lambda x: x, 100, pipeline=True)
+    assert next(batches) == ([0], [0])
+    batches.close()
+
+
+def test_measure_lease():
+    lease = MeasureLease(dev_ids=[0, 1], build_workers=4)
+    lock = threading.Lock()
+    status = {"workers": 0, "max_workers": 0, "devices": set()}
+
+    def builder(sch_app, params_lst, measure_opt, checker, n_parallel=1):
+        with lock:
+            status["workers"] += n_parallel
+            status["max_workers"] = max(status["max_workers"], status["workers"])
+        time.sleep(0.02)
+        with lock:
+            status["workers"] -= n_parallel
+        return params_lst
+
+    def runner(build_results, measure_opt, n_parallel=1):
+        with lock:
+            # a device is never shared by two runners
+            assert measure_opt.dev_id not in status["devices"]
+            status["devices"].add(measure_opt.dev_id)
+        time.sleep(0.02)
+        with lock:
+            status["devices"].remove(measure_opt.dev_id)
+        return [measure_opt.dev_id for x in build_results]
+
+    builder = lease.wrap_builder(builder)
+    runner = lease.wrap_runner(lease.wrap_runner(runner))
+    measure_opt = MeasureOptions(dev_id=0)
+
+    def tune(i):
+        for b in range(3):
+            build_results = builder(None, [i, b], measure_opt, None, n_parallel=3)
+            run_results = runner(build_results, measure_opt, n_parallel=1)
+            assert len(run_results) == 2 and run_results[0] in [0, 1]
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(tune, range(4)))
+    assert status["max_workers"] <= 4
+    # the caller's options are untouched
+    assert measure_opt.dev_id == 0
+
+
+def test_schedule_builder():
+    schs = []
+    args_lst = []
+    for factor in [1, 4, 16]:
+        A = te.placeholder([64, 64], name="A")
+        B = te.compute([64, 64], lambda i, j: A[i, j] + 1, name="B")
+        sch = te.create_schedule(B.op)
+        sch[B].split(B.op.axis[1], factor=factor)
+        schs.append(sch)
+        args_lst.append([A, B])
+    # a proposal that can not be lowered fails alone
+    schs.append(schs[0])
+    args_lst.append(["not a tensor"])
+    measure_opt = MeasureOptions(target="llvm", verbose=0, number=1, min_repeat_ms=1)
+    build_results = pebble_schedule_builder_build(schs, args_lst, measure_opt, n_parallel=2)
+    run_results = pebble_local_runner_run(build_results, measure_opt, n_parallel=2)
+    assert [res.error_no for res in run_results[:3]] == [0, 0, 0]
+    assert run_results[-1].error_no != 0
+    assert run_results[-1].costs[0].value == MAX_FLOAT
+    # the runner releases the built modules
+    assert os.listdir(get_artifact_store().dirname) == []
+
+
+def test_adaptive_runner():
+    schs = []
+    args_lst = []
+    for i in range(2):
+        A = te.placeholder([64, 64], name="A")
+        B = te.compute([64, 64], lambda i, j: A[i, j] + 1, name="B")
+        schs.append(te.create_schedule(B.op))
+        args_lst.append([A, B])
+    # much slower than the others
+    A = te.placeholder([512, 512], name="A")
+    k = te.reduce_axis([0, 512], name="k")
+    C = te.compute([512, 512], lambda i, j: te.sum(A[i, k] * A[k, j], axis=k), name="C")
+    schs.append(te.create_schedule(C.op))
+    args_lst.append([A, C])
+    measure_opt = MeasureOptions(
+        target="llvm", verbose=0, number=10, repeat=5, min_repeat_ms=10, early_reject_factor=4.0
+    )
+    build_results = pebble_schedule_builder_build(schs, args_lst, measure_opt)
+    run_results = pebble_local_runner_run(build_results, measure_opt)
+    assert [res.error_no for res in run_results] == [0, 0, 0]
+    assert [res.early_rejected for res in run_results] == [False, False, True]
+    # survivors get the full repeats, the rejected one only the probe
+    assert [res.num_samples for res in run_results] == [5, 5, 3]
+    for res in run_results:
+        low, high = res.confidence_interval
+        assert low <= np.mean([x.value for x in res.costs]) <= high
+
+
+if __name__ == "__main__":
+    test_measure_batches()
+    test_measure_batches_build_error()
+    test_measure_batches_early_stop()
+    test_measure_lease()
+    test_schedule_builder()
+    test_adaptive_runner()
@@ -0,0 +1,78 @@
+import numpy as np
+from tvm import auto_scheduler
+from tvm.auto_tensorize.backend import tenet
+from tvm.auto_tensorize.auto_tensorize import get_measure_funcs
+from tvm.auto_tensorize.search.measure import (
+    MeasureOptions,
+    InMemoryBuildResult,
+    tenet_inmemory_builder_build,
+    tenet_inmemory_runner_run,
+    pebble_local_builder_build,
+    pebble_local_runner_run,
+)
+
+
+def random_funcs(num, target="tenet gemm"):
+    np.random.seed(0)
+    funcs = []
+    for i in range(num):
+        space_time_loops = []
+        for l in range(3):
+            space = np.random.choice([1, 2, 4, 8], size=np.random.randint(0, 3)).tolist()
+            time = np.random.choice([1, 2, 3, 8], size=np.random.randint(1, 3)).tolist()
+            space_time_loops.append([space, time])
+        memory_size = [
+            ["global", int(np.random.randint(1, 2**20))],
+            ["shared", int(np.random.randint(1, 2**17))],
+            ["local", int(np.random.randint(1, 2**14))],
+        ]
+        funcs.append(tenet.TenetFunc(memory_size, space_time_loops, target))
+    return funcs
+
+
+def test_evaluate_funcs():
+    funcs = random_funcs(100)
+    costs = tenet.evaluate_funcs(funcs)
+    for func, cost in zip(funcs, costs):
+        try:
+            expected = tenet.evaluate_func(func)[0]
+        except RuntimeError:
+            # exceeds the memory capacity
+            expected = float("inf")
+        assert np.isclose(cost, expected) or cost == expected == float("inf")
+
+
+def test_inmemory_runner():
+    funcs = random_funcs(20)
+    build_results = [InMemoryBuildResult(func, [], 0, None, 0.0) for func in funcs]
+    build_results.append(InMemoryBuildResult(None, [], 1, "instantiation error", 0.0))
+    measure_opt = MeasureOptions(target="tenet gemm", verbose=0)
+    run_results = tenet_inmemory_runner_run(build_results, measure_opt)
+    assert len(run_results) == len(build_results)
+    for func, res in zip(funcs, run_results):
+        cost = tenet.evaluate_funcs([func])[0]
+        if cost == float("inf"):
+            assert res.error_no == auto_scheduler.measure.MeasureErrorNo.RUNTIME_DEVICE
+        else:
+            assert res.error_no == 0
+            assert np.isclose(res.costs[0].value, cost)
+    assert run_results[-1].error_no == 1
+
+
+def test_default_measure_funcs():
+    assert get_measure_funcs("tenet gemm") == (
+        tenet_inmemory_builder_build,
+        tenet_inmemory_runner_run,
+    )
+    assert get_measure_funcs("tenet cuda") == (pebble_local_builder_build, pebble_local_runner_run)
+    assert get_measure_funcs("llvm") == (pebble_local_builder_build, pebble_local_runner_run)
+    # an explicit builder is kept
+    builder, runner = get_measure_funcs("tenet gemm", builder=pebble_local_builder_build)
+    assert builder is pebble_local_builder_build
+    assert runner is tenet_inmemory_runner_run
+
+
+if __name__ == "__main__":
+    test_evaluate_funcs()
+    test_inmemory_runner()
+    test_default_measure_funcs()
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+from tvm.auto_tensorize.backend import tenet
+from tvm.auto_tensorize.target import TENET, TENET_BUILTIN_SPECS
+
+
+def random_funcs(num, target="tenet gemm"):
+    np.random.seed(0)
+    funcs = []
+    for i in range(num):
+        space_time_loops = []
+        for l in range(3):
+            space = np.random.choice([1, 2, 4, 8], size=np.random.randint(0, 3)).tolist()
+            time = np.random.choice([1, 2, 3, 8], size=np.random.randint(1, 3)).tolist()
+            space_time_loops.append([space, time])
+        memory_size = [
+            ["global", int(np.random.randint(1, 2**20))],
+            ["shared", int(np.random.randint(1, 2**17))],
+            ["local", int(np.random.randint(1, 2**14))],
+        ]
+        funcs.append(tenet.TenetFunc(memory_size, space_time_loops, target))
+    return funcs
+
+
+def test_spec_file(tmp_path):
+    filename = str(tmp_path / "gemm.json")
+    with open(filename, "w") as fout:
+        json.dump(TENET_BUILTIN_SPECS["gemm"], fout)
+    funcs = random_funcs(20)
+    expected = tenet.evaluate_funcs(funcs)
+    from_file = [tenet.TenetFunc(f.memory_size, f.space_time_loops, "tenet " + filename) for f in funcs]
+    costs = tenet.evaluate_funcs(from_file)
+    assert np.allclose(costs, expected) or np.array_equal(costs, expected)
+
+
+def test_four_levels():
+    spec = {
+        "compute_latency": 16,
+        "levels": [
+            {"scope": "local", "size": 2**10, "bandwidth": 16, "parallelism": 1},
+            {"scope": "shared", "size": 2**14, "bandwidth": 64, "parallelism": 4},
+            {"scope": "l2", "size": 2**20, "bandwidth": 256, "parallelism": 4},
+            {"scope": "global", "size": 2**34, "bandwidth": None, "parallelism": 16},
+        ],
+    }
+    arch = TENET(arch="four_levels", spec=spec)
+    func = tenet.TenetFunc(
+        [["global", 2**20], ["l2", 2**16], ["shared", 2**12], ["local", 2**8]],
+        [[[4], [2]], [[2], [4]], [[4], [1]], [[1], [8]]],
+        "tenet four_levels",
+    )
+    cost = tenet.evaluate_func(func, arch=arch)[0]
+    assert np.isclose(tenet.evaluate_funcs([func], arch=arch)[0], cost)
+    assert arch.on_chip_memory() == 2**10 + 2**14 + 2**20
+
+
+def test_codesign_sweep():
+    funcs = random_funcs(50)
+    space = {
+        "local.parallelism": [1, 2, 4],
+        "shared.size": [16 * 2**10, 64 * 2**10, 128 * 2**10],
+    }
+    points, front = tenet.codesign_sweep(funcs, space, n_parallel=2, verbose=0)
+    assert len(points) == 9
+    arch = TENET(arch="gemm")
+    for point in points:
+        costs = tenet.evaluate_funcs(funcs, arch=arch.update(point.params))
+        assert np.isclose(point.latency, costs.min()) or point.latency == costs.min()
+    # nothing on the front is dominated
+    for point in front:
+        for other in points:
+            assert not (
+                other.latency < point.latency and other.on_chip_memory <= point.on_chip_memory
+            )
+
+
+if __name__ == "__main__":
+    import pathlib
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_spec_file(pathlib.Path(tmp))
+    test_four_levels()
+    test_codesign_sweep()
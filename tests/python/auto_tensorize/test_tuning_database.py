@@ -0,0 +1,93 @@
+import os
+import json
+import math
+import tempfile
+from functools import reduce
+import tvm
+from tvm import auto_tensorize as at
+from tvm.auto_tensorize.search.database import TuningDatabase, make_tuning_key
+from tvm.auto_tensorize.tensorization_phases.schedule_base import SplitFactorGenerator
+
+
+def test_topk():
+    dirname = tempfile.mkdtemp()
+    db = TuningDatabase(os.path.join(dirname, "test.db"))
+    key = make_tuning_key("cuda", "wmma_fp16_fp32", "ntn", "16x16x16", "(1,0,1)", "abc")
+    other = make_tuning_key("cuda", "wmma_fp16_fp32", "ntn", "32x8x16", "(1,0,1)", "abc")
+    for i in range(10):
+        db.add(key, {"id": i}, float(i))
+        db.add(other, {"id": i}, float(100 + i))
+    top = db.topk(key, k=3)
+    assert [x[1] for x in top] == [9.0, 8.0, 7.0]
+    assert top[0][0]["id"] == 9
+    assert db.count(key) == 10
+    assert set(db.keys("cuda|wmma_fp16_fp32|ntn|")) == {key, other}
+    db.close()
+
+
+def test_import_log():
+    dirname = tempfile.mkdtemp()
+    log_file = os.path.join(dirname, "schedule.log")
+    with open(log_file, "w") as fout:
+        for i in range(5):
+            print(json.dumps({"record": {"id": i}, "value": i * 0.5}), file=fout)
+    db = TuningDatabase(os.path.join(dirname, "test.db"))
+    assert db.import_log("key", log_file) == 5
+    assert db.topk("key")[0] == ({"id": 4}, 2.0)
+    # reopen and query again
+    db.close()
+    db = TuningDatabase(os.path.join(dirname, "test.db"))
+    assert len(db.get_all("key")) == 5
+    db.close()
+
+
+def test_project_split_factors():
+    gen = SplitFactorGenerator(64, 4)
+    # factors tuned for extent 128 map to the nearest split of 64
+    ret = gen.project([2, 4, 8, 2])
+    assert reduce(lambda x, y: x * y, ret, 1) == 64
+    assert sum([abs(math.log2(a) - math.log2(b)) for a, b in zip(ret, [2, 4, 8, 2])]) == 1
+    assert gen.project([1, 2, 4, 8]) == [1, 2, 4, 8]
+
+
+def gemm(M, N, K):
+    A = tvm.te.placeholder([M, K], dtype="float16", name="A")
+    B = tvm.te.placeholder([K, N], dtype="float16", name="B")
+    k = tvm.te.reduce_axis([0, K], name="k")
+    C = tvm.te.compute(
+        [M, N],
+        lambda i, j: tvm.te.sum((A[i, k] * B[k, j]).astype("float16"), axis=k),
+        name="C",
+    )
+    return [A, B, C]
+
+
+def test_warm_start_without_projection():
+    # the TENET generator can not project records, warm start leaves it cold
+    dirname = tempfile.mkdtemp()
+    db = TuningDatabase(os.path.join(dirname, "test.db"))
+    target = "tenet gemm"
+    measure_opt = at.MeasureOptions(target=target, timeout=10, verbose=0)
+    for M in [256, 512]:
+        log_file = os.path.join(dirname, "gemm-%d.log" % M)
+        target_dag = at.compute_dag_from_tensors([gemm(M, 256, 256)[-1]])
+        result = at.auto_tensorize_v3(
+            target_dag,
+            target,
+            log_file,
+            log_file,
+            measure_opt,
+            trials=4,
+            schedule_trials=2,
+            database=db,
+            warm_start=True,
+        )
+        assert result.defined()
+    db.close()
+
+
+if __name__ == "__main__":
+    test_topk()
+    test_import_log()
+    test_project_split_factors()
+    test_warm_start_without_projection()
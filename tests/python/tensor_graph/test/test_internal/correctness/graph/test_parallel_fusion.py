@@ -5,6 +5,8 @@ import tvm
 
 from tvm.tensor_graph.core import compute, GraphTensor, GraphOp, ForwardGraph
 from tvm.tensor_graph.core.transform import ParallelFusionFinder, ParallelFusionApplier
+from tvm.tensor_graph.core.transform import HorizontalFusionFinder, HorizontalFusionApplier
+from tvm.tensor_graph.core.transform.parallel_fusion import _func_key
 
 
 def check_graph_connectivity(graph: ForwardGraph, verbose=False):
@@ -436,6 +438,109 @@ def test3():
     assert len(new_graph.weights) == 4  # cannot fuse 3x3 and 5x5 conv
 
 
+def _build_and_run(graph, feed):
+    params = dict()
+    out_tensors = list()
+    for output in graph.outputs:
+        out_tensor, params = output(params)
+        out_tensors.append(out_tensor)
+    s = tvm.te.create_schedule([o.tvm_tensor.op for o in out_tensors])
+    args = graph.inputs + graph.weights + graph.outputs
+    func = tvm.build(s, [params[x].tvm_tensor for x in args], "llvm")
+    ctx = tvm.context("llvm")
+    arrays = [tvm.nd.array(feed[x], ctx) for x in graph.inputs + graph.weights]
+    arrays += [tvm.nd.array(np.empty([int(v) for v in x.shape], dtype=x.dtype), ctx) for x in graph.outputs]
+    func(*arrays)
+    return [x.asnumpy() for x in arrays[-len(graph.outputs):]]
+
+
+def test4():
+
+    def _gemm_bias(M, N, K, A, B, bias, requires_grad=True, name='compute'):
+        k = tvm.te.reduce_axis([0, K])
+        return compute([M, N], lambda i, j: tvm.te.sum(A[i, k] * B[k, j] + bias[j] / K, axis=[k]),
+                       requires_grad=requires_grad, name=name)
+
+    print("test 4 ########################")
+    # the last shapes are large and not multiples of the tile
+    for M, K, Ns in [(32, 8, [16, 16, 32]), (256, 512, [512, 512, 1024]), (100, 72, [48, 48, 100])]:
+        X = GraphTensor([M, K], name="X")
+        gates = []
+        weights = []
+        for i, N in enumerate(Ns):
+            W = GraphTensor([K, N], name="W%d" % i)
+            b = GraphTensor([N], name="b%d" % i)
+            weights += [W, b]
+            gates.append(GraphOp([M, N], [K], [X, W, b], _gemm_bias, name="gate%d" % i))
+
+        fgraph = ForwardGraph([X], gates, weights)
+        finder = HorizontalFusionFinder()
+        finder(fgraph)
+        # multi-input siblings are fused along the output features
+        assert len(finder.fusion_groups) == 1
+        assert finder.fusion_groups[0]["fused_dim_output"] == 1
+        applier = HorizontalFusionApplier(finder.fusion_groups, finder.batch_groups)
+        new_graph = applier.transform(fgraph)
+        check_graph_connectivity(new_graph)
+        assert len(new_graph.weights) == 2
+
+        feed = {x: np.random.randn(*x.shape).astype(x.dtype) for x in [X] + weights}
+        for fused_weight, orig_weights, dim in applier.fused_weights:
+            feed[fused_weight] = np.concatenate([feed[w] for w in orig_weights], axis=dim)
+        results = _build_and_run(new_graph, feed)
+        for i, result in enumerate(results):
+            W, b = weights[2 * i], weights[2 * i + 1]
+            tvm.testing.assert_allclose(result, feed[X] @ feed[W] + feed[b], atol=1e-3, rtol=1e-4)
+
+
+def test5():
+    def _transpose(M, N, A, requires_grad=True, name='compute'):
+        return compute([M, N], lambda i, j: A[j, i], requires_grad=requires_grad, name=name)
+
+    print("test 5 ########################")
+    # the second case has more heads than max_batch (12 heads as in BERT-base)
+    for L, D, H, batches in [(16, 8, 4, [4]), (128, 64, 12, [8, 4])]:
+        heads = []
+        inputs = []
+        for h in range(H):
+            Q = GraphTensor([L, D], name="Q%d" % h)
+            K = GraphTensor([L, D], name="K%d" % h)
+            inputs += [Q, K]
+            KT = GraphOp([D, L], [], [K], _transpose, name="KT%d" % h)
+            heads.append(GraphOp([L, L], [D], [Q, KT], _gemm, name="score%d" % h))
+
+        fgraph = ForwardGraph(inputs, heads, [])
+        finder = HorizontalFusionFinder(max_batch=8)
+        finder(fgraph)
+        # independent heads become batched GEMMs of at most max_batch heads
+        assert [len(group["parallel_ops"]) for group in finder.batch_groups] == batches
+        applier = HorizontalFusionApplier(finder.fusion_groups, finder.batch_groups)
+        new_graph = applier.transform(fgraph)
+        check_graph_connectivity(new_graph)
+
+        feed = {x: np.random.randn(*x.shape).astype(x.dtype) for x in inputs}
+        results = _build_and_run(new_graph, feed)
+        for h, result in enumerate(results):
+            Q, K = inputs[2 * h], inputs[2 * h + 1]
+            tvm.testing.assert_allclose(result, feed[Q] @ feed[K].T, atol=1e-4, rtol=1e-4)
+
+
+def test6():
+
+    def make_scale(factor):
+        def _inner_scale(M, N, A, requires_grad=True, name='compute'):
+            return compute([M, N], lambda i, j: A[i, j] * factor, requires_grad=requires_grad, name=name)
+        return _inner_scale
+
+    print("test 6 ########################")
+    # closures are keyed on the values they capture, not on their repr
+    assert _func_key(make_scale(2)) == _func_key(make_scale(2))
+    assert _func_key(make_scale(2)) != _func_key(make_scale(3))
+    assert _func_key(make_scale(tvm.tir.const(2, "int32"))) == \
+        _func_key(make_scale(tvm.tir.const(2, "int32")))
+    assert _func_key(make_scale([2, 3])) != _func_key(make_scale((2, 3)))
+
+
 # TODO: Conv2D optimization test
 # TODO: integration test
 
@@ -444,3 +549,6 @@ if __name__ == "__main__":
     test1()
     test2()
     test3()
+    test4()
+    test5()
+    test6()
@@ -0,0 +1,109 @@
+import tvm
+import os
+import numpy as np
+from tvm import tg
+from pebble import concurrent
+from tvm.tensor_graph.core import evaluate_function_for, start_evaluate, stop_evaluate
+from tvm.tensor_graph.core import ForwardGraph, GraphTensor, make_tir_graph
+from tvm.tensor_graph.core.utils import to_tuple
+from tvm.tensor_graph.nn import CELoss, SGD
+from tvm.tensor_graph.nn.functional import gemm, elementwise_add
+
+
+def clear_log_files(filenames):
+  for filename in filenames:
+    if os.path.exists(filename) and os.path.isfile(filename):
+      os.remove(filename)
+
+
+def make_branchy_graph(batch, hidden, num_classes, dtype="float32"):
+  # two independent branches that join, so the subgraphs can run concurrently
+  img_tensor = GraphTensor([batch, hidden], dtype, name="data")
+  label_tensor = GraphTensor([batch, num_classes], dtype, name="label")
+  weight1 = GraphTensor([hidden, num_classes], dtype, name="weight1")
+  weight2 = GraphTensor([hidden, num_classes], dtype, name="weight2")
+  out = elementwise_add(gemm(img_tensor, weight1), gemm(img_tensor, weight2))
+  fwd_graph = ForwardGraph([img_tensor], [out], [weight1, weight2])
+  optimizer = SGD(lr=0.002)
+  tir_graph = make_tir_graph(
+    fwd_graph, loss=CELoss(label_tensor), optimizer=optimizer, inference=False)
+  return tir_graph, optimizer
+
+
+def run_with_streams(target, dev_id, streams, number=4):
+  execution_log_file = "execution_log_streams_%d.txt" % streams
+  clear_log_files([execution_log_file])
+  log_option = tg.create_session_option(
+    report_profile=False,
+    report_iteration=False,
+    autoschedule_topk=4,
+    autoschedule_new_trial=2,
+    autoschedule_policy="random",
+    autoschedule_parallel=1,
+    autoschedule_timeout=200.0,
+    profile_parallel=1,
+    profile_timeout=4.0,
+    build_parallel=1,
+    build_timeout=1.0,
+    execution_explore_probability=0.0,
+    execution_parallel=1,
+    execution_timeout=100.0,
+    execution_log_file=execution_log_file,
+    execution_streams=streams
+  )
+  sess = tg.create_session(target, dev_id, log_option)
+  batch, hidden, num_classes = 4, 16, 8
+  dtype = "float32"
+  tir_graph, optimizer = make_branchy_graph(batch, hidden, num_classes, dtype)
+
+  ctx = tg.get_context_from_session(sess)
+  np.random.seed(0)
+  inputs_data = np.random.uniform(-1, 1, [batch, hidden]).astype(dtype)
+  label_data = np.random.uniform(0, 1, [batch, num_classes]).astype(dtype)
+  lr_data = optimizer.get_lr().astype(dtype)
+  bindings = {
+    tir_graph.inputs[0]: tvm.nd.array(inputs_data, ctx),
+    tir_graph.labels[0]: tvm.nd.array(label_data, ctx),
+    tir_graph.lr: tvm.nd.array(lr_data, ctx)
+  }
+  weight_bindings = [
+    tvm.nd.array(np.random.uniform(-1, 1, to_tuple(w.shape)).astype(w.dtype), ctx)
+    for w in tir_graph.weights]
+  tg.initialize_weights(sess, tir_graph, weight_bindings)
+  task_id = tg.add_task(sess, tir_graph)
+  tg.begin_tuning(sess, task_id, 10)
+  # several iterations, so the updates must follow the reads of the weights
+  tg.run_task(sess, task_id, [bindings] * number, save_to="")
+  tg.end_tuning(sess, task_id)
+  keys = list(tir_graph.outputs) + list(tir_graph.gradients) + list(tir_graph.weights)
+  results = [x.asnumpy() for x in tg.get_data_from_session(sess, keys)]
+  tg.delete_session(sess)
+  return results
+
+
+@concurrent.process
+def main_process(target, dev_id):
+  serial = run_with_streams(target, dev_id, 1)
+  parallel = run_with_streams(target, dev_id, 4)
+  assert len(serial) == len(parallel)
+  for a, b in zip(serial, parallel):
+    np.testing.assert_allclose(a, b, rtol=1e-4, atol=1e-5)
+  return 0
+
+
+def test1():
+  start_evaluate()
+  target = "llvm"
+  dev_id = 0
+  evalute_exit_code = evaluate_function_for(target, 1)
+  exit_code = main_process(target, dev_id)
+  try:
+    assert exit_code.result() == 0
+  finally:
+    stop_evaluate()
+    evalute_exit_code.result()
+
+
+if __name__ == "__main__":
+  test1()
+  print("Success!")
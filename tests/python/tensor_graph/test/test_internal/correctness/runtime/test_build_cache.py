@@ -0,0 +1,56 @@
+import tvm
+from tvm.tensor_graph.core import ForwardGraph, compute, GraphTensor, GraphOp, PyTIRGraph
+
+
+def make_two_gemms(batch=4, hidden=8, dtype="float32"):
+  # two gemms of the same shape only differ in the names of their weights
+  def _gemm(M, N, K, A, B, requires_grad=True):
+    k = tvm.te.reduce_axis([0, K])
+    return compute([M, N], lambda i, j: tvm.te.sum(A[i, k] * B[k, j], axis=[k]), requires_grad=requires_grad)
+
+  img_tensor = GraphTensor([batch, hidden], dtype=dtype, name="image")
+  weight1 = GraphTensor([hidden, hidden], dtype=dtype, name="weight1")
+  weight2 = GraphTensor([hidden, hidden], dtype=dtype, name="weight2")
+  out1 = GraphOp([batch, hidden], [hidden], [img_tensor, weight1], _gemm, name="gemm1")
+  out2 = GraphOp([batch, hidden], [hidden], [out1, weight2], _gemm, name="gemm2")
+  fwd_graph = ForwardGraph([img_tensor], [out2], [weight1, weight2])
+  finputs, foutputs, fweights = fwd_graph()
+
+  return PyTIRGraph(
+    [x.tvm_tensor for x in finputs],
+    [],
+    [x.tvm_tensor for x in foutputs],
+    [x.tvm_tensor for x in fweights],
+    None,
+    [],
+    None,
+    [])
+
+
+def test1():
+  target = "llvm"
+  tgraph = make_two_gemms()
+  tgraph.partition_graph()
+  marks = list(tgraph.subgraphs.keys())
+  assert len(marks) == 2
+  assert len(set(tgraph.subgraph_features.values())) == 1
+  tgraph.create_schedule()
+  for mark in marks:
+    assert tgraph.build_for(target, mark=mark)
+  # the second subgraph shares the module of the first
+  assert tgraph.build_report == {"compiled": 1, "shared": 1}
+  assert tgraph.functions[marks[0]] is tgraph.functions[marks[1]]
+
+  # an unchanged graph is neither lowered nor compiled again
+  assert tgraph.build(target)
+  assert tgraph.build_report == {"shared": len(tgraph.schedules)}
+
+  # a new schedule is lowered, the same IR is not compiled again
+  mark = list(tgraph.schedules.keys())[0]
+  tgraph.create_schedule_for(mark=mark, force=True)
+  assert tgraph.build(target)
+  assert tgraph.build_report == {"memory": 1}
+
+
+if __name__ == "__main__":
+  test1()
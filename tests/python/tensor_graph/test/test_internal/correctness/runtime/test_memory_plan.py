@@ -0,0 +1,146 @@
+import tvm
+import numpy as np
+from tvm.tensor_graph.core import ForwardGraph, compute, GraphTensor, GraphOp, PyTIRGraph
+from tvm.tensor_graph.nn import CELoss, SGD
+from tvm.tensor_graph.core.con_graph import plan_memory
+from tvm.tensor_graph.core.utils import to_tuple
+
+
+def test1():
+  # a chain: every buffer is only alive with its producer and consumer
+  lifetimes = {
+    "a": (1024, 0, 1),
+    "b": (512, 1, 2),
+    "c": (1024, 2, 3),
+    "d": (256, 3, 4),
+  }
+  assign, arena_sizes = plan_memory(lifetimes)
+  for x in lifetimes:
+    for y in lifetimes:
+      if x != y and assign[x] == assign[y]:
+        _, bx, ex = lifetimes[x]
+        _, by, ey = lifetimes[y]
+        assert ex < by or ey < bx
+  assert len(arena_sizes) == 2
+  assert sum(arena_sizes) == 1024 + 512
+  assert sum(arena_sizes) < sum([x[0] for x in lifetimes.values()])
+
+
+def test2():
+  # all alive at the same time
+  lifetimes = {str(i): (i + 1, 0, 5) for i in range(4)}
+  assign, arena_sizes = plan_memory(lifetimes)
+  assert len(set(assign.values())) == 4
+  assert sum(arena_sizes) == 10
+
+
+def test3():
+  # a training graph: gradients are read by the updates in other subgraphs
+  batch = 4
+  num_classes = 8
+  dtype = "float32"
+
+  def _gemm(M, N, K, A, B, requires_grad=True):
+    k = tvm.te.reduce_axis([0, K])
+    return compute([M, N], lambda i, j: tvm.te.sum(A[i, k] * B[k, j], axis=[k]), requires_grad=requires_grad)
+
+  img_tensor = GraphTensor([batch, num_classes], dtype=dtype, name="image")
+  weight_tensor = GraphTensor([num_classes, num_classes], dtype=dtype, name="weight")
+  label_tensor = GraphTensor([batch, num_classes], dtype=dtype, name="label")
+  output_tensor = GraphOp(
+    [batch, num_classes], [num_classes], [img_tensor, weight_tensor], _gemm, name="gemm")
+  fwd_graph = ForwardGraph([img_tensor], [output_tensor], [weight_tensor])
+  bgraph = fwd_graph.make_backward(CELoss(label_tensor), SGD(0.002))
+
+  tgraph = PyTIRGraph(
+    [x.tvm_tensor for x in bgraph.inputs],
+    [x.tvm_tensor for x in bgraph.labels],
+    [x.tvm_tensor for x in bgraph.outputs],
+    [x.tvm_tensor for x in bgraph.weights],
+    bgraph.loss.tvm_tensor,
+    [x.tvm_tensor for x in bgraph.gradients],
+    bgraph.lr.tvm_tensor,
+    [x.tvm_tensor for x in bgraph.updates])
+  tgraph.partition_graph()
+
+  persistent = tgraph.outputs + tgraph.gradients + tgraph.updates + tgraph.weights + [tgraph.loss]
+  consumed = set()
+  for mark, subgraph in tgraph.subgraphs.items():
+    consumed.update(subgraph.inputs.values())
+  # the case to guard: a gradient is a subgraph output read by another subgraph
+  assert any([t in consumed for t in tgraph.gradients])
+  lifetimes = tgraph.get_intermediate_lifetimes()
+  for t in persistent:
+    assert t not in lifetimes
+  assign, arena_sizes = tgraph.plan_memory()
+  for t in persistent:
+    assert t not in assign
+
+
+def run_two_layers(reuse_memory):
+  # all the shapes differ, so every subgraph has its own schedule
+  batch = 4
+  hidden = 12
+  num_features = 16
+  num_classes = 8
+  dtype = "float32"
+
+  def _gemm(M, N, K, A, B, requires_grad=True):
+    k = tvm.te.reduce_axis([0, K])
+    return compute([M, N], lambda i, j: tvm.te.sum(A[i, k] * B[k, j], axis=[k]), requires_grad=requires_grad)
+
+  img_tensor = GraphTensor([batch, num_features], dtype=dtype, name="image")
+  weight1 = GraphTensor([num_features, hidden], dtype=dtype, name="weight1")
+  weight2 = GraphTensor([hidden, num_classes], dtype=dtype, name="weight2")
+  label_tensor = GraphTensor([batch, num_classes], dtype=dtype, name="label")
+  hidden_tensor = GraphOp([batch, hidden], [num_features], [img_tensor, weight1], _gemm, name="gemm1")
+  output_tensor = GraphOp([batch, num_classes], [hidden], [hidden_tensor, weight2], _gemm, name="gemm2")
+  fwd_graph = ForwardGraph([img_tensor], [output_tensor], [weight1, weight2])
+  sgd = SGD(0.002)
+  bgraph = fwd_graph.make_backward(CELoss(label_tensor), sgd)
+
+  tgraph = PyTIRGraph(
+    [x.tvm_tensor for x in bgraph.inputs],
+    [x.tvm_tensor for x in bgraph.labels],
+    [x.tvm_tensor for x in bgraph.outputs],
+    [x.tvm_tensor for x in bgraph.weights],
+    bgraph.loss.tvm_tensor,
+    [x.tvm_tensor for x in bgraph.gradients],
+    bgraph.lr.tvm_tensor,
+    [x.tvm_tensor for x in bgraph.updates])
+  tgraph.partition_graph()
+  tgraph.create_schedule()
+  target = "llvm"
+  assert tgraph.build(target)
+
+  np.random.seed(0)
+  tgraph.set_inputs({tgraph.inputs[0]: np.random.uniform(-1, 1, [batch, num_features]).astype(dtype)})
+  tgraph.set_labels({tgraph.labels[0]: np.random.uniform(0, 1, [batch, num_classes]).astype(dtype)})
+  tgraph.set_lr(sgd.get_lr().astype(dtype))
+  tgraph.set_weights({
+    w: np.random.uniform(-1, 1, to_tuple(w.shape)).astype(dtype) for w in tgraph.weights})
+  tgraph.allocate_buffer(target, 0, reuse_memory=reuse_memory)
+  for mark in tgraph.call_order:
+    func = tgraph.functions[mark]
+    bufs = tgraph.bufs[mark]
+    real_bufs = [tgraph.tvm_array_dict[tgraph.subgraphs[mark].index[x]] for x in bufs]
+    func(*real_bufs)
+  results = tgraph.get_outputs() + tgraph.get_gradients() + tgraph.get_updates()
+  return [x.asnumpy() for x in results], tgraph.memory_report
+
+
+def test4():
+  # the arena views give the same numbers as separate buffers
+  expected, _ = run_two_layers(reuse_memory=False)
+  results, memory_report = run_two_layers(reuse_memory=True)
+  assert memory_report
+  assert len(expected) == len(results)
+  for a, b in zip(expected, results):
+    np.testing.assert_allclose(a, b, rtol=1e-5, atol=1e-6)
+
+
+if __name__ == "__main__":
+  test1()
+  test2()
+  test3()
+  test4()
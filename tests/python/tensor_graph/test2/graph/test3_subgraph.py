@@ -608,6 +608,33 @@ def test12():
         check_equal_graph(graph, tmp)
 
 
+@register_test
+def test13():
+    """
+    test memory budget checkpoint for cnn2 with Adam optimizer
+    """
+    num_classes = 1000
+    model = M.cnn2(num_classes=num_classes)
+    inputs = FloatTensor([32, 3, 14, 14], name="data")
+
+    weights = list(model.weights)
+    mse_loss = nn.MSELoss()
+    labels = FloatTensor([32, num_classes], name="label")
+
+    opt = optim.Adam(weights)
+
+    def count_ops(g):
+        return sum([len(v.ops) for v in g.subgraphs.values()])
+
+    # no budget recomputes the most, unlimited budget recomputes nothing
+    graph = make_backward(model, mse_loss, opt, inputs, labels)
+    small = make_backward(model, mse_loss, opt, inputs, labels, checkpoint_budget=0)
+    large = make_backward(model, mse_loss, opt, inputs, labels, checkpoint_budget=1 << 40)
+    assert count_ops(small) == count_ops(graph)
+    # keeping every candidate removes the recomputed copies
+    assert count_ops(large) < count_ops(small)
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()